@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import asyncio
+import shutil
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import (Any, AsyncIterator, Callable, Dict, List, Optional, Tuple,
+                    TypeVar)
+
+import httpx
+import yaml
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Match, Route
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from cwl_inputs_parser import metrics as metrics_module
+from cwl_inputs_parser import remote
+from cwl_inputs_parser.batch import DEFAULT_BATCH_CONCURRENCY, init_worker
+from cwl_inputs_parser.cache import AsyncSingleFlight, content_hash
+from cwl_inputs_parser.handlers import (INPUTS_FLIGHTS, TEMPLATE_FLIGHTS,
+                                        parse_batch_item,
+                                        record_response_metrics,
+                                        request_base_uri,
+                                        request_to_processes_json,
+                                        request_to_template)
+from cwl_inputs_parser.metrics import (MetricsRegistry, collect,
+                                       configure_metrics_dir, flush_soon,
+                                       get_metrics, prepare_metrics_dir,
+                                       record_error, render, reset_flush)
+from cwl_inputs_parser.remote import (RETRY_STATUS_CODES, DocumentStore,
+                                      HTTPSettings, configure_http,
+                                      get_session_pool,
+                                      handle_download_response,
+                                      load_from_store, revalidation_headers)
+from cwl_inputs_parser.tracing import (Span, configure_span_exporter,
+                                       current_span, server_timing, span,
+                                       trace)
+from cwl_inputs_parser.utils import (dumps_json, error_record, is_remote_url,
+                                     wf_content_to_inputs,
+                                     wf_location_to_inputs)
+
+T = TypeVar("T")
+
+# The concurrent requests for the same document share one fetch and parse,
+# coalesced on the event loop before they reach the process pool
+ASYNC_INPUTS_FLIGHTS: AsyncSingleFlight[bytes] = AsyncSingleFlight()
+ASYNC_TEMPLATE_FLIGHTS: AsyncSingleFlight[Optional[bytes]] = AsyncSingleFlight()  # noqa: E501
+
+
+def collect_async_coalesced(metrics: MetricsRegistry) -> None:
+    """
+    Adds the numbers of requests coalesced on the event loop to the ones
+    of collect_coalesced, which sets the same samples in this process.
+    """
+    metrics.set_counter("cwl_inputs_parser_coalesced_requests_total", INPUTS_FLIGHTS.coalesced() + ASYNC_INPUTS_FLIGHTS.coalesced(), route="/")  # noqa: E501
+    metrics.set_counter("cwl_inputs_parser_coalesced_requests_total", TEMPLATE_FLIGHTS.coalesced() + ASYNC_TEMPLATE_FLIGHTS.coalesced(), route="/make-template")  # noqa: E501
+
+
+get_metrics().add_collector(collect_async_coalesced)
+
+
+class AsyncDownloader:
+    """
+    Non-blocking counterpart of remote.download, sharing the HTTP cache.
+    The HTTP settings apply as in SessionPool: at most
+    max_connections_per_host requests are sent to a host at once, and
+    failed connections and 429/5xx responses are retried with backoff.
+    """
+
+    def __init__(self, settings: HTTPSettings) -> None:
+        self.settings = settings
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.read_timeout,
+                                  connect=settings.connect_timeout),
+            limits=httpx.Limits(max_connections=None),
+        )
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def download(self, remote_url: str) -> str:
+        """
+        Downloads a remote document and returns the content.
+        The document store and the HTTP cache are read and written in the
+        default executor, off the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        stored = await loop.run_in_executor(None, load_from_store, remote_url)
+        if stored is not None:
+            return stored
+        http_cache = remote.HTTP_CACHE
+        cached = await loop.run_in_executor(None, http_cache.load, remote_url) if http_cache is not None else None  # noqa: E501
+        if cached is not None and cached.immutable:
+            return cached.content
+        response = await self._get(remote_url, revalidation_headers(cached))
+        return await loop.run_in_executor(
+            None, handle_download_response, remote_url, cached,
+            response.status_code, response.text, response.headers)
+
+    async def _get(self, url: str, headers: Dict[str, str]) -> httpx.Response:
+        host = httpx.URL(url).netloc.decode("ascii")
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.settings.max_connections_per_host)  # noqa: E501
+            self._host_semaphores[host] = semaphore
+        retries = self.settings.retries
+        async with semaphore:
+            for attempt in range(retries + 1):
+                if attempt > 0:
+                    await asyncio.sleep(self.settings.backoff_factor * 2 ** (attempt - 1))  # noqa: E501
+                try:
+                    response = await self.client.get(url, headers=headers)
+                except httpx.TransportError:
+                    if attempt == retries:
+                        raise
+                    continue
+                if response.status_code not in RETRY_STATUS_CODES or attempt == retries:  # noqa: E501
+                    return response
+        raise AssertionError("unreachable")
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+class RequestMetricsMiddleware:
+    """
+    Counts the requests and observes their latency like the Flask app.
+    A request is in flight until its response is sent, also the body of a
+    streamed response (e.g. of /batch).
+    """
+
+    def __init__(self, app: ASGIApp, routes: List[Route]) -> None:
+        self.app = app
+        self.routes = routes
+
+    def route(self, scope: Scope) -> str:
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match != Match.NONE:
+                return route.path
+        return "unmatched"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:  # noqa: E501
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        # the error handler responds outside of the middleware
+        status = 500
+
+        async def send_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics = get_metrics()
+        metrics.add_gauge("cwl_inputs_parser_requests_in_flight", 1)
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            record_response_metrics(self.route(scope), scope["method"],
+                                    status, start)
+            metrics.add_gauge("cwl_inputs_parser_requests_in_flight", -1)
+            flush_soon()
+
+
+def init_asgi_worker(http_settings: HTTPSettings,
+                     http_cache_dir: Optional[Path],
+                     document_store: Optional[DocumentStore],
+                     metrics_dir: Optional[Path]) -> None:
+    """
+    Applies the remote fetch settings of the parent to a process of the
+    pool, and shares the metrics directory with it. The samples inherited
+    from the parent are dropped, and the traces are exported by the parent.
+    """
+    init_worker(http_settings, http_cache_dir, document_store)
+    configure_metrics_dir(metrics_dir)
+    get_metrics().reset()
+    reset_flush()
+    configure_span_exporter(None)
+
+
+def run_traced(func: Callable[..., T], *args: Any) -> Tuple[T, Span]:
+    """Runs a function in a process of the pool under a trace."""
+    try:
+        with trace(func.__name__) as root:
+            result = func(*args)
+        return result, root
+    finally:
+        flush_soon()
+
+
+def location_to_json(wf_location: str) -> bytes:
+    """Parses the inputs of a workflow location in an executor."""
+    return wf_location_to_inputs(wf_location).as_json_bytes()
+
+
+def content_to_json(wf_content: str, uri: str) -> bytes:
+    """Parses the inputs of a workflow content in an executor."""
+    return wf_content_to_inputs(wf_content, uri).as_json_bytes()
+
+
+def template_to_json(req_data: Dict[str, Any]) -> Optional[bytes]:
+    """Creates the template of a request in an executor."""
+    template_data = request_to_template(req_data)
+    if template_data is None:
+        return None
+    return dumps_json(template_data)
+
+
+async def run_in_executor(request: Request,
+                          func: Callable[..., T],
+                          *args: Any) -> T:
+    """
+    Runs a function in the process pool. The phases traced in the process
+    are added to the current trace, e.g. for the Server-Timing header.
+    """
+    loop = asyncio.get_running_loop()
+    result, root = await loop.run_in_executor(
+        request.app.state.executor, run_traced, func, *args)
+    parent = current_span()
+    if parent is not None:
+        parent.children.extend(root.children)
+    return result
+
+
+def request_key(req_data: Dict[str, Any]) -> Optional[str]:
+    """
+    Returns the key of the document of a request in the single-flights, as
+    in the ones of the handlers, or None if it is missing.
+    """
+    wf_location = req_data.get("wf_location", None)
+    wf_content = req_data.get("wf_content", None)
+    if wf_location is not None:
+        return f"location:{wf_location.strip()}"
+    if wf_content is not None:
+        return f"content:{content_hash(wf_content, request_base_uri(req_data))}"  # noqa: E501
+    return None
+
+
+async def fetch_remote_location(request: Request, req_data: Dict[str, Any]) -> Dict[str, Any]:  # noqa: E501
+    """
+    Downloads the remote wf_location of a request on the event loop, and
+    returns the request with the content as wf_content instead.
+    """
+    wf_location = req_data.get("wf_location", None)
+    if not isinstance(wf_location, str) or not is_remote_url(wf_location.strip()):  # noqa: E501
+        return req_data
+    location = wf_location.strip()
+    try:
+        with span("fetch_document", location=location):
+            wf_content = await request.app.state.downloader.download(location)  # noqa: E501
+    except Exception as e:
+        record_error(e)
+        raise
+    rest = {k: v for k, v in req_data.items() if k != "wf_location"}
+    return {**rest, "wf_content": wf_content, "base_uri": location}
+
+
+def json_response(content: bytes, status_code: int = 200,
+                  server_timing: Optional[str] = None) -> Response:
+    headers = {"Access-Control-Allow-Origin": "*"}
+    if server_timing is not None:
+        headers["Server-Timing"] = server_timing
+    return Response(content, status_code=status_code,
+                    media_type="application/json", headers=headers)
+
+
+def missing_arguments() -> Response:
+    return json_response(dumps_json({"message": "Missing arguments"}), 400)
+
+
+async def read_request(request: Request) -> Any:
+    return yaml.safe_load((await request.body()).decode("utf-8"))
+
+
+async def metrics(request: Request) -> Response:
+    """
+    Metrics in the Prometheus text format, aggregated over this process and
+    the processes of the pool.
+    """
+    loop = asyncio.get_running_loop()
+    text = await loop.run_in_executor(None, lambda: render(collect()))
+    return Response(text, media_type="text/plain; version=0.0.4")
+
+
+async def health(request: Request) -> Response:
+    """
+    Health check.
+    """
+    return json_response(dumps_json({"message": "OK"}))
+
+
+async def inputs_to_json(request: Request, req_data: Dict[str, Any]) -> bytes:  # noqa: E501
+    """Fetches and parses the inputs of the document of a request."""
+    req_data = await fetch_remote_location(request, req_data)
+    wf_location = req_data.get("wf_location", None)
+    if wf_location is not None:
+        return await run_in_executor(request, location_to_json, wf_location.strip())  # noqa: E501
+    return await run_in_executor(request, content_to_json, req_data["wf_content"], request_base_uri(req_data))  # noqa: E501
+
+
+async def parse(request: Request) -> Response:
+    """
+    Parse the inputs of a workflow.
+    The time of each phase is returned in the Server-Timing header.
+    The concurrent requests for the same document share its parse.
+    """
+    req_data = await read_request(request)
+    key = request_key(req_data)
+    if key is None:
+        return missing_arguments()
+    with trace(f"{request.method} /") as root:
+        content = await ASYNC_INPUTS_FLIGHTS.do(
+            key, lambda: inputs_to_json(request, req_data))
+    return json_response(content, server_timing=server_timing(root))
+
+
+async def processes(request: Request) -> Response:
+    """
+    Parse the inputs of every process of a document (see the Flask app).
+    """
+    req_data = await read_request(request)
+    with trace(f"{request.method} /processes") as root:
+        req_data = await fetch_remote_location(request, req_data)
+        status, content = await run_in_executor(request, request_to_processes_json, req_data)  # noqa: E501
+    if status != 200:
+        return Response(content, status_code=status,
+                        media_type="application/json")
+    return json_response(content, server_timing=server_timing(root))
+
+
+async def batch_item_record(request: Request, item: Tuple[int, Any]) -> Dict[str, Any]:  # noqa: E501
+    """
+    Parses an item of a /batch request (see parse_batch_item), with its
+    remote document downloaded on the event loop.
+    """
+    index, req_data = item
+    start = time.perf_counter()
+    try:
+        if isinstance(req_data, dict):
+            req_data = await fetch_remote_location(request, req_data)
+    except Exception as e:
+        return {"index": index, "error": error_record(e),
+                "elapsed": time.perf_counter() - start}
+    record = await run_in_executor(request, parse_batch_item, (index, req_data))  # noqa: E501
+    record["elapsed"] = time.perf_counter() - start
+    return record
+
+
+async def stream_batch(request: Request, items: List[Any]) -> AsyncIterator[bytes]:  # noqa: E501
+    """
+    Parses the items of a batch request, batch_concurrency at once, and
+    yields their records as JSON Lines in completion order.
+    The pending items are cancelled if the client goes away.
+    """
+    semaphore = asyncio.Semaphore(request.app.state.batch_concurrency)
+
+    async def record(item: Tuple[int, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            return await batch_item_record(request, item)
+
+    tasks = [asyncio.ensure_future(record(item)) for item in enumerate(items)]
+    try:
+        for next_record in asyncio.as_completed(tasks):
+            yield dumps_json(await next_record) + b"\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def batch(request: Request) -> Response:
+    """
+    Parse the inputs of many workflows (see the Flask app).
+    """
+    req_data = await read_request(request)
+    if isinstance(req_data, dict):
+        req_data = req_data.get("items", None)
+    if not isinstance(req_data, list):
+        return missing_arguments()
+    return StreamingResponse(stream_batch(request, req_data),
+                             media_type="application/x-ndjson",
+                             headers={"Access-Control-Allow-Origin": "*"})
+
+
+async def cwl_make_template_route(request: Request) -> Response:
+    """
+    Create a template for a CWL file.
+    The concurrent requests for the same document share the template.
+    """
+    req_data = await read_request(request)
+    key = request_key(req_data)
+    if key is None:
+        return missing_arguments()
+    content = await ASYNC_TEMPLATE_FLIGHTS.do(
+        key, lambda: run_in_executor(request, template_to_json, req_data))
+    if content is None:
+        return missing_arguments()
+    return json_response(content)
+
+
+async def error_handler_exception(request: Request, exception: Exception) -> Response:  # noqa: E501
+    trace = "".join(traceback.format_exception(type(exception), exception, exception.__traceback__))  # noqa: E501
+    return json_response(dumps_json({"message": f"The server encountered an internal error:\n{trace}"}), 500)  # noqa: E501
+
+
+def create_asgi_app(http_settings: Optional[HTTPSettings] = None,
+                    executor_workers: Optional[int] = None,
+                    batch_concurrency: int = DEFAULT_BATCH_CONCURRENCY) -> Starlette:  # noqa: E501
+    """
+    Create the ASGI app (requires the 'async' extra), with the same routes
+    as the Flask app. Remote documents are fetched on the event loop, and
+    the documents are loaded and parsed in a process pool.
+    http_settings configures the remote fetches, executor_workers is the
+    number of processes loading and parsing the documents (default: the
+    number of CPUs), and batch_concurrency is the number of items of a
+    /batch request parsed at once. The HTTP settings and cache apply to the
+    processes, which share their metrics through the metrics directory.
+    """
+    if http_settings is not None:
+        configure_http(http_settings)
+    settings = get_session_pool().settings
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        http_cache_dir = remote.HTTP_CACHE.cache_dir if remote.HTTP_CACHE is not None else None  # noqa: E501
+        configured_metrics_dir = metrics_module.METRICS_DIR
+        prepare_metrics_dir()
+        app.state.executor = ProcessPoolExecutor(
+            max_workers=executor_workers,
+            initializer=init_asgi_worker,
+            initargs=(settings, http_cache_dir, remote.DOCUMENT_STORE,
+                      metrics_module.METRICS_DIR),
+        )
+        app.state.downloader = AsyncDownloader(settings)
+        try:
+            yield
+        finally:
+            await app.state.downloader.aclose()
+            app.state.executor.shutdown()
+            if configured_metrics_dir is None:
+                # the temporary directory of prepare_metrics_dir
+                shutil.rmtree(str(metrics_module.METRICS_DIR), ignore_errors=True)  # noqa: E501
+            configure_metrics_dir(configured_metrics_dir)
+
+    routes = [
+        Route("/metrics", metrics, methods=["GET"]),
+        Route("/health", health, methods=["GET"]),
+        Route("/", parse, methods=["GET", "POST"]),
+        Route("/processes", processes, methods=["POST"]),
+        Route("/batch", batch, methods=["POST"]),
+        Route("/make-template", cwl_make_template_route, methods=["GET", "POST"]),  # noqa: E501
+    ]
+    app = Starlette(
+        routes=routes,
+        middleware=[Middleware(RequestMetricsMiddleware, routes=routes)],
+        exception_handlers={Exception: error_handler_exception},
+        lifespan=lifespan,
+    )
+    app.state.batch_concurrency = batch_concurrency
+    return app
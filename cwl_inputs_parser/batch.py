@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import multiprocessing
+import sys
+import time
+from pathlib import Path
+from typing import (IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple,
+                    Union)
+
+from cwl_inputs_parser import remote
+from cwl_inputs_parser.remote import (DocumentStore, HTTPSettings,
+                                      configure_document_store, configure_http,
+                                      configure_http_cache, get_session_pool)
+from cwl_inputs_parser.utils import (dumps_json, error_record,
+                                     wf_location_to_inputs)
+
+# Number of items of a /batch request of the REST API parsed at once
+DEFAULT_BATCH_CONCURRENCY = 8
+
+
+def read_locations(file: IO[str]) -> Iterator[str]:
+    """
+    Yields the locations in a file, one per line.
+    Empty lines and lines starting with '#' are skipped.
+    """
+    for line in file:
+        location = line.strip()
+        if location and not location.startswith("#"):
+            yield location
+
+
+def parse_location(item: Tuple[int, str]) -> Dict[str, Any]:
+    """
+    Parses a workflow and returns its record:
+    {"index": 0, "location": "...", "inputs": [...], "elapsed": 0.1}
+    or, if it failed:
+    {"index": 0, "location": "...", "error": {"type": ..., "message": ...},
+     "elapsed": 0.1}
+    index is the position in the batch, and elapsed is the time taken by
+    the item in seconds.
+    """
+    index, location = item
+    record: Dict[str, Any] = {"index": index, "location": location}
+    start = time.perf_counter()
+    try:
+        record["inputs"] = wf_location_to_inputs(location).as_dict()
+    except Exception as e:
+        record["error"] = error_record(e)
+    record["elapsed"] = time.perf_counter() - start
+    return record
+
+
+def init_worker(http_settings: HTTPSettings,
+                http_cache_dir: Optional[Path],
+                document_store: Optional[DocumentStore] = None) -> None:
+    """Applies the remote fetch settings of the parent to a worker."""
+    configure_http(http_settings)
+    configure_http_cache(http_cache_dir)
+    configure_document_store(document_store)
+
+
+def iter_batch(locations: Iterable[str],
+               workers: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Parses many workflows in a process pool and yields their records
+    (see parse_location) in completion order.
+    workers is the number of processes (default: the number of CPUs);
+    with 1, the workflows are parsed in this process.
+    The HTTP settings, cache and document store of this process apply to
+    the workers.
+    """
+    items = enumerate(locations)
+    if workers == 1:
+        for item in items:
+            yield parse_location(item)
+        return
+    http_cache_dir = remote.HTTP_CACHE.cache_dir if remote.HTTP_CACHE is not None else None  # noqa: E501
+    with multiprocessing.Pool(
+        processes=workers,
+        initializer=init_worker,
+        initargs=(get_session_pool().settings, http_cache_dir, remote.DOCUMENT_STORE),  # noqa: E501
+    ) as pool:
+        for record in pool.imap_unordered(parse_location, items):
+            yield record
+
+
+def run_batch(locations: Iterable[str],
+              workers: Optional[int] = None,
+              out: Optional[IO[bytes]] = None) -> int:
+    """
+    Writes the records of the workflows as JSON Lines, as soon as each
+    workflow is parsed. Returns the number of failed workflows.
+    """
+    if out is None:
+        out = sys.stdout.buffer
+    failed = 0
+    for record in iter_batch(locations, workers):
+        if "error" in record:
+            failed += 1
+        out.write(dumps_json(record) + b"\n")
+        out.flush()
+    return failed
+
+
+def batch_locations(locations: List[str],
+                    batch_file: Optional[Union[str, Path]]) -> Iterator[str]:
+    """
+    Yields the locations of the arguments, then of the batch file
+    ('-' for stdin). Reads stdin if neither is given.
+    """
+    yield from locations
+    if batch_file is None and locations:
+        return
+    if batch_file is None or str(batch_file) == "-":
+        yield from read_locations(sys.stdin)
+    else:
+        with Path(batch_file).open(mode="r", encoding="utf-8") as f:
+            yield from read_locations(f)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import (Awaitable, Callable, Dict, Generic, Optional, Tuple,
+                    TypeVar, cast)
+
+V = TypeVar("V")
+
+
+def content_hash(content: str, uri: str) -> str:
+    """Returns the cache key of a document: sha256 of its base URI and text."""
+    hasher = hashlib.sha256()
+    hasher.update(uri.encode("utf-8"))
+    hasher.update(b"\0")
+    hasher.update(content.encode("utf-8"))
+    return hasher.hexdigest()
+
+
+@dataclass
+class CacheStats:
+    """CacheStats"""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    size: int = 0
+    max_size: int = 0
+
+
+class LRUCache(Generic[V]):
+    """
+    Thread-safe LRU cache bounded by the total size of its entries.
+    The size of each entry is given by the caller when it is stored.
+    A max_size of 0 disables the cache.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[V, int]]" = OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[V]:
+        """Returns the cached value, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, key: str, value: V, size: int = 1) -> None:
+        """Stores a value, evicting the least recently used entries."""
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+            if size > self.max_size:
+                return
+            self._entries[key] = (value, size)
+            self._size += size
+            self._evict()
+
+    def resize(self, max_size: int) -> None:
+        """Changes the maximum size, evicting entries if necessary."""
+        with self._lock:
+            self.max_size = max_size
+            self._evict()
+
+    def clear(self) -> None:
+        """Removes all entries and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+
+    def stats(self) -> CacheStats:
+        """Returns a snapshot of the cache counters."""
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._entries),
+                size=self._size,
+                max_size=self.max_size,
+            )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
+
+    def _evict(self) -> None:
+        while self._size > self.max_size and self._entries:
+            _, (_, size) = self._entries.popitem(last=False)
+            self._size -= size
+            self._evictions += 1
+
+
+class _Flight(Generic[V]):
+    """A call in flight of SingleFlight."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[V] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight(Generic[V]):
+    """
+    Coalesces the concurrent calls with the same key: the first call runs
+    the function, and the calls arriving while it runs wait for it and get
+    its result, or raise its exception. The results are not kept once the
+    call ends; use a cache for that.
+    """
+
+    def __init__(self) -> None:
+        self._flights: Dict[str, _Flight[V]] = {}
+        self._coalesced = 0
+        self._lock = threading.Lock()
+
+    def do(self, key: str, func: Callable[[], V]) -> V:
+        """Returns the result of func, or of the call in flight for key."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if flight is None:
+                flight = _Flight()
+                self._flights[key] = flight
+            else:
+                self._coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return cast(V, flight.result)
+        try:
+            flight.result = func()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def coalesced(self) -> int:
+        """Returns the number of calls that waited for a call in flight."""
+        with self._lock:
+            return self._coalesced
+
+
+class AsyncSingleFlight(Generic[V]):
+    """
+    SingleFlight for the coroutines of an event loop: the first call runs
+    the coroutine function in a task, and the calls arriving while it runs
+    await the same task. A caller that is cancelled (e.g. whose client went
+    away) does not cancel the task of the others.
+    """
+
+    def __init__(self) -> None:
+        self._flights: Dict[str, "asyncio.Future[V]"] = {}
+        self._coalesced = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[V]]) -> V:
+        """Returns the result of func, or of the call in flight for key."""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(func())
+            self._flights[key] = flight
+            flight.add_done_callback(lambda done: self._land(key, done))
+        else:
+            self._coalesced += 1
+        return await asyncio.shield(flight)
+
+    def _land(self, key: str, flight: "asyncio.Future[V]") -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.cancelled():
+            # raised to the callers, if any is still waiting
+            flight.exception()
+
+    def coalesced(self) -> int:
+        """Returns the number of calls that waited for a call in flight."""
+        return self._coalesced
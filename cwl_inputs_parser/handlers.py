@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+from weakref import WeakKeyDictionary
+
+from cwl_inputs_parser import utils
+from cwl_inputs_parser.cache import (CacheStats, LRUCache, SingleFlight,
+                                     content_hash)
+from cwl_inputs_parser.metrics import (MetricsRegistry, get_metrics,
+                                       record_error)
+from cwl_inputs_parser.utils import (InputField, Inputs, ProcessInputs,
+                                     cwl_make_template,
+                                     cwl_make_template_from_content,
+                                     dumps_json, error_record,
+                                     wf_content_to_input_fields,
+                                     wf_content_to_inputs,
+                                     wf_content_to_process_inputs,
+                                     wf_location_to_input_fields,
+                                     wf_location_to_inputs,
+                                     wf_location_to_process_inputs)
+
+# The concurrent requests for the same wf_location, or the same wf_content
+# and base_uri, share one fetch and parse
+INPUTS_FLIGHTS: SingleFlight[Inputs] = SingleFlight()
+TEMPLATE_FLIGHTS: SingleFlight[str] = SingleFlight()
+
+# The statistics of each cache already added to the metrics
+COUNTED_CACHE_STATS: "WeakKeyDictionary[LRUCache[Any], CacheStats]" = WeakKeyDictionary()  # noqa: E501
+_counted_cache_stats_lock = threading.Lock()
+
+
+def _increase(counted: int, current: int) -> int:
+    # the counters of a cache restart from 0 when it is cleared
+    return current - counted if current >= counted else current
+
+
+def collect_cache_stats(metrics: MetricsRegistry) -> None:
+    """
+    Adds the hits and misses of the in-memory caches to the metrics.
+    The counters of the metrics are incremented by the ones of the caches
+    since the last snapshot, so they do not go down when a cache is
+    cleared or replaced.
+    """
+    caches: Dict[str, LRUCache[Any]] = {
+        "inputs": utils.INPUTS_CACHE,
+        "process_inputs": utils.PROCESS_INPUTS_CACHE,
+    }
+    # the template engine is not created (nor cwltool imported) for metrics
+    template = sys.modules.get("cwl_inputs_parser.template")
+    engine = getattr(template, "TEMPLATE_ENGINE", None)
+    if engine is not None:
+        caches["template_results"] = engine.results
+        caches["shared_documents"] = engine.shared_documents
+    input_template = sys.modules.get("cwl_inputs_parser.input_template")
+    if input_template is not None:
+        caches["input_templates"] = input_template.TEMPLATE_CACHE
+    loader_context = utils.LOADER_CONTEXT
+    if loader_context is not None:
+        caches["loader_documents"] = loader_context.shared_documents
+    with _counted_cache_stats_lock:
+        for name, cache in caches.items():
+            stats = cache.stats()
+            counted = COUNTED_CACHE_STATS.get(cache, CacheStats())
+            COUNTED_CACHE_STATS[cache] = stats
+            metrics.inc("cwl_inputs_parser_cache_hits_total", _increase(counted.hits, stats.hits), cache=name)  # noqa: E501
+            metrics.inc("cwl_inputs_parser_cache_misses_total", _increase(counted.misses, stats.misses), cache=name)  # noqa: E501
+
+
+def collect_coalesced(metrics: MetricsRegistry) -> None:
+    """Adds the numbers of coalesced requests to the metrics."""
+    metrics.set_counter("cwl_inputs_parser_coalesced_requests_total", INPUTS_FLIGHTS.coalesced(), route="/")  # noqa: E501
+    metrics.set_counter("cwl_inputs_parser_coalesced_requests_total", TEMPLATE_FLIGHTS.coalesced(), route="/make-template")  # noqa: E501
+
+
+get_metrics().add_collector(collect_cache_stats)
+get_metrics().add_collector(collect_coalesced)
+
+
+def record_response_metrics(route: str, method: str, status: int, start: float) -> None:  # noqa: E501
+    """Counts a request and observes its latency since start."""
+    metrics = get_metrics()
+    metrics.inc("cwl_inputs_parser_requests_total",
+                route=route, method=method, status=status)
+    metrics.observe("cwl_inputs_parser_request_duration_seconds",
+                    time.perf_counter() - start, route=route)
+
+
+def request_base_uri(req_data: Dict[str, Any]) -> str:
+    """
+    Returns the URI the relative references of the wf_content of a request
+    are resolved against: its base_uri, or the current directory.
+    """
+    base_uri: Optional[str] = req_data.get("base_uri", None)
+    return base_uri or Path.cwd().as_uri()
+
+
+def request_to_inputs(req_data: Dict[str, Any]) -> Optional[Inputs]:
+    """
+    Parses the inputs of the wf_location or wf_content of a request, or
+    waits for the parse in flight of the same document.
+    Returns None if both are missing.
+    """
+    wf_location = req_data.get("wf_location", None)
+    wf_content = req_data.get("wf_content", None)
+    try:
+        if wf_location is not None:
+            location = wf_location.strip()
+            return INPUTS_FLIGHTS.do(
+                f"location:{location}",
+                lambda: wf_location_to_inputs(location))
+        if wf_content is not None:
+            uri = request_base_uri(req_data)
+            return INPUTS_FLIGHTS.do(
+                f"content:{content_hash(wf_content, uri)}",
+                lambda: wf_content_to_inputs(wf_content, uri))
+    except Exception as e:
+        record_error(e)
+        raise
+    return None
+
+
+def request_to_process_inputs(req_data: Dict[str, Any]) -> Optional[ProcessInputs]:  # noqa: E501
+    """
+    Parses the inputs of every process of the wf_location or wf_content of
+    a request. Returns None if both are missing.
+    """
+    wf_location = req_data.get("wf_location", None)
+    wf_content = req_data.get("wf_content", None)
+    try:
+        if wf_location is not None:
+            return wf_location_to_process_inputs(wf_location.strip())
+        if wf_content is not None:
+            return wf_content_to_process_inputs(wf_content, request_base_uri(req_data))  # noqa: E501
+    except Exception as e:
+        record_error(e)
+        raise
+    return None
+
+
+def request_to_processes_json(req_data: Dict[str, Any]) -> Tuple[int, bytes]:  # noqa: E501
+    """
+    Parses the inputs of the processes of a /processes request, and returns
+    the status and the JSON body of its response: the processes listed in
+    "ids" (default, or if empty: all), or the error message.
+    """
+    ids = req_data.get("ids", None)
+    if ids is not None and (not isinstance(ids, list) or not all(isinstance(id_, str) for id_ in ids)):  # noqa: E501
+        return 400, dumps_json({"message": "ids must be a list of process ids"})  # noqa: E501
+    ids = ids or None
+    process_inputs = request_to_process_inputs(req_data)
+    if process_inputs is None:
+        return 400, dumps_json({"message": "Missing arguments"})
+    unknown_ids = process_inputs.unknown_ids(ids or [])
+    if unknown_ids:
+        return 400, dumps_json({"message": f"Unknown process ids: {', '.join(unknown_ids)}"})  # noqa: E501
+    return 200, process_inputs.as_json_bytes(ids)
+
+
+def request_to_input_fields(req_data: Dict[str, Any]) -> Optional[Iterator[InputField]]:  # noqa: E501
+    """
+    Streams the InputFields of the wf_location or wf_content of a request.
+    The document is loaded and its types are checked before it returns.
+    Returns None if both are missing.
+    """
+    wf_location = req_data.get("wf_location", None)
+    wf_content = req_data.get("wf_content", None)
+    try:
+        if wf_location is not None:
+            return wf_location_to_input_fields(wf_location.strip())
+        if wf_content is not None:
+            return wf_content_to_input_fields(wf_content, request_base_uri(req_data))  # noqa: E501
+    except Exception as e:
+        record_error(e)
+        raise
+    return None
+
+
+def request_to_template(req_data: Dict[str, Any]) -> Optional[str]:
+    """
+    Creates the template of the wf_location or wf_content of a request, or
+    waits for the one in flight of the same document.
+    Returns None if both are missing.
+    """
+    wf_location = req_data.get("wf_location", None)
+    wf_content = req_data.get("wf_content", None)
+    try:
+        if wf_location is not None:
+            location = wf_location.strip()
+            return TEMPLATE_FLIGHTS.do(
+                f"location:{location}",
+                lambda: cwl_make_template(location))
+        if wf_content is not None:
+            uri = request_base_uri(req_data)
+            return TEMPLATE_FLIGHTS.do(
+                f"content:{content_hash(wf_content, uri)}",
+                lambda: cwl_make_template_from_content(wf_content, uri))
+    except Exception as e:
+        record_error(e)
+        raise
+    return None
+
+
+def parse_batch_item(item: Tuple[int, Any]) -> Dict[str, Any]:
+    """
+    Parses an item of a batch request and returns its record:
+    {"index": 0, "inputs": [...], "elapsed": 0.1}
+    or, if it failed:
+    {"index": 0, "error": {"type": ..., "message": ...}, "elapsed": 0.1}
+    """
+    index, req_data = item
+    record: Dict[str, Any] = {"index": index}
+    start = time.perf_counter()
+    try:
+        if not isinstance(req_data, dict):
+            raise ValueError("The item must be an object with wf_location or wf_content")  # noqa: E501
+        inputs = request_to_inputs(req_data)
+        if inputs is None:
+            raise ValueError("Missing arguments")
+        record["inputs"] = inputs.as_dict()
+    except Exception as e:
+        record["error"] = error_record(e)
+    record["elapsed"] = time.perf_counter() - start
+    return record
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import io
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Tuple
+
+from ruamel.yaml.comments import CommentedMap
+from ruamel.yaml.main import YAML
+from ruamel.yaml.representer import RoundTripRepresenter
+
+from cwl_inputs_parser.cache import LRUCache, content_hash
+from cwl_inputs_parser.remote import RemoteFetcher
+from cwl_inputs_parser.utils import (InputField, Inputs, UnsupportedValueError,
+                                     get_loader_context)
+
+# Example values of cwltool --make-template
+EXAMPLE_VALUES = {
+    "boolean": False,
+    "int": 0,
+    "string": "a_string",
+    "Any": "null",
+}
+EXAMPLE_PATHS = {
+    "File": "a/file/path",
+    "Directory": "a/directory/path",
+}
+SCALAR_DEFAULT_TYPES = (bool, int, float, str)
+# Size in bytes of the cached templates rendered from the parsed Inputs
+TEMPLATE_CACHE_SIZE = 16 * 1024 * 1024
+
+
+@dataclass
+class TemplateResult:
+    """
+    TemplateResult
+    documents maps the URL of each fetched document to its content hash.
+    """
+    template: str
+    documents: Dict[str, str]
+
+
+# Templates of make_cached_template, keyed by the root document (see
+# cwl_make_template)
+TEMPLATE_CACHE: LRUCache[TemplateResult] = LRUCache(TEMPLATE_CACHE_SIZE)
+
+
+class TemplateRepresenter(RoundTripRepresenter):
+    """Represents None as 'null' in the templates."""
+
+
+def _represent_none(self: Any, data: Any) -> Any:
+    """Force clean representation of 'null'."""
+    return self.represent_scalar("tag:yaml.org,2002:null", "null")
+
+
+TemplateRepresenter.add_representer(type(None), _represent_none)
+
+_yaml = YAML()
+_yaml.Representer = TemplateRepresenter
+_yaml.default_flow_style = False
+_yaml.indent = 4
+_yaml.block_seq_indent = 2
+# the YAML dumper keeps its state while dumping
+_yaml_lock = threading.Lock()
+
+
+def dump_template(template: Any) -> str:
+    """Dumps a template in the YAML layout of cwltool --make-template."""
+    buf = io.BytesIO()
+    with _yaml_lock:
+        _yaml.dump(template, buf)
+    return buf.getvalue().decode("utf-8")
+
+
+def _example_value(type_: str) -> Any:
+    if type_ in EXAMPLE_PATHS:
+        return CommentedMap([("class", type_), ("path", EXAMPLE_PATHS[type_])])  # noqa: E501
+    return EXAMPLE_VALUES[type_]
+
+
+def example_input(field: InputField) -> Tuple[Any, str]:
+    """
+    Returns the example value and the comment of a field, as
+    generate_example_input of cwltool does for its type.
+    Raises UnsupportedValueError for the defaults that cwltool renders from
+    the loaded document (File and Directory objects, arrays and maps), as
+    InputField does not keep them as they are.
+    """
+    type_ = field.type
+    default = field.default
+    if type_ not in EXAMPLE_VALUES and type_ not in EXAMPLE_PATHS:
+        raise UnsupportedValueError(f"The type {type_} does not support by the input template")  # noqa: E501
+    if default is not None and (
+            type_ in EXAMPLE_PATHS
+            or not isinstance(default, SCALAR_DEFAULT_TYPES)
+            or field.array):
+        raise UnsupportedValueError(f"The default value of {field.id} does not support by the input template")  # noqa: E501
+    if field.array:
+        example: Any = [_example_value(type_)]
+        comment = f'array of type "{type_}"'
+    elif default:
+        # cwltool treats falsy defaults (false, 0, "") as no default
+        example = default
+        comment = f'default value of type "{type_}".'
+    else:
+        example = _example_value(type_)
+        comment = f'type "{type_}"'
+    if not field.required:
+        comment = f"{comment} (optional)"
+    return example, comment
+
+
+def generate_input_template(inputs: Inputs) -> CommentedMap:
+    """
+    Generates the input template of cwltool --make-template from the fields
+    of Inputs, without loading the document with cwltool.
+    """
+    if inputs.is_graph and inputs.process_id != "main":
+        # cwltool picks the process of a $graph by #main only
+        raise UnsupportedValueError("The $graph field without #main does not support by the input template")  # noqa: E501
+    template = CommentedMap()
+    for field in inputs.fields:
+        value, comment = example_input(field)
+        # each input is inserted at the top like cwltool
+        template.insert(0, str(field.id).split("/")[-1], value, comment)
+    return template
+
+
+def make_input_template(inputs: Inputs) -> str:
+    """
+    Returns the input template of Inputs in the YAML of cwltool
+    --make-template. Raises UnsupportedValueError for the fields it cannot
+    render like cwltool.
+    """
+    return dump_template(generate_input_template(inputs))
+
+
+def make_cached_template(key: str,
+                         load: Callable[[Dict[str, str]], Inputs],
+                         use_cache: bool = True) -> str:
+    """
+    Returns the input template of the Inputs returned by load, which
+    records the documents it fetches in the given dict (URL: text).
+    The templates are cached with the content hashes of these documents,
+    and a cached template is used only while none of them has changed, as
+    in TemplateEngine.
+    """
+    if use_cache:
+        cached = TEMPLATE_CACHE.get(key)
+        if cached is not None:
+            fetcher = RemoteFetcher(shared_cache=get_loader_context().shared_documents)  # noqa: E501
+            if fetcher.unchanged(cached.documents):
+                return cached.template
+    fetched: Dict[str, str] = {}
+    template = make_input_template(load(fetched))
+    if use_cache:
+        result = TemplateResult(
+            template=template,
+            documents={url: content_hash(text, url)
+                       for url, text in fetched.items()},
+        )
+        size = len(template) + sum(len(url) + 64 for url in fetched)
+        TEMPLATE_CACHE.put(key, result, size=size)
+    return template
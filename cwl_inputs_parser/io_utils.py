@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import os
+import tempfile
+from pathlib import Path
+
+
+def write_text_atomic(path: Path, text: str) -> None:
+    """Replaces a file atomically."""
+    fd, tmp_name = tempfile.mkstemp(dir=str(path.parent))
+    try:
+        with os.fdopen(fd, mode="w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_name, str(path))
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
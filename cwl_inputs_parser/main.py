@@ -5,8 +5,13 @@ import os
 import sys
 from typing import Tuple, Union
 
-from cwl_inputs_parser.server import create_app, fix_errorhandler
-from cwl_inputs_parser.utils import wf_location_to_inputs
+from cwl_inputs_parser.batch import (DEFAULT_BATCH_CONCURRENCY,
+                                     batch_locations, run_batch)
+from cwl_inputs_parser.remote import (DirectoryStore, HTTPSettings,
+                                      configure_document_store, configure_http,
+                                      configure_http_cache, populate_store)
+from cwl_inputs_parser.tracing import JSONFileExporter, configure_span_exporter
+from cwl_inputs_parser.utils import wf_location_to_input_fields, write_json
 
 
 def arg_parser() -> argparse.ArgumentParser:
@@ -14,15 +19,27 @@ def arg_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "workflow_location",
-        help="The location of workflow file (local path or remote URL)",
-        default="",
-        nargs="?"
+        help="The location of workflow file (local path or remote URL); "
+        "several locations in batch mode",
+        nargs="*"
     )
     parser.add_argument(
         "-s", "--server",
         help="Run in REST API server mode",
         action="store_true"
     )
+    parser.add_argument(
+        "--asgi",
+        help="Run the REST API server on asyncio with uvicorn "
+        "(requires the 'async' extra)",
+        action="store_true"
+    )
+    parser.add_argument(
+        "--production",
+        help="Run the REST API server with pre-forked gunicorn workers "
+        "(requires the 'production' extra)",
+        action="store_true"
+    )
     parser.add_argument(
         "--host",
         help="Host name of the REST API server",
@@ -33,6 +50,106 @@ def arg_parser() -> argparse.ArgumentParser:
         help="Port number of the REST API server",
         default=8080
     )
+    parser.add_argument(
+        "--bind",
+        help="Address of the production server (default: HOST:PORT)",
+        default=None
+    )
+    parser.add_argument(
+        "--backlog",
+        help="Maximum number of pending connections of the production server",
+        type=int,
+        default=2048
+    )
+    parser.add_argument(
+        "--graceful-timeout",
+        help="Seconds the production server waits for running requests "
+        "on restarts and shutdown",
+        type=int,
+        default=30
+    )
+    parser.add_argument(
+        "--batch-concurrency",
+        help="Number of items of a /batch request parsed at once "
+        "in server mode",
+        type=int,
+        default=DEFAULT_BATCH_CONCURRENCY
+    )
+    parser.add_argument(
+        "--trace-file",
+        help="Append the trace spans of each request to this file as "
+        "JSON Lines in server mode",
+        default=None
+    )
+    parser.add_argument(
+        "-b", "--batch",
+        help="Parse many workflows in parallel and output JSON Lines",
+        action="store_true"
+    )
+    parser.add_argument(
+        "--batch-file",
+        help="File listing the workflow locations, one per line "
+        "('-' for stdin; implies --batch)",
+        default=None
+    )
+    parser.add_argument(
+        "-w", "--workers",
+        help="Number of worker processes in batch mode, of the production "
+        "server, or of the processes parsing the documents of the ASGI "
+        "server (default: the number of CPUs)",
+        type=int,
+        default=None
+    )
+    parser.add_argument(
+        "--http-cache-dir",
+        help="Directory of the on-disk cache of remote documents "
+        "(default: $CWL_INPUTS_PARSER_HTTP_CACHE_DIR, disabled if unset)",
+        default=None
+    )
+    parser.add_argument(
+        "--document-store",
+        help="Directory of the local store of remote documents, consulted "
+        "before the network (default: $CWL_INPUTS_PARSER_DOCUMENT_STORE)",
+        default=None
+    )
+    parser.add_argument(
+        "--populate-store",
+        help="Store the remote workflows of the locations (or of "
+        "--batch-file) and all the documents they reference in this "
+        "directory, to be used as --document-store",
+        metavar="STORE_DIR",
+        default=None
+    )
+    parser.add_argument(
+        "--connect-timeout",
+        help="Connect timeout in seconds of remote fetches",
+        type=float,
+        default=HTTPSettings.connect_timeout
+    )
+    parser.add_argument(
+        "--read-timeout",
+        help="Read timeout in seconds of remote fetches",
+        type=float,
+        default=HTTPSettings.read_timeout
+    )
+    parser.add_argument(
+        "--max-connections-per-host",
+        help="Maximum number of concurrent connections to a remote host",
+        type=int,
+        default=HTTPSettings.max_connections_per_host
+    )
+    parser.add_argument(
+        "--retries",
+        help="Number of retries of failed remote fetches",
+        type=int,
+        default=HTTPSettings.retries
+    )
+    parser.add_argument(
+        "--retry-backoff",
+        help="Backoff factor in seconds between retries of remote fetches",
+        type=float,
+        default=HTTPSettings.backoff_factor
+    )
     parser.add_argument(
         "-d", "--debug",
         help="Run in debug mode",
@@ -61,22 +178,120 @@ def app_params(args: argparse.Namespace) -> Tuple[str, int, bool]:
     return args.host, args.port, debug
 
 
+def http_settings(args: argparse.Namespace) -> HTTPSettings:
+    """Return the settings of the pooled HTTP session."""
+    return HTTPSettings(
+        connect_timeout=args.connect_timeout,
+        read_timeout=args.read_timeout,
+        max_connections_per_host=args.max_connections_per_host,
+        retries=args.retries,
+        backoff_factor=args.retry_backoff,
+    )
+
+
+def run_asgi_server(args: argparse.Namespace) -> None:
+    """Run the REST API server with uvicorn."""
+    try:
+        import uvicorn
+
+        from cwl_inputs_parser.asgi import create_asgi_app
+    except ImportError:
+        print("[ERROR] --asgi requires the 'async' extra: "
+              "pip install cwl-inputs-parser[async]")
+        sys.exit(1)
+    app = create_asgi_app(http_settings(args), args.workers,
+                          args.batch_concurrency)
+    host, port, debug = app_params(args)
+    uvicorn.run(app, host=host, port=int(port),
+                log_level="debug" if debug else "info")
+
+
+def run_flask_server(args: argparse.Namespace) -> None:
+    """Run the REST API server with Flask's development server."""
+    # Flask is imported only in server mode
+    from cwl_inputs_parser.server import create_app
+    app = create_app(http_settings(args), args.batch_concurrency)
+    host, port, debug = app_params(args)
+    app.run(host=host, port=port, debug=debug)
+
+
+def run_production_server(args: argparse.Namespace) -> None:
+    """Run the REST API server with pre-forked gunicorn workers."""
+    from cwl_inputs_parser.metrics import prepare_metrics_dir
+    from cwl_inputs_parser.server import create_app
+    try:
+        from cwl_inputs_parser.production import ProductionServer, warm_up
+    except ImportError:
+        print("[ERROR] --production requires the 'production' extra: "
+              "pip install cwl-inputs-parser[production]")
+        sys.exit(1)
+    host, port, debug = app_params(args)
+    app = create_app(http_settings(args), args.batch_concurrency)
+    prepare_metrics_dir()
+    warm_up()
+    ProductionServer(app, {
+        "bind": args.bind or f"{host}:{port}",
+        "backlog": args.backlog,
+        "workers": args.workers or os.cpu_count() or 1,
+        "graceful_timeout": args.graceful_timeout,
+        "loglevel": "debug" if debug else "info",
+    }).run()
+
+
+def run_populate_store(args: argparse.Namespace) -> None:
+    """Populate a document store and print the stored URLs."""
+    configure_http(http_settings(args))
+    locations = batch_locations(args.workflow_location, args.batch_file)
+    stored, failed = populate_store(locations, DirectoryStore(args.populate_store))  # noqa: E501
+    for url in stored:
+        print(url)
+    for location in failed:
+        print(f"[ERROR] Failed to fetch {location}", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+
 def main() -> None:
     """Main function."""
     parser = arg_parser()
     args = parser.parse_args()
-    if args.server:
-        app = create_app()
-        app = fix_errorhandler(app)
-        host, port, debug = app_params(args)
-        app.run(host=host, port=port, debug=debug)
+    if args.http_cache_dir is not None:
+        configure_http_cache(args.http_cache_dir)
+    if args.document_store is not None:
+        configure_document_store(args.document_store)
+    if args.trace_file is not None:
+        configure_span_exporter(JSONFileExporter(args.trace_file))
+    if args.server and args.asgi and args.production:
+        print("[ERROR] --production serves the Flask app and can not be used with --asgi.\n")  # noqa: E501
+        parser.print_help()
+        sys.exit(1)
+    elif args.populate_store is not None:
+        run_populate_store(args)
+    elif args.server and args.production:
+        run_production_server(args)
+    elif args.server and args.asgi:
+        run_asgi_server(args)
+    elif args.server:
+        run_flask_server(args)
+    elif args.batch or args.batch_file is not None:
+        configure_http(http_settings(args))
+        locations = batch_locations(args.workflow_location, args.batch_file)
+        failed = run_batch(locations, workers=args.workers)
+        if failed:
+            sys.exit(1)
     else:
         if not args.workflow_location:
             print("[ERROR] The location of the workflow file is not specified.\n")  # noqa: E501
             parser.print_help()
             sys.exit(1)
-        inputs = wf_location_to_inputs(args.workflow_location)
-        print(inputs.as_json())
+        if len(args.workflow_location) > 1:
+            print("[ERROR] Multiple workflow locations require --batch.\n")  # noqa: E501
+            parser.print_help()
+            sys.exit(1)
+        configure_http(http_settings(args))
+        fields = wf_location_to_input_fields(args.workflow_location[0])
+        write_json(fields, sys.stdout.buffer, indent=True)
+        sys.stdout.buffer.write(b"\n")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from cwl_inputs_parser.io_utils import write_text_atomic
+
+# (name, sorted label pairs)
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+# Upper bounds in seconds of the buckets of the latency histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # noqa: E501
+
+# name: (type, help)
+METRICS = {
+    "cwl_inputs_parser_requests_total": ("counter", "Requests by route, method and status."),  # noqa: E501
+    "cwl_inputs_parser_request_duration_seconds": ("histogram", "Latency of the requests by route."),  # noqa: E501
+    "cwl_inputs_parser_requests_in_flight": ("gauge", "Requests being served."),  # noqa: E501
+    "cwl_inputs_parser_remote_fetch_duration_seconds": ("histogram", "Latency of the remote fetches by host."),  # noqa: E501
+    "cwl_inputs_parser_remote_fetch_bytes_total": ("counter", "Bytes of the remote fetches by host."),  # noqa: E501
+    "cwl_inputs_parser_cache_hits_total": ("counter", "Cache hits by cache."),  # noqa: E501
+    "cwl_inputs_parser_cache_misses_total": ("counter", "Cache misses by cache."),  # noqa: E501
+    "cwl_inputs_parser_coalesced_requests_total": ("counter", "Requests that shared the parse of a concurrent identical request, by route."),  # noqa: E501
+    "cwl_inputs_parser_errors_total": ("counter", "Parse errors by type and reason."),  # noqa: E501
+    "cwl_inputs_parser_worker_rss_bytes": ("gauge", "Resident set size of each worker process."),  # noqa: E501
+}
+
+METRICS_DIR_ENV = "CWL_INPUTS_PARSER_METRICS_DIR"
+ARCHIVE_NAME = "archived.json"
+# Minimum seconds between two writes of the samples by flush_soon()
+FLUSH_INTERVAL = 1.0
+
+
+def _key(name: str, labels: Dict[str, Any]) -> MetricKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def worker_rss() -> int:
+    """Returns the resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm", encoding="utf-8") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # the peak, in KiB on Linux
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class MetricsRegistry:
+    """
+    Thread-safe counters, gauges and histograms of this process.
+    The collectors are called on each snapshot to add the samples kept
+    elsewhere, like the statistics of the caches.
+    """
+
+    def __init__(self) -> None:
+        self._counters: Dict[MetricKey, float] = {}
+        self._gauges: Dict[MetricKey, float] = {}
+        # bucket counts (the last one is +Inf), then the sum
+        self._histograms: Dict[MetricKey, List[float]] = {}
+        self._collectors: List[Callable[["MetricsRegistry"], None]] = []
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        """Increments a counter."""
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def set_counter(self, name: str, value: float, **labels: Any) -> None:
+        """Sets a counter kept elsewhere, e.g. by a collector."""
+        with self._lock:
+            self._counters[_key(name, labels)] = value
+
+    def add_gauge(self, name: str, value: float, **labels: Any) -> None:
+        """Adds a value (or subtracts a negative one) to a gauge."""
+        key = _key(name, labels)
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        """Sets a gauge."""
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Observes a value of a histogram."""
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = [0.0] * (len(LATENCY_BUCKETS) + 2)
+                self._histograms[key] = histogram
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    histogram[i] += 1
+                    break
+            else:
+                histogram[len(LATENCY_BUCKETS)] += 1
+            histogram[-1] += value
+
+    def add_collector(self, collector: Callable[["MetricsRegistry"], None]) -> None:  # noqa: E501
+        """Adds a function called on each snapshot."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def reset(self) -> None:
+        """Clears the samples, e.g. the ones inherited by a forked worker."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns the samples of this process as plain JSON types."""
+        with self._lock:
+            collectors = list(self._collectors)
+        for collector in collectors:
+            collector(self)
+        self.set_gauge("cwl_inputs_parser_worker_rss_bytes", worker_rss(), pid=os.getpid())  # noqa: E501
+        with self._lock:
+            return {
+                "counters": [[name, dict(labels), value] for (name, labels), value in self._counters.items()],  # noqa: E501
+                "gauges": [[name, dict(labels), value] for (name, labels), value in self._gauges.items()],  # noqa: E501
+                "histograms": [[name, dict(labels), list(values)] for (name, labels), values in self._histograms.items()],  # noqa: E501
+            }
+
+
+METRICS_REGISTRY = MetricsRegistry()
+METRICS_DIR: Optional[Path] = None
+if os.environ.get(METRICS_DIR_ENV):
+    METRICS_DIR = Path(os.environ[METRICS_DIR_ENV])
+_metrics_dir_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Returns the metrics registry of this process."""
+    return METRICS_REGISTRY
+
+
+def configure_metrics_dir(metrics_dir: Optional[Union[str, Path]]) -> None:
+    """
+    Sets the directory shared by the worker processes, where each of them
+    writes its samples, or disables the sharing by None.
+    """
+    global METRICS_DIR
+    with _metrics_dir_lock:
+        METRICS_DIR = Path(metrics_dir) if metrics_dir is not None else None
+        if METRICS_DIR is not None:
+            METRICS_DIR.mkdir(parents=True, exist_ok=True)
+
+
+def prepare_metrics_dir() -> None:
+    """
+    Sets up the directory where the workers share their metrics:
+    $CWL_INPUTS_PARSER_METRICS_DIR, or a temporary directory.
+    The samples of a previous run are removed.
+    """
+    metrics_dir = METRICS_DIR or Path(tempfile.mkdtemp(prefix="cwl-inputs-parser-metrics-"))  # noqa: E501
+    configure_metrics_dir(metrics_dir)
+    for path in metrics_dir.glob("*.json"):
+        path.unlink()
+
+
+def _write_json(path: Path, obj: Any) -> None:
+    write_text_atomic(path, json.dumps(obj))
+
+
+def _read_json(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return dict(json.loads(path.read_text(encoding="utf-8")))
+    except (OSError, ValueError):
+        return None
+
+
+_last_flush = 0.0
+_flush_timer: Optional[threading.Timer] = None
+_flush_lock = threading.Lock()
+
+
+def reset_flush() -> None:
+    """
+    Forgets the last write and the pending one, e.g. the ones inherited by
+    a forked worker, whose timer thread is not.
+    """
+    global _last_flush, _flush_timer
+    with _flush_lock:
+        _last_flush = 0.0
+        _flush_timer = None
+
+
+def flush() -> None:
+    """Writes the samples of this process to the shared directory."""
+    global _last_flush
+    metrics_dir = METRICS_DIR
+    if metrics_dir is None:
+        return
+    with _flush_lock:
+        _last_flush = time.monotonic()
+    _write_json(metrics_dir.joinpath(f"{os.getpid()}.json"), get_metrics().snapshot())  # noqa: E501
+
+
+def _timed_flush() -> None:
+    global _flush_timer
+    with _flush_lock:
+        _flush_timer = None
+    flush()
+
+
+def flush_soon() -> None:
+    """
+    Writes the samples of this process to the shared directory at most
+    every FLUSH_INTERVAL seconds: now if the last write is older, or else
+    once at the end of the interval, so the samples of the other workers
+    seen by collect() are at most FLUSH_INTERVAL behind.
+    """
+    global _last_flush, _flush_timer
+    if METRICS_DIR is None:
+        return
+    with _flush_lock:
+        if _flush_timer is not None:
+            return
+        delay = _last_flush + FLUSH_INTERVAL - time.monotonic()
+        if delay > 0:
+            _flush_timer = threading.Timer(delay, _timed_flush)
+            _flush_timer.daemon = True
+            _flush_timer.start()
+            return
+        # claims the write from the concurrent requests
+        _last_flush = time.monotonic()
+    flush()
+
+
+def merge(snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merges the snapshots of processes: the samples with the same labels are
+    summed up. For the gauges, the requests in flight add up, and the RSS
+    of each worker is kept apart by its pid label.
+    """
+    merged: Dict[str, Dict[MetricKey, Any]] = {"counters": {}, "gauges": {}, "histograms": {}}  # noqa: E501
+    for snapshot in snapshots:
+        for kind in ["counters", "gauges"]:
+            for name, labels, value in snapshot.get(kind, []):
+                key = _key(name, labels)
+                merged[kind][key] = merged[kind].get(key, 0.0) + value
+        for name, labels, values in snapshot.get("histograms", []):
+            key = _key(name, labels)
+            total = merged["histograms"].get(key)
+            if total is None:
+                merged["histograms"][key] = list(values)
+            else:
+                merged["histograms"][key] = [a + b for a, b in zip(total, values)]  # noqa: E501
+    return {
+        kind: [[name, dict(labels), value] for (name, labels), value in samples.items()]  # noqa: E501
+        for kind, samples in merged.items()
+    }
+
+
+def mark_process_dead(pid: int) -> None:
+    """
+    Moves the counters and histograms of a dead worker into the archive of
+    the shared directory, so they keep counting, and drops its gauges.
+    Called by the parent process when a worker exits.
+    """
+    metrics_dir = METRICS_DIR
+    if metrics_dir is None:
+        return
+    path = metrics_dir.joinpath(f"{pid}.json")
+    snapshot = _read_json(path)
+    if snapshot is None:
+        return
+    snapshot["gauges"] = []
+    archive_path = metrics_dir.joinpath(ARCHIVE_NAME)
+    archive = _read_json(archive_path) or {}
+    _write_json(archive_path, merge([archive, snapshot]))
+    path.unlink()
+
+
+def collect() -> Dict[str, Any]:
+    """
+    Returns the samples of all the workers: the ones of this process merged
+    with the files of the shared directory, if it is configured.
+    """
+    metrics_dir = METRICS_DIR
+    if metrics_dir is None:
+        return get_metrics().snapshot()
+    flush()
+    snapshots = []
+    for path in sorted(metrics_dir.glob("*.json")):
+        snapshot = _read_json(path)
+        if snapshot is not None:
+            snapshots.append(snapshot)
+    return merge(snapshots)
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))  # noqa: E501
+        for name, value in sorted(labels.items()))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _sort_key(sample: List[Any]) -> Tuple[str, List[Tuple[str, str]]]:
+    return sample[0], sorted(sample[1].items())
+
+
+def render(samples: Dict[str, Any]) -> str:
+    """Formats samples in the Prometheus text exposition format."""
+    by_name: Dict[str, List[str]] = {}
+    for kind in ["counters", "gauges"]:
+        for name, labels, value in sorted(samples[kind], key=_sort_key):
+            by_name.setdefault(name, []).append(
+                f"{name}{_format_labels(labels)} {_format_value(value)}")
+    for name, labels, values in sorted(samples["histograms"], key=_sort_key):  # noqa: E501
+        lines = by_name.setdefault(name, [])
+        cumulative = 0.0
+        bounds = [repr(bound) for bound in LATENCY_BUCKETS] + ["+Inf"]
+        for bound, count in zip(bounds, values[:-1]):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(dict(labels, le=bound))} {_format_value(cumulative)}")  # noqa: E501
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(values[-1])}")  # noqa: E501
+        lines.append(f"{name}_count{_format_labels(labels)} {_format_value(cumulative)}")  # noqa: E501
+    output = []
+    for name in sorted(by_name):
+        type_, help_ = METRICS.get(name, ("untyped", name))
+        output.append(f"# HELP {name} {help_}")
+        output.append(f"# TYPE {name} {type_}")
+        output.extend(by_name[name])
+    return "\n".join(output) + "\n"
+
+
+def record_error(e: BaseException) -> None:
+    """
+    Counts a parse error. The reason of an UnsupportedValueError is its
+    message, which names the unsupported construct; the other errors (e.g.
+    the ValidationException of schema-salad, whose messages quote the
+    document) are counted by type only.
+    """
+    type_ = type(e).__name__
+    reason = str(e) if type_ == "UnsupportedValueError" else type_
+    get_metrics().inc("cwl_inputs_parser_errors_total", type=type_, reason=reason)  # noqa: E501
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+from cwl_utils.parser.cwl_v1_2 import (CommandInputArraySchema,
+                                       CommandInputEnumSchema,
+                                       CommandInputRecordSchema,
+                                       InputArraySchema, InputRecordSchema)
+
+TYPICAL_TYPES = frozenset(
+    ["boolean", "int", "string", "File", "stdin", "Directory", "Any"])
+ARRAY_ITEM_TYPES = frozenset(
+    ["boolean", "int", "string", "File", "Directory", "Any"])
+
+UNSUPPORTED_FORMAT = "The type field contains an unsupported format"
+UNSUPPORTED_UNION = "The union field does not support by cwl-inputs-parser"
+
+
+@dataclass(frozen=True)
+class TypeDescriptor:
+    """
+    Canonical form of a CWL type expression.
+    kind is one of TYPICAL_TYPES, "command_input_array", "input_array"
+    or "unsupported". type is the type unwrapped from [T] / [null, T]
+    unions, and error is the message of an unsupported type.
+    """
+    kind: str
+    type: Any = None
+    required: bool = True
+    error: Optional[str] = None
+
+
+def _unsupported(error: str) -> TypeDescriptor:
+    return TypeDescriptor(kind="unsupported", error=error)
+
+
+_TYPICAL_DESCRIPTORS = {
+    name: TypeDescriptor(kind=name, type=name) for name in TYPICAL_TYPES
+}
+_OPTIONAL_DESCRIPTORS = {
+    name: TypeDescriptor(kind=name, type=name, required=False)
+    for name in TYPICAL_TYPES
+}
+_UNSUPPORTED_FORMAT = _unsupported(UNSUPPORTED_FORMAT)
+_UNSUPPORTED_UNION = _unsupported(UNSUPPORTED_UNION)
+
+
+def schema_defs(cwl_obj: Any) -> Dict[str, Any]:
+    """
+    Returns the named types of the SchemaDefRequirement of a process by
+    their names, the URIs that cwl-utils puts in the type fields (e.g.
+    "file:///path/tool.cwl#FileArray").
+    """
+    types: Dict[str, Any] = {}
+    for requirement in getattr(cwl_obj, "requirements", None) or []:
+        if getattr(requirement, "class_", None) != "SchemaDefRequirement":
+            continue
+        for schema in requirement.types or []:
+            name = getattr(schema, "name", None)
+            if isinstance(name, str):
+                types[name] = schema
+    return types
+
+
+class TypeNormalizer:
+    """
+    Turns the type field of an input parameter into a TypeDescriptor.
+    The normalizer is per document: the named types of its
+    SchemaDefRequirement (see schema_defs) are resolved by name, once each,
+    and the descriptors of the type names and the unsupported types are
+    shared constants.
+    """
+
+    def __init__(self, named_types: Optional[Mapping[str, Any]] = None) -> None:  # noqa: E501
+        self.named_types = named_types if named_types is not None else {}
+        # name -> descriptor of the named types
+        self._memo: Dict[str, TypeDescriptor] = {}
+
+    def normalize(self, type_: Any) -> TypeDescriptor:
+        """Returns the descriptor of a type expression."""
+        cls = type_.__class__
+        if cls is str:
+            return self._name(type_)
+        if cls is list:
+            return self._union(type_)
+        if isinstance(type_, str):
+            return self._name(type_)
+        if isinstance(type_, list):
+            return self._union(type_)
+        return _dispatch(cls)(type_)
+
+    def _name(self, name: str) -> TypeDescriptor:
+        descriptor = _TYPICAL_DESCRIPTORS.get(name)
+        if descriptor is not None:
+            return descriptor
+        descriptor = self._memo.get(name)
+        if descriptor is not None:
+            return descriptor
+        schema = self.named_types.get(name)
+        if schema is None:
+            return _UNSUPPORTED_FORMAT
+        # a type that refers to itself is not supported
+        self._memo[name] = _UNSUPPORTED_FORMAT
+        descriptor = self.normalize(schema)
+        self._memo[name] = descriptor
+        return descriptor
+
+    def _union(self, types: List[Any]) -> TypeDescriptor:
+        n_types = len(types)
+        if n_types == 1:
+            type_ = types[0]
+            if isinstance(type_, str):
+                return self._name(type_)
+            # the items of an array unwrapped from [T] are not checked
+            if isinstance(type_, CommandInputArraySchema):
+                return TypeDescriptor(kind="command_input_array", type=type_)  # noqa: E501
+            if isinstance(type_, InputArraySchema):
+                return TypeDescriptor(kind="input_array", type=type_)
+            return _UNSUPPORTED_FORMAT
+        if n_types == 2 and "null" in types:
+            # [null, T] and [T, null]
+            first, second = types
+            type_ = second if second != "null" else first
+            if isinstance(type_, str):
+                optional = _OPTIONAL_DESCRIPTORS.get(type_)
+                if optional is not None:
+                    return optional
+                descriptor = self._name(type_)
+                if descriptor.error is not None:
+                    return descriptor
+                return replace(descriptor, required=False)
+            return _UNSUPPORTED_FORMAT
+        # [TODO] not support
+        return _UNSUPPORTED_UNION
+
+
+def _command_input_array(schema: CommandInputArraySchema) -> TypeDescriptor:
+    if schema.items not in ARRAY_ITEM_TYPES:
+        return _UNSUPPORTED_FORMAT
+    return TypeDescriptor(kind="command_input_array", type=schema)
+
+
+def _input_array(schema: InputArraySchema) -> TypeDescriptor:
+    if isinstance(schema.items, InputRecordSchema):
+        # [TODO] not support
+        return _unsupported("The InputRecordSchema field in the InputArraySchema field does not support by cwl-inputs-parser")  # noqa: E501
+    if schema.items not in ARRAY_ITEM_TYPES:
+        return _UNSUPPORTED_FORMAT
+    return TypeDescriptor(kind="input_array", type=schema)
+
+
+def _not_supported(name: str) -> Callable[[Any], TypeDescriptor]:
+    # [TODO] not support
+    descriptor = _unsupported(f"The {name} field does not support by cwl-inputs-parser")  # noqa: E501
+    return lambda schema: descriptor
+
+
+_DISPATCH_TABLE: Dict[type, Callable[[Any], TypeDescriptor]] = {
+    CommandInputArraySchema: _command_input_array,
+    CommandInputEnumSchema: _not_supported("CommandInputEnumSchema"),
+    CommandInputRecordSchema: _not_supported("CommandInputRecordSchema"),
+    InputArraySchema: _input_array,
+    InputRecordSchema: _not_supported("InputRecordSchema"),
+}
+
+
+def _dispatch(cls: type) -> Callable[[Any], TypeDescriptor]:
+    """Looks up the dispatch table by the class or its bases."""
+    for base in cls.__mro__:
+        handler = _DISPATCH_TABLE.get(base)
+        if handler is not None:
+            return handler
+    return lambda schema: _UNSUPPORTED_FORMAT
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import gc
+from pathlib import Path
+from typing import Any, Dict
+
+from cwltool.process import get_schema
+from flask import Flask
+from gunicorn.app.base import BaseApplication  # type: ignore
+from schema_salad.schema import get_metaschema
+
+from cwl_inputs_parser.metrics import (flush, get_metrics, mark_process_dead,
+                                       reset_flush)
+from cwl_inputs_parser.remote import configure_http, get_session_pool
+from cwl_inputs_parser.template import get_template_engine
+from cwl_inputs_parser.utils import wf_content_to_inputs
+
+CWL_VERSIONS = ["v1.0", "v1.1", "v1.2"]
+
+WARM_UP_DOCUMENT = """\
+cwlVersion: v1.2
+class: CommandLineTool
+baseCommand: echo
+inputs:
+  message:
+    type: string
+outputs: []
+"""
+
+
+def warm_up() -> None:
+    """
+    Imports and initializes cwl-utils, cwltool and schema-salad: loads the
+    metaschema and the CWL schemas of all versions, sets up the template
+    engine, and parses a document (setting up the loader context).
+    Called before forking, the workers share them copy-on-write instead of
+    loading them on their first request.
+    """
+    get_metaschema()
+    for version in CWL_VERSIONS:
+        get_schema(version)
+    get_template_engine()
+    wf_content_to_inputs(WARM_UP_DOCUMENT, Path.cwd().as_uri(), use_cache=False)  # noqa: E501
+    # Keeps the collector from touching (and so copying) the shared pages
+    gc.freeze()
+
+
+def post_fork(server: Any, worker: Any) -> None:
+    """
+    Gives each worker its own HTTP connections, and drops the metrics
+    inherited from the master process.
+    """
+    configure_http(get_session_pool().settings)
+    get_metrics().reset()
+    reset_flush()
+
+
+def worker_exit(server: Any, worker: Any) -> None:
+    """Writes the last samples of a worker before it exits."""
+    flush()
+
+
+def child_exit(server: Any, worker: Any) -> None:
+    """Keeps the counters of an exited worker in the metrics."""
+    mark_process_dead(worker.pid)
+
+
+class ProductionServer(BaseApplication):  # type: ignore
+    """
+    Pre-fork server (gunicorn) of a Flask app loaded in the master process.
+    The workers are restarted gracefully on SIGHUP, and the server stops
+    gracefully on SIGTERM, waiting graceful_timeout for running requests.
+    """
+
+    def __init__(self, app: Flask, options: Dict[str, Any]) -> None:
+        self.application = app
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, val in self.options.items():
+            self.cfg.set(key, val)
+        self.cfg.set("preload_app", True)
+        self.cfg.set("post_fork", post_fork)
+        self.cfg.set("worker_exit", worker_exit)
+        self.cfg.set("child_exit", child_exit)
+
+    def load(self) -> Flask:
+        return self.application
@@ -0,0 +1,564 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import (Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple,
+                    Union)
+from urllib.parse import quote, urldefrag, urljoin, urlsplit
+
+from requests import Response, Session
+from requests.adapters import HTTPAdapter
+from schema_salad.exceptions import ValidationException
+from schema_salad.fetcher import DefaultFetcher
+from schema_salad.utils import yaml_no_ts
+from urllib3.util.retry import Retry
+
+from cwl_inputs_parser.cache import LRUCache, content_hash
+from cwl_inputs_parser.io_utils import write_text_atomic
+from cwl_inputs_parser.metrics import get_metrics
+from cwl_inputs_parser.tracing import span
+
+# A path segment that is a git commit SHA (sha1 or sha256), or a content
+# digest like "sha256:<hex>", pins the URL to content that never changes.
+IMMUTABLE_URL_PATTERN = re.compile(
+    r"/(?:[0-9a-f]{40}|[0-9a-f]{64})(?:/|$)"
+    r"|sha(?:256|384|512)[:-][0-9a-fA-F]{64,128}"
+)
+
+
+def is_immutable_url(url: str) -> bool:
+    """Returns True if the URL is pinned to a commit SHA or a digest."""
+    return IMMUTABLE_URL_PATTERN.search(url.split("?", 1)[0]) is not None
+
+
+@dataclass
+class CachedResponse:
+    """CachedResponse"""
+    url: str
+    content: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    immutable: bool = False
+
+
+class HTTPCache:
+    """
+    On-disk cache of remote documents.
+    Each entry is stored as a pair of files named by the sha256 of the URL:
+    <hash>.json for the validators and <hash>.body for the content.
+    """
+
+    def __init__(self, cache_dir: Union[str, Path]) -> None:
+        self.cache_dir = Path(cache_dir)
+
+    def _path(self, url: str, suffix: str) -> Path:
+        name = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.cache_dir.joinpath(name + suffix)
+
+    def load(self, url: str) -> Optional[CachedResponse]:
+        """Returns the cached response of the URL, or None."""
+        try:
+            meta = json.loads(self._path(url, ".json").read_text(encoding="utf-8"))  # noqa: E501
+            content = self._path(url, ".body").read_text(encoding="utf-8")
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url:
+            return None
+        return CachedResponse(
+            url=url,
+            content=content,
+            etag=meta.get("etag"),
+            last_modified=meta.get("last_modified"),
+            immutable=meta.get("immutable", False),
+        )
+
+    def store(self, entry: CachedResponse) -> None:
+        """Stores a response. The files are replaced atomically."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        meta = asdict(entry)
+        del meta["content"]
+        # The body is written first, so a reader never sees new validators
+        # with an old body.
+        self._write(self._path(entry.url, ".body"), entry.content)
+        self._write(self._path(entry.url, ".json"), json.dumps(meta))
+
+    def _write(self, path: Path, text: str) -> None:
+        write_text_atomic(path, text)
+
+    def clear(self) -> None:
+        """Removes all entries."""
+        if not self.cache_dir.exists():
+            return
+        for path in self.cache_dir.iterdir():
+            if path.suffix in [".json", ".body"]:
+                path.unlink()
+
+
+HTTP_CACHE_DIR_ENV = "CWL_INPUTS_PARSER_HTTP_CACHE_DIR"
+HTTP_CACHE: Optional[HTTPCache] = None
+if os.environ.get(HTTP_CACHE_DIR_ENV):
+    HTTP_CACHE = HTTPCache(os.environ[HTTP_CACHE_DIR_ENV])
+
+
+def configure_http_cache(cache_dir: Optional[Union[str, Path]]) -> None:
+    """Enables the on-disk HTTP cache in cache_dir, or disables it by None."""
+    global HTTP_CACHE
+    HTTP_CACHE = HTTPCache(cache_dir) if cache_dir is not None else None
+
+
+class DocumentStore(ABC):
+    """
+    Local store of remote documents, consulted before the network, e.g. a
+    mirror of the workflows for hosts that cannot reach their origin.
+    """
+
+    @abstractmethod
+    def get(self, url: str) -> Optional[str]:
+        """Returns the stored document of the URL, or None."""
+
+    @abstractmethod
+    def put(self, url: str, content: str) -> None:
+        """Stores the document of the URL."""
+
+
+class DirectoryStore(DocumentStore):
+    """
+    Document store in a directory tree mirroring the URLs:
+    https://host/path/to/wf.cwl is stored in <root>/host/path/to/wf.cwl
+    (the scheme is not a part of the path), so a store can be copied,
+    inspected and edited by hand. The query of a URL is appended to the
+    file name, and a URL ending with '/' is stored as its 'index' file.
+    """
+
+    def __init__(self, root: Union[str, Path]) -> None:
+        self.root = Path(root)
+
+    def path(self, url: str) -> Optional[Path]:
+        """Returns the path of the URL, or None if it can not be stored."""
+        split = urlsplit(url)
+        segments = [segment for segment in split.path.split("/")
+                    if segment not in ["", "."]]
+        if not split.netloc or ".." in segments:
+            return None
+        if not segments or split.path.endswith("/"):
+            segments.append("index")
+        if split.query:
+            segments[-1] += "%3F" + quote(split.query, safe="")
+        return self.root.joinpath(split.netloc.replace(":", "_"), *segments)
+
+    def get(self, url: str) -> Optional[str]:
+        path = self.path(url)
+        if path is None:
+            return None
+        try:
+            return path.read_text(encoding="utf-8")
+        except OSError:
+            return None
+
+    def put(self, url: str, content: str) -> None:
+        path = self.path(url)
+        if path is None:
+            raise ValueError(f"The URL can not be stored: {url}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_text_atomic(path, content)
+
+
+DOCUMENT_STORE_ENV = "CWL_INPUTS_PARSER_DOCUMENT_STORE"
+DOCUMENT_STORE: Optional[DocumentStore] = None
+if os.environ.get(DOCUMENT_STORE_ENV):
+    DOCUMENT_STORE = DirectoryStore(os.environ[DOCUMENT_STORE_ENV])
+
+
+def configure_document_store(store: Optional[Union[str, Path, DocumentStore]]) -> None:  # noqa: E501
+    """
+    Sets the document store consulted before the network: a DocumentStore,
+    or the root of a DirectoryStore. None disables it.
+    """
+    global DOCUMENT_STORE
+    if store is None or isinstance(store, DocumentStore):
+        DOCUMENT_STORE = store
+    else:
+        DOCUMENT_STORE = DirectoryStore(store)
+
+
+def load_from_store(remote_url: str) -> Optional[str]:
+    """Returns the document of the URL in the document store, or None."""
+    store = DOCUMENT_STORE
+    if store is None:
+        return None
+    content = store.get(remote_url)
+    result = "hits" if content is not None else "misses"
+    get_metrics().inc(f"cwl_inputs_parser_cache_{result}_total", cache="document_store")  # noqa: E501
+    return content
+
+
+# Responses retried with backoff
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+
+
+@dataclass
+class HTTPSettings:
+    """Settings of the pooled HTTP session used for all remote fetches."""
+    connect_timeout: float = 10.0
+    read_timeout: float = 30.0
+    max_connections_per_host: int = 10
+    retries: int = 3
+    backoff_factor: float = 0.5
+
+
+class SessionPool:
+    """
+    Shared pooled HTTP session with keep-alive.
+    At most max_connections_per_host connections are opened to each host,
+    and the other requests wait for a free connection.
+    Failed connections and 429/5xx responses are retried with backoff.
+    """
+
+    def __init__(self, settings: HTTPSettings) -> None:
+        self.settings = settings
+        retry = Retry(
+            total=settings.retries,
+            backoff_factor=settings.backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_maxsize=settings.max_connections_per_host,
+            pool_block=True,
+            max_retries=retry,
+        )
+        self.session = Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> Response:  # noqa: E501
+        """Sends a GET request with the configured timeouts."""
+        return self.session.get(
+            url,
+            headers=headers,
+            timeout=(self.settings.connect_timeout, self.settings.read_timeout),  # noqa: E501
+        )
+
+    def close(self) -> None:
+        self.session.close()
+
+
+SESSION_POOL: Optional[SessionPool] = None
+_session_pool_lock = threading.Lock()
+
+
+def configure_http(settings: HTTPSettings) -> None:
+    """Replaces the shared session pool with one using the settings."""
+    global SESSION_POOL
+    with _session_pool_lock:
+        old_pool = SESSION_POOL
+        SESSION_POOL = SessionPool(settings)
+    if old_pool is not None:
+        old_pool.close()
+
+
+def get_session_pool() -> SessionPool:
+    """Returns the shared session pool, creating it with default settings."""
+    global SESSION_POOL
+    with _session_pool_lock:
+        if SESSION_POOL is None:
+            SESSION_POOL = SessionPool(HTTPSettings())
+        return SESSION_POOL
+
+
+def is_remote(url: str) -> bool:
+    return url.startswith("http://") or url.startswith("https://")
+
+
+def scan_references(doc: Any, base_url: str, run: bool = True) -> List[Tuple[str, bool]]:  # noqa: E501
+    """
+    Returns the URLs of the remote documents referenced by a loaded YAML
+    document: its $import and $include, and its run if run is True, resolved
+    against base_url and without fragment. The bool of each URL is True for
+    $include, whose document is a text and not a YAML document.
+    The references to the document itself (e.g. run: "#main") are skipped.
+    """
+    base, _ = urldefrag(base_url)
+    found: List[Tuple[str, bool]] = []
+    stack = [doc]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, Mapping):
+            for key, value in obj.items():
+                if isinstance(value, str) and (key in ["$import", "$include"] or (run and key == "run")):  # noqa: E501
+                    url, _ = urldefrag(urljoin(base_url, value))
+                    if url != base and is_remote(url):
+                        found.append((url, key == "$include"))
+                else:
+                    stack.append(value)
+        elif isinstance(obj, list):
+            stack.extend(obj)
+    return found
+
+
+class RemoteFetcher(DefaultFetcher):
+    """
+    schema-salad fetcher that downloads remote documents with download(),
+    so the referenced documents share the session pool and the HTTP cache.
+    shared_cache keeps the documents of immutable URLs between fetchers,
+    documents serves in-memory contents by URI, prefetched serves the
+    remote documents fetched by prefetch() by URL, and record collects the
+    other fetched documents by URL. With use_store=False, the document
+    store is not consulted (e.g. to populate it).
+    """
+
+    def __init__(self,
+                 cache: Optional[Dict[str, Any]] = None,
+                 shared_cache: Optional[LRUCache[str]] = None,
+                 documents: Optional[Dict[str, str]] = None,
+                 record: Optional[Dict[str, str]] = None,
+                 prefetched: Optional[Dict[str, str]] = None,
+                 use_store: bool = True) -> None:
+        super().__init__(cache if cache is not None else {},
+                         get_session_pool().session)
+        self.shared_cache = shared_cache
+        self.documents = documents if documents is not None else {}
+        self.record = record
+        self.prefetched = prefetched if prefetched is not None else {}
+        self.use_store = use_store
+        # the URLs that prefetch() failed to fetch
+        self.failed: Set[str] = set()
+
+    def prefetch(self, doc: Any, base_url: str, run: bool = True) -> None:
+        """
+        Fetches the remote documents referenced by a loaded document (see
+        scan_references) and by the fetched documents, level by level,
+        each level concurrently on up to max_connections_per_host threads
+        over the session pool. The loader is then served them from memory
+        instead of fetching them one by one. A failed fetch is skipped, so
+        the loader fetches it again and reports the error.
+        """
+        pending = scan_references(doc, base_url, run)
+        if not pending:
+            return
+        with span("prefetch", url=base_url) as prefetch_span:
+            while pending:
+                urls = {url: include for url, include in pending
+                        if url not in self.prefetched
+                        and url not in self.failed
+                        and url not in self.documents
+                        and not isinstance(self.cache.get(url), str)}
+                if not urls:
+                    break
+                texts = self.download_all(list(urls))
+                pending = []
+                for (url, include), text in zip(urls.items(), texts):
+                    if text is None:
+                        self.failed.add(url)
+                        continue
+                    self.prefetched[url] = text
+                    if not include:
+                        try:
+                            pending.extend(scan_references(yaml_no_ts().load(text), url, run))  # noqa: E501
+                        except Exception:
+                            continue
+            if prefetch_span is not None:
+                prefetch_span.attributes["documents"] = len(self.prefetched)
+
+    def download_all(self, urls: List[str]) -> List[Optional[str]]:
+        """
+        Downloads remote documents concurrently on up to
+        max_connections_per_host threads over the session pool, in the
+        order of urls. A failed download is None.
+        """
+        if not urls:
+            return []
+        workers = get_session_pool().settings.max_connections_per_host
+        with ThreadPoolExecutor(max_workers=min(len(urls), workers)) as executor:  # noqa: E501
+            # each fetch runs in a copy of the context, so its span is a
+            # child of the current span
+            futures = [executor.submit(copy_context().run, self._try_download, url)  # noqa: E501
+                       for url in urls]
+            return [future.result() for future in futures]
+
+    def unchanged(self, documents: Mapping[str, str]) -> bool:
+        """
+        Returns True if none of the documents (URL: content_hash) has
+        changed. The documents are fetched again, so remote ones are
+        revalidated by the HTTP cache and immutable ones are not fetched;
+        the remote documents are fetched concurrently, as by prefetch.
+        """
+        remote_urls = [url for url in documents if is_remote(url)]
+        texts: Dict[str, Optional[str]] = dict(zip(remote_urls, self.download_all(remote_urls)))  # noqa: E501
+        for url, digest in documents.items():
+            if url in texts:
+                text = texts[url]
+            else:
+                try:
+                    text = self.fetch_text(url)
+                except Exception:
+                    return False
+            if text is None or content_hash(text, url) != digest:
+                return False
+        return True
+
+    def _try_download(self, url: str) -> Optional[str]:
+        with span("fetch", url=url):
+            try:
+                return self._download(url)
+            except Exception:
+                return None
+
+    def _download(self, url: str) -> str:
+        shared_cache = self.shared_cache if is_immutable_url(url) else None
+        text = shared_cache.get(url) if shared_cache is not None else None
+        if text is None:
+            try:
+                text = download(url, use_store=self.use_store)
+            except Exception as e:
+                raise ValidationException(f"Error fetching {url}: {e}") from e  # noqa: E501
+            if shared_cache is not None:
+                shared_cache.put(url, text, size=len(text))
+        return text
+
+    def fetch_text(self, url: str, content_types: Optional[List[str]] = None) -> str:  # noqa: E501
+        with span("fetch", url=url):
+            return self._fetch_text(url, content_types)
+
+    def _fetch_text(self, url: str, content_types: Optional[List[str]]) -> str:  # noqa: E501
+        if url in self.documents:
+            return self.documents[url]
+        cached = self.cache.get(url)
+        if isinstance(cached, str):
+            return cached
+        if is_remote(url):
+            text = self.prefetched.get(url)
+            if text is None:
+                text = self._download(url)
+            self.cache[url] = text
+        else:
+            text = str(super().fetch_text(url, content_types))
+        if self.record is not None:
+            self.record[url] = text
+        return text
+
+    def check_exists(self, url: str) -> bool:
+        if url in self.documents or url in self.prefetched:
+            return True
+        if self.use_store and is_remote(url) and load_from_store(url) is not None:  # noqa: E501
+            return True
+        return bool(super().check_exists(url))
+
+
+def download(remote_url: str, use_store: bool = True) -> str:
+    """
+    Downloads a remote document and returns the content.
+    The document store is consulted first, if it is configured and
+    use_store is True.
+    When the HTTP cache is enabled, immutable URLs are served from the cache
+    without any request, and the other URLs are revalidated with
+    If-None-Match/If-Modified-Since.
+    """
+    if use_store:
+        stored = load_from_store(remote_url)
+        if stored is not None:
+            return stored
+    http_cache = HTTP_CACHE
+    cached = http_cache.load(remote_url) if http_cache is not None else None
+    if cached is not None and cached.immutable:
+        get_metrics().inc("cwl_inputs_parser_cache_hits_total", cache="http")  # noqa: E501
+        return cached.content
+    start = time.perf_counter()
+    response = get_session_pool().get(remote_url,
+                                      headers=revalidation_headers(cached))
+    record_fetch(remote_url, time.perf_counter() - start, len(response.content))  # noqa: E501
+    if http_cache is not None:
+        result = "hits" if response.status_code == 304 and cached is not None else "misses"  # noqa: E501
+        get_metrics().inc(f"cwl_inputs_parser_cache_{result}_total", cache="http")  # noqa: E501
+    return handle_download_response(remote_url, cached, response.status_code,
+                                    response.text, response.headers)
+
+
+def populate_store(locations: Iterable[str],
+                   store: DocumentStore) -> Tuple[List[str], List[str]]:
+    """
+    Stores the remote workflows of the locations and all the remote
+    documents they reference transitively (run, $import and $include),
+    fetched from the network and not from the store. The remote references
+    of local workflows are stored as well.
+    Returns the stored URLs and the URLs that could not be fetched.
+    """
+    stored: List[str] = []
+    failed: List[str] = []
+    for location in locations:
+        fetcher = RemoteFetcher(use_store=False)
+        try:
+            if is_remote(location):
+                url = location
+                text = fetcher.fetch_text(url)
+                fetcher.prefetched[url] = text
+            else:
+                url = Path(location).absolute().as_uri()
+                text = Path(location).read_text(encoding="utf-8")
+            doc = yaml_no_ts().load(text)
+        except Exception:
+            failed.append(location)
+            continue
+        fetcher.prefetch(doc, url)
+        for url, text in fetcher.prefetched.items():
+            store.put(url, text)
+            stored.append(url)
+        failed.extend(sorted(fetcher.failed))
+    return stored, failed
+
+
+def record_fetch(remote_url: str, elapsed: float, size: int) -> None:
+    """Records the latency and the bytes of a remote fetch by host."""
+    host = urlsplit(remote_url).netloc
+    metrics = get_metrics()
+    metrics.observe("cwl_inputs_parser_remote_fetch_duration_seconds", elapsed, host=host)  # noqa: E501
+    metrics.inc("cwl_inputs_parser_remote_fetch_bytes_total", size, host=host)  # noqa: E501
+
+
+def revalidation_headers(cached: Optional[CachedResponse]) -> Dict[str, str]:
+    """Returns the headers revalidating a cached response."""
+    headers: Dict[str, str] = {}
+    if cached is not None:
+        if cached.etag is not None:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified is not None:
+            headers["If-Modified-Since"] = cached.last_modified
+    return headers
+
+
+def handle_download_response(remote_url: str,
+                             cached: Optional[CachedResponse],
+                             status_code: int,
+                             text: str,
+                             headers: Mapping[str, str]) -> str:
+    """
+    Returns the content of the response of a download, or of the cached
+    response if it was not modified, and stores the response in the HTTP
+    cache when it is enabled.
+    """
+    if status_code == 304 and cached is not None:
+        return cached.content
+    if status_code != 200:
+        raise Exception(f"Failed to download file: {remote_url}")
+
+    http_cache = HTTP_CACHE
+    if http_cache is not None:
+        entry = CachedResponse(
+            url=remote_url,
+            content=text,
+            etag=headers.get("ETag"),
+            last_modified=headers.get("Last-Modified"),
+            immutable=is_immutable_url(remote_url),
+        )
+        if entry.immutable or entry.etag is not None or entry.last_modified is not None:  # noqa: E501
+            http_cache.store(entry)
+    return text
@@ -1,20 +1,96 @@
 #!/usr/bin/env python3
 # coding: utf-8
-import tempfile
-from pathlib import Path
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 from traceback import format_exc
-from typing import Tuple
+from typing import Any, Iterator, List, Optional, Tuple
 
 import yaml
-from cwl_utils.parser import load_document_by_string
-from flask import Blueprint, Flask, Response, jsonify, request
+from flask import Blueprint, Flask, Response, current_app, g, jsonify, request
 
-from cwl_inputs_parser.utils import (Inputs, cwl_make_template,
-                                     wf_location_to_inputs)
+from cwl_inputs_parser.batch import DEFAULT_BATCH_CONCURRENCY
+from cwl_inputs_parser.handlers import (parse_batch_item,
+                                        record_response_metrics,
+                                        request_to_input_fields,
+                                        request_to_inputs,
+                                        request_to_processes_json,
+                                        request_to_template)
+from cwl_inputs_parser.metrics import collect, flush_soon, get_metrics, render
+from cwl_inputs_parser.remote import (HTTPSettings, configure_http,
+                                      get_session_pool)
+from cwl_inputs_parser.tracing import server_timing, trace
+from cwl_inputs_parser.utils import dumps_json, iter_json
 
 app_bp = Blueprint("cwl-inputs-parser", __name__)
 
 
+def stream_batch(items: List[Any], concurrency: int) -> Iterator[bytes]:
+    """
+    Parses the items of a batch request in a thread pool of concurrency
+    threads and yields their records as JSON Lines in completion order.
+    The pending items are cancelled if the client goes away.
+    """
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    futures = [executor.submit(parse_batch_item, item)
+               for item in enumerate(items)]
+    try:
+        for future in as_completed(futures):
+            yield dumps_json(future.result()) + b"\n"
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+@app_bp.before_request
+def start_request_metrics() -> None:
+    g.request_start = time.perf_counter()
+    get_metrics().add_gauge("cwl_inputs_parser_requests_in_flight", 1)
+
+
+def end_stream_metrics(route: str, method: str, status: int, start: float) -> None:  # noqa: E501
+    """Records a streamed response when it is closed."""
+    record_response_metrics(route, method, status, start)
+    get_metrics().add_gauge("cwl_inputs_parser_requests_in_flight", -1)
+    flush_soon()
+
+
+@app_bp.after_request
+def record_request_metrics(response: Response) -> Response:
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"  # noqa: E501
+    if g.get("stream_metrics", False):
+        # the body of a streamed response (e.g. of /batch) is made while it
+        # is sent, after the request ends, so the request is in flight and
+        # timed until the response is closed
+        response.call_on_close(partial(
+            end_stream_metrics, route, request.method, response.status_code,
+            g.request_start))
+        return response
+    record_response_metrics(route, request.method, response.status_code,
+                            g.request_start)
+    return response
+
+
+@app_bp.teardown_request
+def end_request_metrics(exception: Optional[BaseException]) -> None:
+    # called in any case, also when the request failed; a streamed
+    # response ends in end_stream_metrics instead
+    if g.get("stream_metrics", False) and exception is None:
+        return
+    get_metrics().add_gauge("cwl_inputs_parser_requests_in_flight", -1)
+    flush_soon()
+
+
+@app_bp.route("/metrics", methods=["GET"])
+def metrics() -> Tuple[Response, int]:
+    """
+    Metrics in the Prometheus text format, aggregated over all the worker
+    processes of the production server.
+    """
+    return Response(render(collect()), mimetype="text/plain; version=0.0.4"), 200  # noqa: E501
+
+
 @app_bp.route("/health", methods=["GET"])
 def health() -> Tuple[Response, int]:
     """
@@ -29,18 +105,65 @@ def health() -> Tuple[Response, int]:
 def parse() -> Tuple[Response, int]:
     """
     Parse the inputs of a workflow.
+    The time of each phase is returned in the Server-Timing header.
+    With ?stream=1, the fields are serialized as they are parsed into a
+    chunked response, and the Server-Timing does not include them.
+    """
+    req_data = yaml.safe_load(request.get_data().decode("utf-8"))
+    stream = request.args.get("stream", "").lower() in ["1", "true", "yes"]
+    with trace(f"{request.method} /") as root:
+        if stream:
+            fields = request_to_input_fields(req_data)
+            if fields is None:
+                return jsonify({"message": "Missing arguments"}), 400
+            body: Any = iter_json(fields)
+            g.stream_metrics = True
+        else:
+            inputs = request_to_inputs(req_data)
+            if inputs is None:
+                return jsonify({"message": "Missing arguments"}), 400
+            body = inputs.as_json_bytes()
+    res = Response(body, mimetype="application/json")
+    res.headers["Access-Control-Allow-Origin"] = "*"
+    res.headers["Server-Timing"] = server_timing(root)
+    return res, 200
+
+
+@app_bp.route("/processes", methods=["POST"])
+def processes() -> Tuple[Response, int]:
+    """
+    Parse the inputs of every process of a document, e.g. of the tools of a
+    packed $graph, from a single load. The request may list the process ids
+    to return in "ids" (default: all), and the response maps each id to its
+    class and either its inputs or the error (see ProcessInputs.as_dict).
     """
     req_data = yaml.safe_load(request.get_data().decode("utf-8"))
-    wf_location = req_data.get("wf_location", None)
-    wf_content = req_data.get("wf_content", None)
-    if wf_location is None and wf_content is None:
+    with trace(f"{request.method} /processes") as root:
+        status, body = request_to_processes_json(req_data)
+    res = Response(body, status=status, mimetype="application/json")
+    if status == 200:
+        res.headers["Access-Control-Allow-Origin"] = "*"
+        res.headers["Server-Timing"] = server_timing(root)
+    return res, status
+
+
+@app_bp.route("/batch", methods=["POST"])
+def batch() -> Tuple[Response, int]:
+    """
+    Parse the inputs of many workflows.
+    The request is a list of {"wf_location": ...} / {"wf_content": ...}
+    items (or {"items": [...]}), and the response streams a JSON Lines
+    record per item in completion order (see parse_batch_item).
+    """
+    req_data = yaml.safe_load(request.get_data().decode("utf-8"))
+    if isinstance(req_data, dict):
+        req_data = req_data.get("items", None)
+    if not isinstance(req_data, list):
         return jsonify({"message": "Missing arguments"}), 400
-    if wf_location is not None:
-        inputs = wf_location_to_inputs(wf_location.strip())
-    elif wf_content is not None:
-        wf_obj = load_document_by_string(wf_content, uri=Path.cwd().as_uri())  # noqa: E501
-        inputs = Inputs(wf_obj)
-    res = jsonify(inputs.as_dict())
+    concurrency = current_app.config["BATCH_CONCURRENCY"]
+    g.stream_metrics = True
+    res = Response(stream_batch(req_data, concurrency),
+                   mimetype="application/x-ndjson")
     res.headers["Access-Control-Allow-Origin"] = "*"
     return res, 200
 
@@ -51,29 +174,30 @@ def cwl_make_template_route() -> Tuple[Response, int]:
     Create a template for a CWL file.
     """
     req_data = yaml.safe_load(request.get_data().decode("utf-8"))
-    wf_location = req_data.get("wf_location", None)
-    wf_content = req_data.get("wf_content", None)
-    if wf_location is None and wf_content is None:
+    template_data = request_to_template(req_data)
+    if template_data is None:
         return jsonify({"message": "Missing arguments"}), 400
-    if wf_location is not None:
-        template_data = cwl_make_template(wf_location.strip())
-    elif wf_content is not None:
-        with tempfile.NamedTemporaryFile(suffix=".cwl") as temp_file:
-            temp_file.write(wf_content.encode("utf-8"))
-            temp_file.flush()
-            template_data = cwl_make_template(temp_file.name)
     res = jsonify(template_data)
     res.headers["Access-Control-Allow-Origin"] = "*"
     return res, 200
 
 
-def create_app() -> Flask:
+def create_app(http_settings: Optional[HTTPSettings] = None,
+               batch_concurrency: int = DEFAULT_BATCH_CONCURRENCY) -> Flask:
     """
     Create the Flask app.
+    http_settings configures the pooled HTTP session of remote fetches,
+    and batch_concurrency is the number of items of a /batch request
+    parsed at once. The errors are returned as JSON (see fix_errorhandler)
+    by both the development and the production server.
     """
+    if http_settings is not None:
+        configure_http(http_settings)
     app = Flask(__name__)
+    app.config["HTTP_SETTINGS"] = get_session_pool().settings
+    app.config["BATCH_CONCURRENCY"] = batch_concurrency
     app.register_blueprint(app_bp)
-    return app
+    return fix_errorhandler(app)
 
 
 def fix_errorhandler(app: Flask) -> Flask:
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import argparse
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+from urllib.parse import urldefrag
+
+from cwltool.context import LoadingContext, RuntimeContext
+from cwltool.load_tool import (fetch_document, make_tool,
+                               resolve_and_validate_document, resolve_tool_uri)
+from cwltool.main import (generate_input_template, get_default_args,
+                          setup_loadingContext)
+from schema_salad.utils import yaml_no_ts
+
+from cwl_inputs_parser.cache import LRUCache, content_hash
+from cwl_inputs_parser.input_template import TemplateResult, dump_template
+from cwl_inputs_parser.remote import RemoteFetcher, is_remote
+
+# Size in bytes of the documents of immutable URLs kept between calls
+SHARED_DOCUMENTS_SIZE = 16 * 1024 * 1024
+# Size in bytes of the cached templates
+TEMPLATE_CACHE_SIZE = 16 * 1024 * 1024
+
+
+class TemplateEngine:
+    """
+    Long-lived context of cwltool --make-template.
+    The cwltool arguments, the RuntimeContext and the base LoadingContext
+    are set up once. Each call gets its own LoadingContext
+    and document loader, so the calls are isolated and thread-safe; only the
+    documents of immutable URLs (pinned to a commit SHA or a digest) are
+    shared between calls, as they never change.
+    The templates are cached with the content hashes of the root document
+    and all the documents it references, and a cached template is used only
+    while none of them has changed.
+    """
+
+    def __init__(self) -> None:
+        logging.getLogger("cwltool").setLevel(logging.ERROR)
+        logging.getLogger("salad").setLevel(logging.ERROR)
+
+        self.shared_documents: LRUCache[str] = LRUCache(SHARED_DOCUMENTS_SIZE)  # noqa: E501
+        self.results: LRUCache[TemplateResult] = LRUCache(TEMPLATE_CACHE_SIZE)  # noqa: E501
+        args = argparse.Namespace(**get_default_args())
+        args.make_template = True
+        self._args = args
+        self._runtime_context = RuntimeContext(vars(args))
+        loading_context = LoadingContext(vars(args))
+        loading_context.fetcher_constructor = self._fetcher
+        self._loading_context = setup_loadingContext(
+            loading_context, self._runtime_context, args)
+
+    def _fetcher(self, cache: Dict[str, Any], session: Any) -> RemoteFetcher:
+        return RemoteFetcher(cache, shared_cache=self.shared_documents)
+
+    def make_template(self,
+                      wf_location: Union[str, Path],
+                      use_cache: bool = True) -> str:
+        """Returns the results of cwltool --make-template."""
+        uri, _ = resolve_tool_uri(
+            str(wf_location),
+            resolver=self._loading_context.resolver,
+            fetcher_constructor=self._fetcher,
+        )
+        return self._cached_template(uri, uri, {}, use_cache)
+
+    def make_template_from_content(self,
+                                   wf_content: str,
+                                   uri: str,
+                                   use_cache: bool = True) -> str:
+        """
+        Returns the results of cwltool --make-template for the content of a
+        document, without writing it to a file.
+        The content is served from memory as the document at uri, so its
+        relative references are resolved against uri as in
+        wf_content_to_inputs.
+        """
+        key = content_hash(wf_content, uri)
+        return self._cached_template(key, uri, {uri: wf_content}, use_cache)
+
+    def _cached_template(self,
+                         key: str,
+                         uri: str,
+                         documents: Dict[str, str],
+                         use_cache: bool) -> str:
+        if use_cache:
+            cached = self.results.get(key)
+            if cached is not None and self._is_fresh(cached):
+                return cached.template
+        fetched: Dict[str, str] = {}
+        template = self._make_template(uri, documents, fetched)
+        if use_cache:
+            result = TemplateResult(
+                template=template,
+                documents={url: content_hash(text, url)
+                           for url, text in fetched.items()},
+            )
+            size = len(template) + sum(len(url) + 64 for url in fetched)
+            self.results.put(key, result, size=size)
+        return template
+
+    def _is_fresh(self, result: TemplateResult) -> bool:
+        """
+        Returns True if none of the documents of a result has changed.
+        The documents are fetched again like by cwltool (see
+        RemoteFetcher.unchanged).
+        """
+        return self._fetcher({}, None).unchanged(result.documents)
+
+    def _prefetch(self, uri: str, documents: Dict[str, str]) -> Dict[str, str]:  # noqa: E501
+        """
+        Prefetches the remote documents referenced by the document at uri
+        (run, $import and $include), as cwltool fetches them one by one.
+        """
+        fetcher = RemoteFetcher(shared_cache=self.shared_documents,
+                                documents=documents)
+        url, _ = urldefrag(uri)
+        try:
+            text = fetcher.fetch_text(url)
+            doc = yaml_no_ts().load(text)
+        except Exception:
+            # cwltool fetches it again and reports the error
+            return {}
+        if is_remote(url):
+            fetcher.prefetched[url] = text
+        fetcher.prefetch(doc, url)
+        return fetcher.prefetched
+
+    def _make_template(self,
+                       uri: str,
+                       documents: Dict[str, str],
+                       record: Dict[str, str]) -> str:
+        prefetched = self._prefetch(uri, documents)
+        loading_context = self._loading_context.copy()
+        loading_context.fetcher_constructor = lambda cache, session: RemoteFetcher(  # noqa: E501
+            cache, shared_cache=self.shared_documents,
+            documents=documents, record=record, prefetched=prefetched)
+        loading_context = setup_loadingContext(
+            loading_context, self._runtime_context, self._args)
+        loading_context, workflowobj, uri = fetch_document(
+            uri,
+            loading_context
+        )
+        loading_context, uri = resolve_and_validate_document(
+            loading_context,
+            workflowobj,
+            uri,
+        )
+        return dump_template(generate_input_template(make_tool(uri, loading_context)))  # noqa: E501
+
+
+TEMPLATE_ENGINE: Optional[TemplateEngine] = None
+_template_engine_lock = threading.Lock()
+
+
+def get_template_engine() -> TemplateEngine:
+    """Returns the shared template engine, creating it on first use."""
+    global TEMPLATE_ENGINE
+    with _template_engine_lock:
+        if TEMPLATE_ENGINE is None:
+            TEMPLATE_ENGINE = TemplateEngine()
+        return TEMPLATE_ENGINE
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+
+@dataclass
+class Span:
+    """
+    Span of a traced phase. start is the UNIX time in seconds, and duration
+    is in ms. The spans opened inside the phase are its children, e.g. the
+    fetches of the sub-documents inside load_document.
+    """
+    name: str
+    start: float
+    duration: float = 0.0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    children: List["Span"] = field(default_factory=list)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Dump as dict."""
+        return {
+            "name": self.name,
+            "start": self.start,
+            "duration": self.duration,
+            "attributes": self.attributes,
+            "children": [child.as_dict() for child in self.children],
+        }
+
+    def timings(self) -> Dict[str, float]:
+        """
+        Returns the timing breakdown: the total duration in ms of the child
+        spans by name, in the order they were first opened.
+        """
+        breakdown: Dict[str, float] = {}
+        for child in self.children:
+            breakdown[child.name] = breakdown.get(child.name, 0.0) + child.duration  # noqa: E501
+        return breakdown
+
+
+class SpanExporter(ABC):
+    """Receives the root span of each trace when it ends."""
+
+    @abstractmethod
+    def export(self, span: Span) -> None:
+        """Exports the root span of a trace."""
+
+
+class JSONFileExporter(SpanExporter):
+    """Appends each trace to a file as a line of JSON (JSON Lines)."""
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.as_dict(), ensure_ascii=False) + "\n"
+        with self._lock:
+            with self.path.open(mode="a", encoding="utf-8") as f:
+                f.write(line)
+
+
+SPAN_EXPORTER: Optional[SpanExporter] = None
+_span_exporter_lock = threading.Lock()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)  # noqa: E501
+
+
+def configure_span_exporter(exporter: Optional[SpanExporter]) -> None:
+    """Sets the exporter of the traces, or disables exporting by None."""
+    global SPAN_EXPORTER
+    with _span_exporter_lock:
+        SPAN_EXPORTER = exporter
+
+
+def get_span_exporter() -> Optional[SpanExporter]:
+    """Returns the exporter of the traces, or None."""
+    with _span_exporter_lock:
+        return SPAN_EXPORTER
+
+
+def current_span() -> Optional[Span]:
+    """Returns the innermost open span, or None outside of a trace."""
+    return _current_span.get()
+
+
+@contextmanager
+def _open_span(name: str, attributes: Dict[str, Any]) -> Iterator[Span]:
+    parent = _current_span.get()
+    span = Span(name=name, start=time.time(), attributes=attributes)
+    if parent is not None:
+        parent.children.append(span)
+    token = _current_span.set(span)
+    start = time.perf_counter()
+    try:
+        yield span
+    finally:
+        span.duration = (time.perf_counter() - start) * 1e3
+        _current_span.reset(token)
+
+
+@contextmanager
+def trace(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Traces the phases run inside the block under a root span, and exports
+    it to the configured exporter when the block ends, also on an error:
+
+        with trace("parse") as root:
+            inputs = wf_location_to_inputs(location)
+        root.timings()  # {"fetch_document": 1.2, "load_document": 8.1, ...}
+    """
+    try:
+        with _open_span(name, attributes) as root:
+            try:
+                yield root
+            except Exception as e:
+                root.attributes["error"] = type(e).__name__
+                raise
+    finally:
+        exporter = get_span_exporter()
+        if exporter is not None and _current_span.get() is None:
+            exporter.export(root)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Records a phase as a child of the current span.
+    Outside of a trace, nothing is recorded and None is yielded.
+    """
+    if _current_span.get() is None:
+        yield None
+        return
+    with _open_span(name, attributes) as child:
+        yield child
+
+
+def server_timing(root: Span) -> str:
+    """Formats the timing breakdown of a trace as a Server-Timing header."""
+    metrics = [f"{name};dur={duration:.3f}"
+               for name, duration in root.timings().items()]
+    metrics.append(f"total;dur={root.duration:.3f}")
+    return ", ".join(metrics)
@@ -1,41 +1,41 @@
 #!/usr/bin/env python3
 # coding: utf-8
-import io
 import json
-import logging
+import threading
 from collections import OrderedDict
-from copy import deepcopy
-from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, NoReturn, Optional, Union, cast
-
-import ruamel.yaml
-from cwl_utils.parser import load_document_by_string
-from cwl_utils.parser.cwl_v1_2 import (CommandInputArraySchema,
-                                       CommandInputEnumSchema,
-                                       CommandInputParameter,
-                                       CommandInputRecordSchema,
-                                       CommandLineTool, ExpressionTool,
-                                       InputArraySchema, InputRecordSchema,
-                                       Workflow)
-from cwltool.main import RuntimeContext, arg_parser, argcomplete
-from cwltool.main import fetch_document as cwltool_fetch_document
-from cwltool.main import (generate_input_template, get_default_args, make_tool,
-                          resolve_and_validate_document, resolve_tool_uri,
-                          setup_loadingContext)
-from requests import get
-from ruamel.yaml.main import YAML
+from typing import (IO, Any, Callable, Dict, Iterable, Iterator, List, Mapping,
+                    NoReturn, Optional, Tuple, Union, cast)
+
+from cwl_utils.parser import (cwl_v1_0, cwl_v1_1, cwl_v1_2, cwl_version,
+                              load_document_by_yaml)
+from cwl_utils.parser.cwl_v1_2 import (CommandInputParameter, CommandLineTool,
+                                       ExpressionTool, Workflow)
+from schema_salad.exceptions import ValidationException
+from schema_salad.utils import yaml_no_ts
+
+from cwl_inputs_parser.cache import LRUCache, content_hash
+from cwl_inputs_parser.normalize import (TypeDescriptor, TypeNormalizer,
+                                         schema_defs)
+from cwl_inputs_parser.remote import RemoteFetcher, download
+from cwl_inputs_parser.tracing import span
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
 
 CWLUtilObj = Union[CommandLineTool, Workflow, ExpressionTool]
 CWLUtilLoadResult = Union[List[CWLUtilObj], CWLUtilObj]
 
 
 def download_file(remote_url: str) -> str:
-    """Downloads a file from a URL and returns the content."""
-    response = get(remote_url)
-    if response.status_code != 200:
-        raise Exception(f"Failed to download file: {remote_url}")
-    return response.text
+    """
+    Downloads a file from a URL and returns the content.
+    Goes through the document store and the on-disk HTTP cache when they
+    are enabled.
+    """
+    return download(remote_url)
 
 
 def is_remote_url(location: str) -> bool:
@@ -45,13 +45,14 @@ def is_remote_url(location: str) -> bool:
 
 def fetch_document(location: Union[str, Path]) -> str:
     """Fetches a CWL document from a file path or a remote URL."""
-    if isinstance(location, str):
-        if is_remote_url(location):
-            return download_file(location)
-        location = Path(location)
-    if location.is_absolute():
-        return location.read_text(encoding="utf-8")
-    return Path().cwd().joinpath(location).read_text(encoding="utf-8")
+    with span("fetch_document", location=str(location)):
+        if isinstance(location, str):
+            if is_remote_url(location):
+                return download_file(location)
+            location = Path(location)
+        if location.is_absolute():
+            return location.read_text(encoding="utf-8")
+        return Path().cwd().joinpath(location).read_text(encoding="utf-8")
 
 
 def as_uri(location: Union[str, Path]) -> str:
@@ -65,6 +66,84 @@ def as_uri(location: Union[str, Path]) -> str:
     return location.as_uri()
 
 
+LOADING_OPTIONS_CLASSES = {
+    "v1.0": cwl_v1_0.LoadingOptions,
+    "v1.1": cwl_v1_1.LoadingOptions,
+    "v1.2": cwl_v1_2.LoadingOptions,
+}
+
+
+# Size in bytes of the documents of immutable URLs kept between loads
+LOADER_SHARED_DOCUMENTS_SIZE = 16 * 1024 * 1024
+
+
+class LoaderContext:
+    """
+    Long-lived context of load_cwl_document, shared by the documents and
+    thread-safe. Each thread reuses its YAML parser, as setting one up
+    costs about a tenth of loading a small document, and the documents of
+    immutable URLs (pinned to a commit SHA or a digest) are shared between
+    loads in a bounded cache.
+    The state of each document (its LoadingOptions with the index of the
+    loaded ids, and its fetcher) is created for each load, so the loads are
+    isolated.
+    """
+
+    def __init__(self, shared_documents_size: int = LOADER_SHARED_DOCUMENTS_SIZE) -> None:  # noqa: E501
+        self.shared_documents: LRUCache[str] = LRUCache(shared_documents_size)  # noqa: E501
+        self._local = threading.local()
+
+    def yaml(self) -> Any:
+        """Returns the YAML parser of this thread."""
+        parser = getattr(self._local, "yaml", None)
+        if parser is None:
+            parser = yaml_no_ts()
+            self._local.yaml = parser
+        return parser
+
+    def load(self, wf_content: str, uri: str,
+             record: Optional[Dict[str, str]] = None) -> CWLUtilLoadResult:
+        """See load_cwl_document."""
+        yaml_obj = self.yaml().load(wf_content)
+        loading_options_class = LOADING_OPTIONS_CLASSES.get(cwl_version(yaml_obj))  # noqa: E501
+        loading_options = None
+        if loading_options_class is not None:
+            fetcher = RemoteFetcher(shared_cache=self.shared_documents,
+                                    record=record)
+            # cwl-utils keeps the run of the steps as URIs, without loading
+            fetcher.prefetch(yaml_obj, uri, run=False)
+            loading_options = loading_options_class(fetcher=fetcher,
+                                                    fileuri=uri)
+        return cast(CWLUtilLoadResult,
+                    load_document_by_yaml(yaml_obj, uri, loading_options))
+
+
+LOADER_CONTEXT: Optional[LoaderContext] = None
+_loader_context_lock = threading.Lock()
+
+
+def get_loader_context() -> LoaderContext:
+    """Returns the shared loader context, creating it on first use."""
+    global LOADER_CONTEXT
+    with _loader_context_lock:
+        if LOADER_CONTEXT is None:
+            LOADER_CONTEXT = LoaderContext()
+        return LOADER_CONTEXT
+
+
+def load_cwl_document(wf_content: str, uri: str,
+                      record: Optional[Dict[str, str]] = None) -> CWLUtilLoadResult:  # noqa: E501
+    """
+    Loads a CWL document from a string like cwl-utils' load_document_by_string,
+    in the shared loader context (see LoaderContext).
+    The referenced remote documents ($import and $include) are prefetched
+    concurrently through remote.download. record, if given, collects the
+    referenced documents by URL (see RemoteFetcher).
+    """
+    with span("load_document", uri=uri):
+        return get_loader_context().load(wf_content, uri, record)
+
+
 def extract_main_tool(cwl_obj: CWLUtilLoadResult) -> CWLUtilObj:
     """Extracts the main tool from a CWL object."""
     if isinstance(cwl_obj, list):
@@ -74,19 +153,102 @@ def extract_main_tool(cwl_obj: CWLUtilLoadResult) -> CWLUtilObj:
     return cast(CWLUtilObj, cwl_obj)
 
 
+def process_id(cwl_obj: CWLUtilObj) -> str:
+    """
+    Returns the id of a process in its document: the fragment of its id
+    (e.g. "main" or "revtool.cwl" in a $graph), or "main" for a document
+    whose process has no id.
+    """
+    id_ = str(cwl_obj.id or "")
+    if "#" not in id_:
+        return "main"
+    return id_.rsplit("#", maxsplit=1)[-1]
+
+
+def index_processes(cwl_obj: CWLUtilLoadResult) -> Dict[str, CWLUtilObj]:
+    """
+    Indexes the processes of a document by process_id: all the processes of
+    a $graph, or the only process of another document.
+    """
+    objs = cwl_obj if isinstance(cwl_obj, list) else [cwl_obj]
+    return {process_id(obj): obj for obj in objs}
+
+
 class UnsupportedValueError(Exception):
     """Raised when an unsupported value is encountered."""
 
 
-@dataclass
-class SecondaryFile:
+def error_record(e: BaseException) -> Dict[str, str]:
+    """Returns the structured error of a record."""
+    return {"type": type(e).__name__, "message": str(e)}
+
+
+def _json_value(val: Any) -> Any:
+    """Converts a value like a default value to plain JSON types."""
+    if val is None or isinstance(val, (str, bool, int, float)):
+        return val
+    if isinstance(val, Mapping):
+        return {str(k): _json_value(v) for k, v in val.items()}
+    if isinstance(val, (list, tuple)):
+        return [_json_value(v) for v in val]
+    if hasattr(val, "__dict__"):
+        return _json_value(val.__dict__)
+    raise TypeError(f"Object of type {type(val).__name__} is not JSON serializable")  # noqa: E501
+
+
+def dumps_json(obj: Any, indent: bool = False) -> bytes:
+    """
+    Serializes plain JSON types to UTF-8 JSON bytes.
+    Uses orjson when it is installed (pip install cwl-inputs-parser[fast]).
+    The output is compact, or indented by 2 spaces if indent is True.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)  # noqa: E501
+        except TypeError:
+            # e.g. integers larger than 64 bits
+            pass
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")  # noqa: E501
+
+
+class Record:
+    """
+    Base of the slotted records: no per-instance __dict__, and the
+    comparison and repr of a dataclass, by the fields in __slots__.
+    """
+    __slots__: Tuple[str, ...] = ()
+
+    def _astuple(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._astuple() == other._astuple()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)  # noqa: E501
+        return f"{self.__class__.__name__}({fields})"
+
+
+class SecondaryFile(Record):
     """SecondaryFile"""
-    pattern: Optional[str] = None
-    required: Optional[bool] = True
+    __slots__ = ("pattern", "required")
 
+    def __init__(self,
+                 pattern: Optional[str] = None,
+                 required: Optional[bool] = True) -> None:
+        self.pattern = pattern
+        self.required = required
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Dump as dict."""
+        return {"pattern": self.pattern, "required": self.required}
 
-@dataclass
-class InputField:
+
+class InputField(Record):
     """
     InputField
     example:
@@ -105,103 +267,149 @@ class InputField:
         ],
     }
     """
-    default: Optional[Any] = None
-    doc: Optional[str] = None
-    id: Optional[str] = None
-    label: Optional[str] = None
-    type: Optional[str] = None
-    array: bool = False
-    required: bool = True
-    secondaryFiles: Optional[List[SecondaryFile]] = None
+    __slots__ = ("default", "doc", "id", "label", "type", "array",
+                 "required", "secondaryFiles")
+
+    def __init__(self,
+                 default: Optional[Any] = None,
+                 doc: Optional[str] = None,
+                 id: Optional[str] = None,
+                 label: Optional[str] = None,
+                 type: Optional[str] = None,
+                 array: bool = False,
+                 required: bool = True,
+                 secondaryFiles: Optional[List[SecondaryFile]] = None) -> None:  # noqa: E501
+        self.default = default
+        self.doc = doc
+        self.id = id
+        self.label = label
+        self.type = type
+        self.array = array
+        self.required = required
+        self.secondaryFiles = secondaryFiles
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Dump as dict."""
+        return {
+            "default": _json_value(self.default),
+            "doc": self.doc,
+            "id": self.id,
+            "label": self.label,
+            "type": self.type,
+            "array": self.array,
+            "required": self.required,
+            "secondaryFiles": None if self.secondaryFiles is None else [
+                secondary_file.as_dict()
+                for secondary_file in self.secondaryFiles
+            ],
+        }
 
 
 class Inputs:
-    """Generates InputField from a cwl-utils object."""
+    """
+    Generates InputField from a cwl-utils object.
+    With parse=False, the fields are not parsed into fields, and
+    iter_fields streams them instead.
+    """
 
-    def __init__(self, cwl_obj: CWLUtilLoadResult) -> None:
-        self.ori_cwl_obj = deepcopy(cwl_obj)
-        self.cwl_obj = deepcopy(extract_main_tool(cwl_obj))
+    def __init__(self, cwl_obj: CWLUtilLoadResult, parse: bool = True) -> None:  # noqa: E501
+        self.is_graph = isinstance(cwl_obj, list)
+        with span("extract_main_tool"):
+            main_obj = extract_main_tool(cwl_obj)
+        self.cwl_obj: Optional[CWLUtilObj] = main_obj
+        self.process_id = process_id(main_obj)
         self.fields: List[InputField] = []
-        self._parse()
+        if parse:
+            with span("parse"):
+                self._parse()
 
     def as_json(self) -> str:
         """Dump as json."""
-        def encode_default(item: Any) -> Dict[str, Any]:
-            if isinstance(item, object) and hasattr(item, '__dict__'):
-                return item.__dict__
-            else:
-                raise TypeError
+        with span("serialize"):
+            return json.dumps(self.as_dict(), indent=2)
 
-        return json.dumps(self.fields, default=encode_default, indent=2)
+    def as_json_bytes(self, indent: bool = False) -> bytes:
+        """Dump as compact (or indented) json bytes. See dumps_json."""
+        with span("serialize"):
+            return dumps_json(self.as_dict(), indent=indent)
 
-    def as_dict(self) -> Any:
+    def as_dict(self) -> List[Dict[str, Any]]:
         """Dump as dict."""
-        str_json = self.as_json()
-        return json.loads(str_json)
+        return [field.as_dict() for field in self.fields]
 
     def _parse(self) -> None:
-        """Parses inputs field from the CWL object."""
-        for inp_obj in self.cwl_obj.inputs:
-            if isinstance(inp_obj.type, str):
-                inp_field = self._typical_field(inp_obj)
-            elif isinstance(inp_obj.type, list):
-                if len(inp_obj.type) == 1:
-                    tmp_obj = deepcopy(inp_obj)
-                    tmp_obj.type = inp_obj.type[0]
-                    if isinstance(tmp_obj.type, str):
-                        inp_field = self._typical_field(tmp_obj)
-                    elif isinstance(tmp_obj.type, CommandInputArraySchema):
-                        inp_field = self._command__input_array_field(tmp_obj)  # noqa: E501
-                    elif isinstance(tmp_obj.type, InputArraySchema):
-                        inp_field = self._input_array_field(tmp_obj)
-                    else:
-                        raise UnsupportedValueError("The type field contains an unsupported format")  # noqa: E501
-                elif len(inp_obj.type) == 2:
-                    if 'null' in inp_obj.type:
-                        tmp_obj = deepcopy(inp_obj)
-                        for t in inp_obj.type:
-                            if t != 'null':
-                                tmp_obj.type = t
-                        inp_field = self._typical_field(tmp_obj)
-                        inp_field.required = False
-                    else:
-                        # [TODO] not support
-                        raise UnsupportedValueError("The union field does not support by cwl-inputs-parser")  # noqa: E501
-                else:
-                    # [TODO] not support
-                    raise UnsupportedValueError("The union field does not support by cwl-inputs-parser")  # noqa: E501
-            elif isinstance(inp_obj.type, CommandInputArraySchema):
-                if inp_obj.type.items not in ["boolean", "int", "string", "File", "Directory", "Any"]:  # noqa: E501
-                    raise UnsupportedValueError("The type field contains an unsupported format")  # noqa: E501
-                inp_field = self._command__input_array_field(inp_obj)
-            elif isinstance(inp_obj.type, CommandInputEnumSchema):
-                # [TODO] not support
-                # inp_field = self._command_input_enum_field(inp_obj)
-                raise UnsupportedValueError("The CommandInputEnumSchema field does not support by cwl-inputs-parser")  # noqa: E501
-            elif isinstance(inp_obj.type, CommandInputRecordSchema):
-                # [TODO] not support
-                # inp_field = self._command_input_record_field(inp_obj)
-                raise UnsupportedValueError("The CommandInputRecordSchema field does not support by cwl-inputs-parser")  # noqa: E501
-            elif isinstance(inp_obj.type, InputArraySchema):
-                if isinstance(inp_obj.type.items, InputRecordSchema):
-                    # [TODO] not support
-                    raise UnsupportedValueError("The InputRecordSchema field in the InputArraySchema field does not support by cwl-inputs-parser")  # noqa: E501
-                if inp_obj.type.items not in ["boolean", "int", "string", "File", "Directory", "Any"]:  # noqa: E501
-                    raise UnsupportedValueError("The type field contains an unsupported format")  # noqa: E501
-                inp_field = self._input_array_field(inp_obj)
-            elif isinstance(inp_obj.type, InputRecordSchema):
-                # [TODO] not support
-                raise UnsupportedValueError("The InputRecordSchema field does not support by cwl-inputs-parser")  # noqa: E501
-            else:
-                # [TODO] not support
-                raise UnsupportedValueError("The type field contains an unsupported format")  # noqa: E501
+        """
+        Parses inputs field from the CWL object.
+        The CWL object is only read, never copied or modified.
+        """
+        assert self.cwl_obj is not None, "the cwl-utils object is released"
+        normalize = self._normalizer().normalize
+        self.fields.extend(self._iter_fields(
+            (inp_obj, normalize(inp_obj.type)) for inp_obj in self.cwl_obj.inputs))  # noqa: E501
+
+    def _normalizer(self) -> TypeNormalizer:
+        """Returns the normalizer of the types of this document."""
+        return TypeNormalizer(schema_defs(self.cwl_obj))
+
+    def release(self) -> None:
+        """
+        Drops the cwl-utils object and keeps the parsed fields only, e.g.
+        before the Inputs is cached, as the loaded document and its
+        LoadingOptions are far larger than the fields.
+        """
+        self.cwl_obj = None
+
+    def iter_fields(self) -> Iterator[InputField]:
+        """
+        Returns an iterator of the InputFields, parsed one by one as they
+        are consumed and not kept, so the memory does not grow with the
+        number of inputs.
+        The types of all the inputs are checked before it is returned, so an
+        UnsupportedValueError is raised here rather than in the middle of
+        the iteration (e.g. of a streamed response).
+        """
+        if self.cwl_obj is None:
+            return iter(self.fields)
+        normalize = self._normalizer().normalize
+        # the descriptors are kept for the fields, which are built lazily
+        typed_inputs = [(inp_obj, normalize(inp_obj.type)) for inp_obj in self.cwl_obj.inputs]  # noqa: E501
+        for _, descriptor in typed_inputs:
+            if descriptor.error is not None:
+                raise UnsupportedValueError(descriptor.error)
+        return self._iter_fields(typed_inputs)
+
+    def _iter_fields(self, typed_inputs: Iterable[Tuple[Any, TypeDescriptor]]) -> Iterator[InputField]:  # noqa: E501
+        field_builders: Dict[str, Callable[[CommandInputParameter, Any], InputField]] = {  # noqa: E501
+            "boolean": self._boolean_field,
+            "int": self._int_field,
+            "string": self._string_field,
+            "File": self._file_field,
+            "stdin": self._stdin_field,
+            "Directory": self.directory_field,
+            "Any": self.any_field,
+            "command_input_array": self._command__input_array_field,
+            "input_array": self._input_array_field,
+        }
+        for inp_obj, descriptor in typed_inputs:
+            if descriptor.error is not None:
+                raise UnsupportedValueError(descriptor.error)
+            inp_field = field_builders[descriptor.kind](inp_obj, descriptor.type)  # noqa: E501
+            inp_field.required = descriptor.required
 
             if inp_field.type == "File":
                 if inp_obj.secondaryFiles:
                     inp_field.secondaryFiles = []
-                    for secondary_file in inp_obj.secondaryFiles:
-                        required = secondary_file.required
-                        pattern = secondary_file.pattern
+                    secondary_files = inp_obj.secondaryFiles
+                    if isinstance(secondary_files, str):
+                        secondary_files = [secondary_files]
+                    for secondary_file in secondary_files:
+                        if isinstance(secondary_file, str):
+                            # v1.0 and v1.1 documents may list the patterns
+                            required = None
+                            pattern = secondary_file
+                        else:
+                            required = secondary_file.required
+                            pattern = secondary_file.pattern
                         if pattern.endswith("?"):
                             required = False
                             pattern = pattern.rstrip("?")
@@ -214,52 +422,29 @@ class Inputs:
                             )
                         )
 
-            self.fields.append(inp_field)
-
-    def _typical_field(self, inp_obj: CommandInputParameter) -> InputField:
-        """
-        Generates a typical fields
-        like: boolean, int, string, File, stdin, Directory, Any
-        """
-        if inp_obj.type == "boolean":
-            return self._boolean_field(inp_obj)
-        elif inp_obj.type == "int":
-            return self._int_field(inp_obj)
-        elif inp_obj.type == "string":
-            return self._string_field(inp_obj)
-        elif inp_obj.type == "File":
-            return self._file_field(inp_obj)
-        elif inp_obj.type == "stdin":
-            return self._stdin_field(inp_obj)
-        elif inp_obj.type == "Directory":
-            return self.directory_field(inp_obj)
-        elif inp_obj.type == "Any":
-            return self.any_field(inp_obj)
-        else:
-            # [TODO] not support
-            raise UnsupportedValueError("The type field contains an unsupported format")  # noqa: E501
+            yield inp_field
 
     @staticmethod
     def _clean_val(val: Optional[Any]) -> Optional[Any]:
         """Cleans a value field."""
         if isinstance(val, str):
-            return deepcopy(val).replace("\n", " ").strip()
-        return deepcopy(val)
+            return val.replace("\n", " ").strip()
+        return val
 
-    def _template_field(self, inp_obj: CommandInputParameter) -> InputField:
+    def _template_field(self, inp_obj: CommandInputParameter, type_: Any) -> InputField:  # noqa: E501
         """Generates a InputField template from a CWL InputParameter."""
         id_ = self._clean_val(inp_obj.id)
         if isinstance(id_, str):
             id_ = id_.split("#")[-1]
         return InputField(
-            default=deepcopy(inp_obj.default),
+            default=inp_obj.default,
             doc=self._clean_val(inp_obj.doc),
             id=id_,
             label=self._clean_val(inp_obj.label),
-            type=self._clean_val(inp_obj.type),
+            type=type_,
         )
 
-    def _boolean_field(self, inp_obj: CommandInputParameter) -> InputField:
+    def _boolean_field(self, inp_obj: CommandInputParameter, type_: Any) -> InputField:  # noqa: E501
         """
         Generates a InputField from a CWL InputParameter.
         inp_obj example from 'v1.2/revsort-packed.cwl'
@@ -281,9 +466,9 @@ class Inputs:
         make-template result:
         reverse_sort: true  # default value of type "boolean".
         """
-        return self._template_field(inp_obj)
+        return self._template_field(inp_obj, type_)
 
-    def _int_field(self, inp_obj: CommandInputParameter) -> InputField:
+    def _int_field(self, inp_obj: CommandInputParameter, type_: Any) -> InputField:  # noqa: E501
         """
         Generates a InputField from a CWL InputParameter.
         inp_obj example from 'v1.2/bwa-mem-tool.cwl'
@@ -305,9 +490,9 @@ class Inputs:
         make-template result:
         minimum_seed_length: 0  # type "int"
         """
-        return self._template_field(inp_obj)
+        return self._template_field(inp_obj, type_)
 
-    def _string_field(self, inp_obj: CommandInputParameter) -> InputField:
+    def _string_field(self, inp_obj: CommandInputParameter, type_: Any) -> InputField:  # noqa: E501
         """
         Generates a InputField from a CWL InputParameter.
         inp_obj example from 'v1.2/pass-unconnected.cwl'
@@ -329,9 +514,9 @@ class Inputs:
         make-template result:
         inp2: hello inp2  # default value of type "string".
         """
-        return self._template_field(inp_obj)
+        return self._template_field(inp_obj, type_)
 
-    def _file_field(self, inp_obj: CommandInputParameter) -> InputField:
+    def _file_field(self, inp_obj: CommandInputParameter, type_: Any) -> InputField:  # noqa: E501
         """
         Generates a InputField from a CWL InputParameter.
         inp_obj example from 'v1.2/count-lines5-wf.cwl'
@@ -358,7 +543,7 @@ class Inputs:
         location field is not, an implementation may assign the value
         of the path field to location, and remove the path field.
         """
-        field = self._template_field(inp_obj)
+        field = self._template_field(inp_obj, type_)
         if isinstance(inp_obj.default, OrderedDict) and len(inp_obj.default) != 0:  # noqa: E501
             if "location" in inp_obj.default:
                 field.default = inp_obj.default["location"]
@@ -366,7 +551,7 @@ class Inputs:
                 field.default = inp_obj.default["path"]
         return field
 
-    def _stdin_field(self, inp_obj: CommandInputParameter) -> InputField:
+    def _stdin_field(self, inp_obj: CommandInputParameter, type_: Any) -> InputField:  # noqa: E501
         """
         Generates a InputField from a CWL InputParameter.
         inp_obj example from 'v1.2/cat-tool-shortcut.cwl'
@@ -390,11 +575,11 @@ class Inputs:
             class: File
             path: a/file/path
         """
-        field = self._file_field(inp_obj)
+        field = self._file_field(inp_obj, type_)
         field.type = "File"
         return field
 
-    def directory_field(self, inp_obj: CommandInputParameter) -> InputField:
+    def directory_field(self, inp_obj: CommandInputParameter, type_: Any) -> InputField:  # noqa: E501
         """
         Generates a InputField from a CWL InputParameter.
         inp_obj example from 'v1.2/dir.cwl'
@@ -418,9 +603,9 @@ class Inputs:
             class: Directory
             path: a/directory/path
         """
-        return self._template_field(inp_obj)
+        return self._template_field(inp_obj, type_)
 
-    def any_field(self, inp_obj: CommandInputParameter) -> InputField:
+    def any_field(self, inp_obj: CommandInputParameter, type_: Any) -> InputField:  # noqa: E501
         """
         Generates a InputField from a CWL InputParameter.
         inp_obj example from 'v1.2/null-expression1-tool.cwl'
@@ -442,9 +627,9 @@ class Inputs:
         make-template result:
         i1: "the-default"  # default value of type "Any".
         """
-        return self._template_field(inp_obj)
+        return self._template_field(inp_obj, type_)
 
-    def _command__input_array_field(self, inp_obj: CommandInputParameter) -> InputField:  # noqa: E501
+    def _command__input_array_field(self, inp_obj: CommandInputParameter, type_: Any) -> InputField:  # noqa: E501
         """
         Generates a InputField from a CWL InputParameter.
         [TODO] more check
@@ -487,8 +672,8 @@ class Inputs:
         'pattern': '${ return null; }',
         'required': None}
         """
-        field = self._template_field(inp_obj)
-        field.type = inp_obj.type.items
+        field = self._template_field(inp_obj, type_)
+        field.type = type_.items
         field.array = True
         return field
 
@@ -511,7 +696,7 @@ class Inputs:
         [TODO] do not know how to handle record field in CWL.
         """
 
-    def _input_array_field(self, inp_obj: CommandInputParameter) -> InputField:
+    def _input_array_field(self, inp_obj: CommandInputParameter, type_: Any) -> InputField:  # noqa: E501
         """
         Generates a InputField from a CWL InputParameter.
         inp_obj example from 'v1.2/count-lines3-wf.cwl'
@@ -546,66 +731,231 @@ class Inputs:
             - class: File
                 path: a/file/path
         """
-        field = self._template_field(inp_obj)
-        field.type = inp_obj.type.items
+        field = self._template_field(inp_obj, type_)
+        field.type = type_.items
         field.array = True
         if field.label is None:
-            field.label = self._clean_val(inp_obj.type.label)
+            field.label = self._clean_val(type_.label)
         if field.doc is None:
-            field.doc = self._clean_val(inp_obj.type.doc)
+            field.doc = self._clean_val(type_.doc)
         return field
 
 
-def wf_location_to_inputs(wf_location: Union[str, Path]) -> Inputs:
+class ProcessInputs:
+    """
+    Generates the Inputs of every process of a document (e.g. the tools of
+    a packed $graph) from a single load, keyed by process_id.
+    A process that cannot be parsed keeps its error instead, so it does not
+    fail the others.
+    """
+
+    def __init__(self, cwl_obj: CWLUtilLoadResult) -> None:
+        self.classes: Dict[str, str] = {}
+        self.inputs: Dict[str, Inputs] = {}
+        self.errors: Dict[str, Exception] = {}
+        with span("parse"):
+            for id_, obj in index_processes(cwl_obj).items():
+                self.classes[id_] = str(obj.class_)
+                try:
+                    inputs = Inputs(obj)
+                except UnsupportedValueError as e:
+                    self.errors[id_] = e
+                    continue
+                inputs.release()
+                self.inputs[id_] = inputs
+
+    def unknown_ids(self, ids: Iterable[str]) -> List[str]:
+        """Returns the ids that are not processes of the document."""
+        return [id_ for id_ in ids if id_ not in self.classes]
+
+    def as_dict(self, ids: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Dump as dict, of all the processes or of ids only:
+        {"main": {"class": "Workflow", "inputs": [...]},
+         "tool.cwl": {"class": "CommandLineTool", "error": {...}}}
+        Raises KeyError for an unknown id.
+        """
+        result: Dict[str, Any] = {}
+        for id_ in self.classes if ids is None else ids:
+            record: Dict[str, Any] = {"class": self.classes[id_]}
+            if id_ in self.inputs:
+                record["inputs"] = self.inputs[id_].as_dict()
+            else:
+                record["error"] = error_record(self.errors[id_])
+            result[id_] = record
+        return result
+
+    def as_json_bytes(self, ids: Optional[Iterable[str]] = None) -> bytes:
+        """Dump as compact json bytes. See dumps_json."""
+        with span("serialize"):
+            return dumps_json(self.as_dict(ids))
+
+
+# Parsed Inputs keyed by content_hash() of the document text and its base URI.
+# The entries keep the parsed fields only (see Inputs.release), and the size
+# of an entry is the size of the source document in bytes.
+INPUTS_CACHE_SIZE = 32 * 1024 * 1024
+INPUTS_CACHE: LRUCache[Inputs] = LRUCache(max_size=INPUTS_CACHE_SIZE)
+
+
+def wf_content_to_inputs(wf_content: str,
+                         uri: str,
+                         use_cache: bool = True,
+                         record: Optional[Dict[str, str]] = None) -> Inputs:
+    """
+    Generates Inputs from the content of CWL Workflow.
+    The result is cached by the hash of the content and the base URI,
+    so the returned Inputs may be shared and must not be modified.
+    record, if given, collects the referenced documents that the load
+    fetches; the document is then always loaded.
+    """
+    key = content_hash(wf_content, uri)
+    if use_cache and record is None:
+        cached = INPUTS_CACHE.get(key)
+        if cached is not None:
+            return cached
+    wf_obj = load_cwl_document(wf_content, uri, record)
+    inputs = Inputs(wf_obj)
+    inputs.release()
+    if use_cache:
+        INPUTS_CACHE.put(key, inputs, size=len(wf_content.encode("utf-8")))
+    return inputs
+
+
+def wf_location_to_inputs(wf_location: Union[str, Path],
+                          use_cache: bool = True) -> Inputs:
     """
     Generates Inputs from a location of CWL Workflow.
     """
     wf_docs = fetch_document(wf_location)
-    wf_obj = load_document_by_string(wf_docs, uri=as_uri(wf_location))
-    return Inputs(wf_obj)
-
-
-def cwl_make_template(wf_location: Union[str, Path]) -> str:
-    """Returns the results of cwltool --make-template."""
-    logging.getLogger("cwltool").setLevel(logging.ERROR)
-    logging.getLogger("salad").setLevel(logging.ERROR)
-
-    parser = arg_parser()
-    argcomplete.autocomplete(parser)
-    args = parser.parse_args(["--make-template", str(wf_location)])
-    for key, val in get_default_args().items():
-        if not hasattr(args, key):
-            setattr(args, key, val)
-    runtimeContext = RuntimeContext(vars(args))
-    loadingContext = setup_loadingContext(None, runtimeContext, args)
-    uri, _ = resolve_tool_uri(
-        args.workflow,
-        resolver=loadingContext.resolver,
-        fetcher_constructor=loadingContext.fetcher_constructor,
-    )
-    loadingContext, workflowobj, uri = cwltool_fetch_document(
-        uri,
-        loadingContext
-    )
-    loadingContext, uri = resolve_and_validate_document(
-        loadingContext,
-        workflowobj,
-        uri,
-    )
-
-    def my_represent_none(self: Any, data: Any) -> Any:
-        """Force clean representation of 'null'."""
-        return self.represent_scalar("tag:yaml.org,2002:null", "null")
-
-    ruamel.yaml.representer.RoundTripRepresenter.add_representer(
-        type(None), my_represent_none
-    )
-    yaml = YAML()
-    yaml.default_flow_style = False
-    yaml.indent = 4
-    yaml.block_seq_indent = 2
-    buf = io.BytesIO()
-    yaml.dump(generate_input_template(make_tool(uri, loadingContext)), buf)
-    yaml_str = buf.getvalue().decode("utf-8")
-
-    return yaml_str
+    return wf_content_to_inputs(wf_docs, as_uri(wf_location), use_cache)
+
+
+# Parsed ProcessInputs, keyed and sized like INPUTS_CACHE
+PROCESS_INPUTS_CACHE_SIZE = 32 * 1024 * 1024
+PROCESS_INPUTS_CACHE: LRUCache[ProcessInputs] = LRUCache(max_size=PROCESS_INPUTS_CACHE_SIZE)  # noqa: E501
+
+
+def wf_content_to_process_inputs(wf_content: str,
+                                 uri: str,
+                                 use_cache: bool = True) -> ProcessInputs:
+    """
+    Generates the Inputs of every process of the content of a CWL document.
+    The result is cached like wf_content_to_inputs.
+    """
+    key = content_hash(wf_content, uri)
+    if use_cache:
+        cached = PROCESS_INPUTS_CACHE.get(key)
+        if cached is not None:
+            return cached
+    process_inputs = ProcessInputs(load_cwl_document(wf_content, uri))
+    if use_cache:
+        PROCESS_INPUTS_CACHE.put(key, process_inputs,
+                                 size=len(wf_content.encode("utf-8")))
+    return process_inputs
+
+
+def wf_location_to_process_inputs(wf_location: Union[str, Path],
+                                  use_cache: bool = True) -> ProcessInputs:
+    """
+    Generates the Inputs of every process of a location of CWL document.
+    """
+    wf_docs = fetch_document(wf_location)
+    return wf_content_to_process_inputs(wf_docs, as_uri(wf_location), use_cache)  # noqa: E501
+
+
+def wf_content_to_input_fields(wf_content: str, uri: str) -> Iterator[InputField]:  # noqa: E501
+    """
+    Generates the InputFields of the content of CWL Workflow one by one,
+    without keeping them (see Inputs.iter_fields).
+    The fields of cached Inputs are used if any, but the streamed fields
+    are not cached.
+    """
+    cached = INPUTS_CACHE.get(content_hash(wf_content, uri))
+    if cached is not None:
+        return iter(cached.fields)
+    wf_obj = load_cwl_document(wf_content, uri)
+    return Inputs(wf_obj, parse=False).iter_fields()
+
+
+def wf_location_to_input_fields(wf_location: Union[str, Path]) -> Iterator[InputField]:  # noqa: E501
+    """
+    Generates the InputFields of a location of CWL Workflow one by one.
+    """
+    wf_docs = fetch_document(wf_location)
+    return wf_content_to_input_fields(wf_docs, as_uri(wf_location))
+
+
+def iter_json(fields: Iterable[InputField], indent: bool = False) -> Iterator[bytes]:  # noqa: E501
+    """
+    Serializes InputFields to a JSON array chunk by chunk, one chunk per
+    field, with the same bytes as Inputs.as_json_bytes.
+    """
+    first = True
+    for field in fields:
+        chunk = dumps_json(field.as_dict(), indent=indent)
+        if indent:
+            chunk = b"\n".join(b"  " + line for line in chunk.split(b"\n"))
+            yield (b"[\n" if first else b",\n") + chunk
+        else:
+            yield (b"[" if first else b",") + chunk
+        first = False
+    if first:
+        yield b"[]"
+    else:
+        yield b"\n]" if indent else b"]"
+
+
+def write_json(fields: Iterable[InputField], file: IO[bytes], indent: bool = False) -> None:  # noqa: E501
+    """Writes InputFields to a binary file as a JSON array, streaming."""
+    for chunk in iter_json(fields, indent):
+        file.write(chunk)
+
+
+def cwl_make_template(wf_location: Union[str, Path],
+                      use_cache: bool = True) -> str:
+    """
+    Returns the results of cwltool --make-template.
+    The template is rendered from the parsed Inputs, and made by the shared
+    TemplateEngine (which imports cwltool on first use) only for the
+    documents that make_input_template does not support and the documents
+    that cannot be loaded, so that cwltool reports their errors. The errors
+    of fetching the document are raised as is.
+    Both templates are cached with the content hashes of the root document
+    and the documents it loads, and used only while none has changed.
+    """
+    from cwl_inputs_parser.input_template import make_cached_template
+    uri = as_uri(wf_location)
+
+    def load(record: Dict[str, str]) -> Inputs:
+        wf_content = fetch_document(wf_location)
+        record[uri] = wf_content
+        return wf_content_to_inputs(wf_content, uri, record=record)
+
+    try:
+        return make_cached_template(uri, load, use_cache)
+    except (UnsupportedValueError, ValidationException):
+        pass
+    from cwl_inputs_parser.template import get_template_engine
+    return get_template_engine().make_template(wf_location, use_cache)
+
+
+def cwl_make_template_from_content(wf_content: str,
+                                   uri: str,
+                                   use_cache: bool = True) -> str:
+    """
+    Returns the results of cwltool --make-template for the content of CWL
+    Workflow. Relative references are resolved against uri.
+    Like cwl_make_template, cwltool is used only as a fallback.
+    """
+    from cwl_inputs_parser.input_template import make_cached_template
+    try:
+        return make_cached_template(
+            content_hash(wf_content, uri),
+            lambda record: wf_content_to_inputs(wf_content, uri, record=record),  # noqa: E501
+            use_cache)
+    except (UnsupportedValueError, ValidationException):
+        pass
+    from cwl_inputs_parser.template import get_template_engine
+    return get_template_engine().make_template_from_content(
+        wf_content, uri, use_cache)
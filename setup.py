@@ -26,12 +26,27 @@ setup(
         "ruamel.yaml",
     ],
     extras_require={
+        "async": [
+            "httpx",
+            "starlette",
+            "uvicorn",
+        ],
+        "fast": [
+            "orjson",
+        ],
+        "production": [
+            "gunicorn",
+        ],
         "testing": [
             "flake8",
+            "gunicorn",
+            "httpx",
             "isort",
             "jsonschema",
             "mypy",
+            "orjson",
             "pytest",
+            "starlette",
             "types-PyYAML",
             "types-requests",
             "types-setuptools",
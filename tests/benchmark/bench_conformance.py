@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Measures the phases of the parser over the documents of the CWL v1.2
+conformance tests: wf_location_to_inputs, Inputs (on pre-loaded cwl-utils
+objects), Inputs.as_json and cwl_make_template, all without the caches.
+Reports the p50/p95/max latency per document and the peak memory of a
+document (tracemalloc, measured in a separate pass) for each phase, and
+compares them with conformance_baseline.json: a p50, p95 or peak memory
+above the baseline by more than the threshold is a regression, unless the
+latency grows by less than --min-delta ms (the timer noise of the phases
+that take microseconds).
+A document that fails in a phase is counted as an error of the phase.
+
+usage: python3 tests/benchmark/bench_conformance.py [--repeat N] [--output PATH] [--baseline PATH] [--threshold RATIO] [--min-delta MS] [--record]
+"""  # noqa: E501
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from cwl_inputs_parser.utils import (Inputs, as_uri, cwl_make_template,
+                                     fetch_document, load_cwl_document,
+                                     wf_location_to_inputs)
+from yaml import safe_load
+
+CONFORMANCE_TEST_DIR = Path(__file__).parent.parent.joinpath("cwl_conformance_test")  # noqa: E501
+CONFORMANCE_TEST_PATH = CONFORMANCE_TEST_DIR.joinpath("conformance_test_v1.2_fixed.yaml")  # noqa: E501
+BASELINE_PATH = Path(__file__).parent.joinpath("conformance_baseline.json")
+COMPARED_METRICS = ["p50_ms", "p95_ms", "peak_memory_kib"]
+
+
+def load_paths() -> List[Path]:
+    """Returns the documents of the conformance tests, each once."""
+    conformance_test = safe_load(CONFORMANCE_TEST_PATH.open(mode="r", encoding="utf-8"))  # noqa: E501
+    paths = {CONFORMANCE_TEST_DIR.joinpath(test["tool"]) for test in conformance_test}  # noqa: E501
+    return sorted(paths)
+
+
+def load_objects(paths: List[Path]) -> List[Any]:
+    objects = []
+    for path in paths:
+        try:
+            objects.append(load_cwl_document(fetch_document(path), as_uri(path)))  # noqa: E501
+        except Exception:
+            continue
+    return objects
+
+
+def phases(paths: List[Path]) -> List[Tuple[str, Callable[[Any], Any], List[Any]]]:  # noqa: E501
+    """Returns the name, the function and the arguments of each phase."""
+    objects = load_objects(paths)
+    inputs = []
+    for cwl_obj in objects:
+        try:
+            inputs.append(Inputs(cwl_obj))
+        except Exception:
+            continue
+    return [
+        ("wf_location_to_inputs", lambda path: wf_location_to_inputs(path, use_cache=False), paths),  # noqa: E501
+        ("Inputs", Inputs, objects),
+        ("as_json", lambda inp: inp.as_json(), inputs),
+        ("cwl_make_template", lambda path: cwl_make_template(path, use_cache=False), paths),  # noqa: E501
+    ]
+
+
+def percentile(sorted_values: List[float], ratio: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    index = max(0, min(len(sorted_values) - 1, round(ratio * len(sorted_values)) - 1))  # noqa: E501
+    return sorted_values[index]
+
+
+def measure(func: Callable[[Any], Any], args: List[Any], repeat: int) -> Dict[str, Any]:  # noqa: E501
+    """Returns the latency and peak memory statistics of a phase."""
+    succeeded = []
+    for arg in args:
+        try:
+            func(arg)  # warm up
+        except Exception:
+            continue
+        succeeded.append(arg)
+
+    timings = []
+    for arg in succeeded:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func(arg)
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    peak = 0
+    tracemalloc.start()
+    for arg in succeeded:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        func(arg)
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+
+    return {
+        "documents": len(succeeded),
+        "errors": len(args) - len(succeeded),
+        "p50_ms": round(percentile(timings, 0.5) * 1e3, 3) if timings else None,  # noqa: E501
+        "p95_ms": round(percentile(timings, 0.95) * 1e3, 3) if timings else None,  # noqa: E501
+        "max_ms": round(timings[-1] * 1e3, 3) if timings else None,
+        "peak_memory_kib": round(peak / 1024, 1),
+    }
+
+
+def regressions(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float, min_delta: float) -> List[str]:  # noqa: E501
+    """Returns the metrics above the baseline by more than the threshold."""
+    found = []
+    for phase, stats in results["phases"].items():
+        base_stats = baseline["phases"].get(phase)
+        if base_stats is None:
+            continue
+        for metric in COMPARED_METRICS:
+            value, base = stats.get(metric), base_stats.get(metric)
+            if value is None or not base:
+                continue
+            if metric.endswith("_ms") and value - base < min_delta:
+                continue
+            if value > base * (1 + threshold):
+                found.append(f"{phase} {metric}: {value} > {base} * {1 + threshold:.2f}")  # noqa: E501
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=Path, help="writes the results as JSON")  # noqa: E501
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.3)
+    parser.add_argument("--min-delta", type=float, default=0.1)
+    parser.add_argument("--record", action="store_true",
+                        help="writes the results as the new baseline")
+    args = parser.parse_args()
+
+    paths = load_paths()
+    results: Dict[str, Any] = {
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "phases": {},
+    }
+    print(f"documents: {len(paths)}, repeat: {args.repeat}")
+    for name, func, phase_args in phases(paths):
+        stats = measure(func, phase_args, args.repeat)
+        results["phases"][name] = stats
+        print(f"{name:>22}: p50 {stats['p50_ms']:8.3f} ms, "
+              f"p95 {stats['p95_ms']:8.3f} ms, max {stats['max_ms']:8.3f} ms, "  # noqa: E501
+              f"peak {stats['peak_memory_kib']:8.1f} KiB "
+              f"({stats['documents']} documents, {stats['errors']} errors)")
+
+    dumped = json.dumps(results, indent=2) + "\n"
+    if args.output is not None:
+        args.output.write_text(dumped, encoding="utf-8")
+        print(f"wrote the results to {args.output}")
+    if args.record:
+        args.baseline.write_text(dumped, encoding="utf-8")
+        print(f"recorded the baseline in {args.baseline}")
+        return
+    if not args.baseline.exists():
+        print(f"no baseline at {args.baseline}")
+        return
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    found = regressions(results, baseline, args.threshold, args.min_delta)
+    for regression in found:
+        print(f"REGRESSION {regression}")
+    if found:
+        sys.exit(1)
+    print(f"no regression against {args.baseline} (threshold {args.threshold})")  # noqa: E501
+
+
+if __name__ == "__main__":
+    main()
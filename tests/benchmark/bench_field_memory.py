@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Measures the bytes per cached field of the InputField and SecondaryFile
+records of the conformance test documents: the slotted records against a
+replica of the former dataclasses with a per-instance __dict__.
+The values of the fields (ids, docs, defaults, ...) are shared by both and
+not counted, so the difference is the overhead of the records.
+
+usage: python3 tests/benchmark/bench_field_memory.py
+"""
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Tuple
+
+from cwl_inputs_parser.utils import (InputField, Inputs, SecondaryFile, as_uri,
+                                     fetch_document, load_cwl_document)
+from yaml import safe_load
+
+CONFORMANCE_TEST_DIR = Path(__file__).parent.parent.joinpath("cwl_conformance_test")  # noqa: E501
+CONFORMANCE_TEST_PATH = CONFORMANCE_TEST_DIR.joinpath("conformance_test_v1.2_fixed.yaml")  # noqa: E501
+
+
+@dataclass
+class DictSecondaryFile:
+    """Replica of SecondaryFile before the slotted records."""
+    pattern: Optional[str] = None
+    required: Optional[bool] = True
+
+
+@dataclass
+class DictInputField:
+    """Replica of InputField before the slotted records."""
+    default: Optional[Any] = None
+    doc: Optional[str] = None
+    id: Optional[str] = None
+    label: Optional[str] = None
+    type: Optional[str] = None
+    array: bool = False
+    required: bool = True
+    secondaryFiles: Optional[List[DictSecondaryFile]] = None
+
+
+def load_fields() -> List[InputField]:
+    """Returns the fields of the documents that Inputs can parse."""
+    conformance_test = safe_load(CONFORMANCE_TEST_PATH.open(mode="r", encoding="utf-8"))  # noqa: E501
+    paths = sorted({CONFORMANCE_TEST_DIR.joinpath(test["tool"]) for test in conformance_test})  # noqa: E501
+    fields = []
+    for path in paths:
+        try:
+            inputs = Inputs(load_cwl_document(fetch_document(path), as_uri(path)))  # noqa: E501
+        except Exception:
+            continue
+        fields.extend(inputs.fields)
+    return fields
+
+
+def rebuild(fields: List[InputField], field_class: Any, secondary_file_class: Any) -> List[Any]:  # noqa: E501
+    return [
+        field_class(
+            default=field.default,
+            doc=field.doc,
+            id=field.id,
+            label=field.label,
+            type=field.type,
+            array=field.array,
+            required=field.required,
+            secondaryFiles=None if field.secondaryFiles is None else [
+                secondary_file_class(pattern=s.pattern, required=s.required)
+                for s in field.secondaryFiles
+            ],
+        )
+        for field in fields
+    ]
+
+
+def allocated(build: Callable[[], List[Any]]) -> Tuple[int, List[Any]]:
+    """Returns the bytes allocated by build and its result."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, records
+
+
+def main() -> None:
+    fields = load_fields()
+    n_secondary_files = sum(len(field.secondaryFiles or []) for field in fields)  # noqa: E501
+    print(f"fields: {len(fields)}, secondaryFiles: {n_secondary_files}")
+    for name, field_class, secondary_file_class in [
+        ("dataclass", DictInputField, DictSecondaryFile),
+        ("slotted", InputField, SecondaryFile),
+    ]:
+        size, records = allocated(lambda: rebuild(fields, field_class, secondary_file_class))  # noqa: E501
+        # the list holding the records is not a part of them
+        size -= len(records) * 8
+        print(f"{name:>10}: {size:8d} bytes, {size / len(fields):6.1f} bytes/field")  # noqa: E501
+
+
+if __name__ == "__main__":
+    main()
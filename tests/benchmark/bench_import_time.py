@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Measures the cold start of the modules in import_time_budget.json with
+python -X importtime, and fails if one of them regresses past its budget.
+Each module is imported in fresh interpreters, and the best of the runs is
+compared with the budget.
+--record writes the measured times plus the headroom as the new budgets.
+
+usage: python3 tests/benchmark/bench_import_time.py [--record] [--repeat N] [--headroom RATIO]
+"""  # noqa: E501
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict
+
+BUDGET_PATH = Path(__file__).parent.joinpath("import_time_budget.json")
+
+
+def import_time(module: str) -> float:
+    """Returns the cumulative import time of a module in ms."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        check=True,
+        universal_newlines=True,
+    )
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module and fields[2].startswith(" " + module):  # noqa: E501
+            return int(fields[1]) / 1000
+    raise RuntimeError(f"No import time of {module}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--record", action="store_true")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--headroom", type=float, default=0.3)
+    args = parser.parse_args()
+
+    budgets: Dict[str, float] = json.loads(BUDGET_PATH.read_text(encoding="utf-8"))  # noqa: E501
+    measured = {
+        module: min(import_time(module) for _ in range(args.repeat))
+        for module in budgets
+    }
+    if args.record:
+        new_budgets = {module: round(ms * (1 + args.headroom))
+                       for module, ms in measured.items()}
+        BUDGET_PATH.write_text(json.dumps(new_budgets, indent=2) + "\n", encoding="utf-8")  # noqa: E501
+        print(f"recorded budgets in {BUDGET_PATH}")
+        return
+
+    failed = False
+    print(f"best of {args.repeat}")
+    for module, ms in measured.items():
+        status = "ok" if ms <= budgets[module] else "OVER BUDGET"
+        failed = failed or ms > budgets[module]
+        print(f"{module:>30}: {ms:8.1f} ms (budget {budgets[module]} ms) {status}")  # noqa: E501
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Compares the time and the peak memory of constructing Inputs from
+pre-loaded cwl-utils objects of the conformance test documents, with and
+without the deep copies the constructor used to make.
+
+usage: python3 tests/benchmark/bench_inputs_construction.py [repeat]
+"""
+import sys
+import time
+import tracemalloc
+from copy import deepcopy
+from pathlib import Path
+from typing import Any, Callable, List, Tuple
+
+from cwl_inputs_parser.utils import (Inputs, as_uri, extract_main_tool,
+                                     fetch_document, load_cwl_document)
+from yaml import safe_load
+
+CONFORMANCE_TEST_DIR = Path(__file__).parent.parent.joinpath("cwl_conformance_test")  # noqa: E501
+CONFORMANCE_TEST_PATH = CONFORMANCE_TEST_DIR.joinpath("conformance_test_v1.2_fixed.yaml")  # noqa: E501
+
+
+def load_corpus() -> List[Any]:
+    """Loads the documents that Inputs can parse."""
+    conformance_test = safe_load(CONFORMANCE_TEST_PATH.open(mode="r", encoding="utf-8"))  # noqa: E501
+    corpus = []
+    for test in conformance_test:
+        wf_path = CONFORMANCE_TEST_DIR.joinpath(test["tool"])
+        try:
+            cwl_obj = load_cwl_document(fetch_document(wf_path), as_uri(wf_path))  # noqa: E501
+            Inputs(cwl_obj)
+        except Exception:
+            continue
+        corpus.append(cwl_obj)
+    return corpus
+
+
+def copy_free(cwl_obj: Any) -> Inputs:
+    return Inputs(cwl_obj)
+
+
+def with_copies(cwl_obj: Any) -> Inputs:
+    """The deep copies of the former Inputs.__init__."""
+    deepcopy(cwl_obj)
+    return Inputs(deepcopy(extract_main_tool(cwl_obj)))
+
+
+def measure(func: Callable[[Any], Inputs], corpus: List[Any], repeat: int) -> Tuple[float, int]:  # noqa: E501
+    """Returns the total seconds and the largest peak memory in bytes."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for cwl_obj in corpus:
+            func(cwl_obj)
+    elapsed = time.perf_counter() - start
+
+    peak = 0
+    for cwl_obj in corpus:
+        tracemalloc.start()
+        func(cwl_obj)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> None:
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    corpus = load_corpus()
+    print(f"documents: {len(corpus)}, repeat: {repeat}")
+    for name, func in [("with copies", with_copies), ("copy-free", copy_free)]:  # noqa: E501
+        elapsed, peak = measure(func, corpus, repeat)
+        print(f"{name:>12}: {elapsed:8.3f} s total, "
+              f"{elapsed / (repeat * len(corpus)) * 1e6:8.1f} us/doc, "
+              f"peak {peak / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
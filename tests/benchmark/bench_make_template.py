@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Measures the latency of repeated cwl_make_template calls on the same
+documents: a replica of the former per-call setup (argument parser, default
+arguments, contexts, logger levels and YAML dumper on every call) against
+the long-lived TemplateEngine, without and with its template cache, and
+the native input template rendered from the parsed Inputs.
+
+usage: python3 tests/benchmark/bench_make_template.py [repeat] [cwl_file ...]
+"""
+import io
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, List
+
+import ruamel.yaml
+from cwltool.main import RuntimeContext, arg_parser, argcomplete
+from cwltool.main import fetch_document as cwltool_fetch_document
+from cwltool.main import (generate_input_template, get_default_args, make_tool,
+                          resolve_and_validate_document, resolve_tool_uri,
+                          setup_loadingContext)
+from ruamel.yaml.main import YAML
+
+from cwl_inputs_parser.input_template import make_input_template
+from cwl_inputs_parser.remote import RemoteFetcher
+from cwl_inputs_parser.template import TemplateEngine
+from cwl_inputs_parser.utils import wf_location_to_inputs
+
+CONFORMANCE_DIR = Path(__file__).parent.parent.joinpath("cwl_conformance_test/v1.2")  # noqa: E501
+DEFAULT_DOCUMENTS = ["wc-tool.cwl", "revsort-packed.cwl", "count-lines1-wf.cwl"]
+
+
+def per_call_setup(wf_location: str) -> str:
+    """Replica of cwl_make_template before TemplateEngine."""
+    logging.getLogger("cwltool").setLevel(logging.ERROR)
+    logging.getLogger("salad").setLevel(logging.ERROR)
+
+    parser = arg_parser()
+    argcomplete.autocomplete(parser)
+    args = parser.parse_args(["--make-template", wf_location])
+    for key, val in get_default_args().items():
+        if not hasattr(args, key):
+            setattr(args, key, val)
+    runtimeContext = RuntimeContext(vars(args))
+    loadingContext = setup_loadingContext(None, runtimeContext, args)
+    loadingContext.fetcher_constructor = lambda cache, session: RemoteFetcher(cache)  # noqa: E501
+    uri, _ = resolve_tool_uri(
+        args.workflow,
+        resolver=loadingContext.resolver,
+        fetcher_constructor=loadingContext.fetcher_constructor,
+    )
+    loadingContext, workflowobj, uri = cwltool_fetch_document(uri, loadingContext)  # noqa: E501
+    loadingContext, uri = resolve_and_validate_document(loadingContext, workflowobj, uri)  # noqa: E501
+
+    def my_represent_none(self: Any, data: Any) -> Any:
+        return self.represent_scalar("tag:yaml.org,2002:null", "null")
+
+    ruamel.yaml.representer.RoundTripRepresenter.add_representer(
+        type(None), my_represent_none
+    )
+    yaml = YAML()
+    yaml.default_flow_style = False
+    yaml.indent = 4
+    yaml.block_seq_indent = 2
+    buf = io.BytesIO()
+    yaml.dump(generate_input_template(make_tool(uri, loadingContext)), buf)
+    return buf.getvalue().decode("utf-8")
+
+
+def native(wf_location: str) -> str:
+    """Parses the document and renders the template without cwltool."""
+    return make_input_template(wf_location_to_inputs(wf_location, use_cache=False))  # noqa: E501
+
+
+def latencies(func: Callable[[str], str], location: str, repeat: int) -> List[float]:  # noqa: E501
+    func(location)  # warm up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(location)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main() -> None:
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    locations = sys.argv[2:] or [str(CONFORMANCE_DIR.joinpath(name)) for name in DEFAULT_DOCUMENTS]  # noqa: E501
+    engine = TemplateEngine()
+    print(f"repeat: {repeat}")
+    for location in locations:
+        assert per_call_setup(location) == engine.make_template(location) == native(location)  # noqa: E501
+        print(Path(location).name)
+        for name, func in [
+            ("per-call setup", per_call_setup),
+            ("TemplateEngine", lambda loc: engine.make_template(loc, use_cache=False)),  # noqa: E501
+            ("cached", engine.make_template),
+            ("native", native),
+        ]:
+            timings = latencies(func, location, repeat)
+            print(f"{name:>16}: p50 {statistics.median(timings) * 1e3:7.2f} ms, "  # noqa: E501
+                  f"min {min(timings) * 1e3:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Measures the peak memory (tracemalloc) of serializing the inputs of
+generated CommandLineTools with many inputs: Inputs(...).as_json_bytes()
+against the chunks of iter_json(Inputs(..., parse=False).iter_fields())
+written out one by one, as the CLI and the ?stream=1 responses do.
+The tools are loaded beforehand, so only the parsing and the serialization
+are measured.
+
+usage: python3 tests/benchmark/bench_streaming.py [N_INPUTS ...]
+"""
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, List, Tuple
+
+from cwl_inputs_parser.utils import Inputs, iter_json, load_cwl_document
+
+DEFAULT_N_INPUTS = [100, 1000, 10000]
+
+
+def generate_tool(n_inputs: int) -> str:
+    """Returns a CommandLineTool with n_inputs inputs of various types."""
+    lines = [
+        "cwlVersion: v1.2",
+        "class: CommandLineTool",
+        "baseCommand: echo",
+        "outputs: []",
+        "inputs:",
+    ]
+    types = ["string", "int?", "File", "boolean", "string[]"]
+    for i in range(n_inputs):
+        lines.append(f"  input_{i}:")
+        lines.append(f"    type: {types[i % len(types)]}")
+        lines.append(f"    doc: The input number {i} of the generated tool")
+    return "\n".join(lines) + "\n"
+
+
+def eager(cwl_obj: Any) -> int:
+    return len(Inputs(cwl_obj).as_json_bytes())
+
+
+def streamed(cwl_obj: Any) -> int:
+    written = 0
+    for chunk in iter_json(Inputs(cwl_obj, parse=False).iter_fields()):
+        written += len(chunk)
+    return written
+
+
+def peak(func: Callable[[Any], int], cwl_obj: Any) -> Tuple[int, float, int]:  # noqa: E501
+    """Returns the peak bytes, the elapsed seconds and the output size."""
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    size = func(cwl_obj)
+    elapsed = time.perf_counter() - start
+    peak_bytes = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return peak_bytes, elapsed, size
+
+
+def main() -> None:
+    n_inputs_list: List[int] = [int(arg) for arg in sys.argv[1:]] or DEFAULT_N_INPUTS  # noqa: E501
+    for n_inputs in n_inputs_list:
+        cwl_obj = load_cwl_document(generate_tool(n_inputs), f"file:///tmp/generated_{n_inputs}.cwl")  # noqa: E501
+        for name, func in [("eager", eager), ("streamed", streamed)]:
+            peak_bytes, elapsed, size = peak(func, cwl_obj)
+            print(f"{n_inputs:>6} inputs, {name:>8}: peak {peak_bytes / 1024:9.1f} KiB, "  # noqa: E501
+                  f"{elapsed * 1e3:8.1f} ms, output {size / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Measures Inputs on synthetic CommandLineTools with thousands of inputs.
+Every input type of the tools is one that Inputs supports, and the array
+schemas are shared between inputs like SchemaDefRequirement types.
+The type resolution alone is also compared with a replica of the isinstance
+ladder that Inputs._parse used before TypeNormalizer.
+
+usage: python3 tests/benchmark/bench_type_normalization.py [n_inputs] [repeat]
+"""
+import sys
+import time
+from typing import Any, Callable, List
+
+from cwl_inputs_parser.normalize import TypeNormalizer
+from cwl_inputs_parser.utils import Inputs
+from cwl_utils.parser.cwl_v1_2 import (CommandInputArraySchema,
+                                       CommandInputEnumSchema,
+                                       CommandInputParameter,
+                                       CommandInputRecordSchema,
+                                       CommandLineTool, InputArraySchema,
+                                       InputRecordSchema, LoadingOptions)
+
+TYPICAL = ["boolean", "int", "string", "File", "stdin", "Directory", "Any"]
+
+
+def ladder_typical(type_: Any) -> str:
+    for name in TYPICAL:
+        if type_ == name:
+            return name
+    raise ValueError
+
+
+def ladder(type_: Any) -> Any:
+    """Replica of the former isinstance ladder, returning the kind."""
+    if isinstance(type_, str):
+        return ladder_typical(type_)
+    elif isinstance(type_, list):
+        if len(type_) == 1:
+            if isinstance(type_[0], str):
+                return ladder_typical(type_[0])
+            elif isinstance(type_[0], CommandInputArraySchema):
+                return "command_input_array"
+            elif isinstance(type_[0], InputArraySchema):
+                return "input_array"
+            raise ValueError
+        elif len(type_) == 2 and "null" in type_:
+            for t in type_:
+                if t != "null":
+                    inner = t
+            return ladder_typical(inner)
+        raise ValueError
+    elif isinstance(type_, CommandInputArraySchema):
+        if type_.items not in ["boolean", "int", "string", "File", "Directory", "Any"]:  # noqa: E501
+            raise ValueError
+        return "command_input_array"
+    elif isinstance(type_, CommandInputEnumSchema):
+        raise ValueError
+    elif isinstance(type_, CommandInputRecordSchema):
+        raise ValueError
+    elif isinstance(type_, InputArraySchema):
+        if isinstance(type_.items, InputRecordSchema):
+            raise ValueError
+        if type_.items not in ["boolean", "int", "string", "File", "Directory", "Any"]:  # noqa: E501
+            raise ValueError
+        return "input_array"
+    raise ValueError
+
+
+def normalizer(types: List[Any]) -> None:
+    normalize = TypeNormalizer().normalize
+    for type_ in types:
+        normalize(type_)
+
+
+def isinstance_ladder(types: List[Any]) -> None:
+    for type_ in types:
+        ladder(type_)
+
+
+def best_of(func: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def synthetic_tool(n_inputs: int) -> CommandLineTool:
+    loading_options = LoadingOptions()
+    shared_types: List[Any] = [
+        CommandInputArraySchema(items="File", type="array", loadingOptions=loading_options),  # noqa: E501
+        InputArraySchema(items="string", type="array", loadingOptions=loading_options),  # noqa: E501
+    ]
+    type_patterns: List[Any] = [
+        "string", "int", "boolean", "File", "Directory", "Any",
+        ["null", "int"], ["null", "File"], ["string"],
+    ] + shared_types + [[t] for t in shared_types]
+    inputs = [
+        CommandInputParameter(
+            id=f"#main/input_{i}",
+            type=type_patterns[i % len(type_patterns)],
+            doc=f"doc of input {i}\n",
+            label=f"input {i}",
+            loadingOptions=loading_options,
+        )
+        for i in range(n_inputs)
+    ]
+    return CommandLineTool(inputs=inputs, outputs=[], loadingOptions=loading_options)  # noqa: E501
+
+
+def main() -> None:
+    n_inputs = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    tool = synthetic_tool(n_inputs)
+    types = [inp.type for inp in tool.inputs]
+    print(f"inputs: {n_inputs}, best of {repeat}")
+    for name, func in [
+        ("Inputs", lambda: Inputs(tool)),
+        ("type resolution: isinstance ladder", lambda: isinstance_ladder(types)),  # noqa: E501
+        ("type resolution: TypeNormalizer", lambda: normalizer(types)),
+    ]:
+        best = best_of(func, repeat)
+        print(f"{name:>36}: {best * 1e3:8.2f} ms/document, "
+              f"{best / n_inputs * 1e6:6.2f} us/input")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import hashlib
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+LAST_MODIFIED = "Mon, 01 Nov 2021 00:00:00 GMT"
+
+
+class StandInServer:
+    """
+    Local HTTP server standing in for raw.githubusercontent.com.
+    It serves fixed documents with an ETag and a Last-Modified header,
+    answers conditional requests with 304, and counts the requests.
+    failures maps a path to the number of 503 responses before it succeeds.
+    """
+
+    def __init__(self,
+                 documents: Dict[str, str],
+                 latency: float = 0.0,
+                 failures: Optional[Dict[str, int]] = None) -> None:
+        self.documents = documents
+        self.latency = latency
+        self.failures: Dict[str, int] = dict(failures or {})
+        self.requests: "Counter[str]" = Counter()
+        self.not_modified: "Counter[str]" = Counter()
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def __enter__(self) -> "StandInServer":
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                stand_in._handle(self)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        class Server(ThreadingHTTPServer):
+            # accept many concurrent connections at once
+            request_queue_size = 128
+
+        self._server = Server(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()  # noqa: E501
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        assert self._server is not None
+        self._server.shutdown()
+        self._server.server_close()
+
+    def url(self, path: str) -> str:
+        assert self._server is not None
+        return f"http://127.0.0.1:{self._server.server_address[1]}/{path.lstrip('/')}"  # noqa: E501
+
+    @staticmethod
+    def etag(content: str) -> str:
+        return '"' + hashlib.sha1(content.encode("utf-8")).hexdigest() + '"'
+
+    def _handle(self, handler: BaseHTTPRequestHandler) -> None:
+        path = handler.path.lstrip("/")
+        with self._lock:
+            self.requests[path] += 1
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            with self._lock:
+                failing = self.failures.get(path, 0) > 0
+                if failing:
+                    self.failures[path] -= 1
+        finally:
+            # the request leaves the flight before the response is sent, as
+            # the client may reuse the connection as soon as it is received
+            with self._lock:
+                self._in_flight -= 1
+        content = self.documents.get(path)
+        if failing or content is None:
+            handler.send_response(503 if failing else 404)
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+        etag = self.etag(content)
+        if handler.headers.get("If-None-Match") == etag:
+            with self._lock:
+                self.not_modified[path] += 1
+            handler.send_response(304)
+            handler.send_header("ETag", etag)
+            handler.end_headers()
+            return
+        body = content.encode("utf-8")
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/plain; charset=utf-8")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.send_header("ETag", etag)
+        handler.send_header("Last-Modified", LAST_MODIFIED)
+        handler.end_headers()
+        handler.wfile.write(body)
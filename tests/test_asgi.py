@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Any, Iterator, List
+
+import httpx
+import pytest
+from starlette.testclient import TestClient
+
+from cwl_inputs_parser import asgi, metrics
+from cwl_inputs_parser.asgi import AsyncDownloader, create_asgi_app
+from cwl_inputs_parser.remote import HTTPSettings, configure_http
+
+from http_stand_in import StandInServer
+
+ALL_INPUT_CWL_PATH = Path(__file__).parent.joinpath("all_input.cwl")
+ALL_INPUT_JSON_PATH = Path(__file__).parent.joinpath("all_input.json")
+WC_TOOL_PATH = Path(__file__).parent.joinpath("cwl_conformance_test/v1.2/wc-tool.cwl")  # noqa: E501
+
+
+@pytest.fixture(autouse=True)
+def reset_session_pool() -> Iterator[None]:
+    yield
+    configure_http(HTTPSettings())
+
+
+def test_routes():
+    expect = json.loads(ALL_INPUT_JSON_PATH.read_text(encoding="utf-8"))
+    wc_tool = WC_TOOL_PATH.read_text(encoding="utf-8")
+    with StandInServer({"wc-tool.cwl": wc_tool}) as server:
+        with TestClient(create_asgi_app(executor_workers=2)) as client:
+            res = client.get("/health")
+            assert res.json() == {"message": "OK"}
+
+            res = client.post("/", content=json.dumps({"wf_location": str(ALL_INPUT_CWL_PATH)}))  # noqa: E501
+            assert res.status_code == 200
+            assert res.headers["content-type"] == "application/json"
+            assert res.json() == expect
+
+            res = client.post("/", content=json.dumps({"wf_content": wc_tool}))  # noqa: E501
+            assert res.json()[0]["id"] == "file1"
+
+            res = client.post("/", content=json.dumps({"wf_location": server.url("wc-tool.cwl")}))  # noqa: E501
+            assert res.json()[0]["id"] == "file1"
+            assert server.requests["wc-tool.cwl"] == 1
+
+            res = client.post("/", content=json.dumps({"foo": "bar"}))
+            assert res.status_code == 400
+
+            res = client.post("/make-template", content=json.dumps({"wf_location": str(WC_TOOL_PATH)}))  # noqa: E501
+            assert "file1:" in res.json()
+
+
+def test_processes_batch_and_metrics(monkeypatch):
+    # the processes of the pool write their samples after each task
+    monkeypatch.setattr(metrics, "FLUSH_INTERVAL", 0.0)
+    wc_tool = WC_TOOL_PATH.read_text(encoding="utf-8")
+    with StandInServer({"wc-tool.cwl": wc_tool}) as server:
+        with TestClient(create_asgi_app(executor_workers=2)) as client:
+            res = client.post("/", content=json.dumps({"wf_location": server.url("wc-tool.cwl")}))  # noqa: E501
+            timing = res.headers["Server-Timing"]
+            assert "fetch_document;dur=" in timing
+            assert "parse;dur=" in timing
+
+            res = client.post("/processes", content=json.dumps({"wf_location": server.url("wc-tool.cwl")}))  # noqa: E501
+            assert res.status_code == 200
+            assert res.json()["main"]["inputs"][0]["id"] == "file1"
+            assert "load_document;dur=" in res.headers["Server-Timing"]
+            res = client.post("/processes", content=json.dumps({"wf_content": wc_tool, "ids": ["nothing"]}))  # noqa: E501
+            assert res.status_code == 400
+
+            res = client.post("/batch", content=json.dumps([
+                {"wf_location": server.url("wc-tool.cwl")},
+                {"wf_location": "not_found.cwl"},
+                "not an item",
+            ]))
+            assert res.headers["content-type"] == "application/x-ndjson"
+            records = sorted((json.loads(line) for line in res.text.splitlines()), key=lambda r: r["index"])  # noqa: E501
+            assert records[0]["inputs"][0]["id"] == "file1"
+            assert records[1]["error"]["type"] == "FileNotFoundError"
+            assert records[2]["error"]["type"] == "ValueError"
+
+            text = client.get("/metrics").text
+            assert 'cwl_inputs_parser_requests_total{method="POST",route="/batch",status="200"} 1' in text  # noqa: E501
+            assert 'cwl_inputs_parser_requests_total{method="POST",route="/processes",status="400"} 1' in text  # noqa: E501
+            # counted in a process of the pool
+            assert 'cwl_inputs_parser_errors_total{reason="FileNotFoundError",type="FileNotFoundError"} 1' in text  # noqa: E501
+
+
+def test_error():
+    with TestClient(create_asgi_app(executor_workers=1), raise_server_exceptions=False) as client:  # noqa: E501
+        res = client.post("/", content=json.dumps({"wf_location": "not_found.cwl"}))  # noqa: E501
+        assert res.status_code == 500
+        assert "FileNotFoundError" in res.json()["message"]
+
+
+def test_concurrent_downloads():
+    documents = {f"doc{i}.txt": str(i) for i in range(20)}
+
+    async def download_all(server: StandInServer) -> List[str]:
+        downloader = AsyncDownloader(HTTPSettings(max_connections_per_host=20))  # noqa: E501
+        try:
+            return await asyncio.gather(*[
+                downloader.download(server.url(path)) for path in documents
+            ])
+        finally:
+            await downloader.aclose()
+
+    with StandInServer(documents, latency=0.2) as server:
+        start = time.perf_counter()
+        results = asyncio.run(download_all(server))
+        elapsed = time.perf_counter() - start
+    assert results == [str(i) for i in range(20)]
+    assert server.max_in_flight == 20
+    assert elapsed < 20 * 0.2 / 2
+
+
+def test_max_connections_per_host():
+    documents = {f"doc{i}.txt": str(i) for i in range(8)}
+
+    async def download_all(server: StandInServer) -> Any:
+        downloader = AsyncDownloader(HTTPSettings(max_connections_per_host=2))  # noqa: E501
+        try:
+            return await asyncio.gather(*[
+                downloader.download(server.url(path)) for path in documents
+            ])
+        finally:
+            await downloader.aclose()
+
+    with StandInServer(documents, latency=0.1) as server:
+        asyncio.run(download_all(server))
+    assert server.max_in_flight <= 2
+
+
+def test_retry():
+    async def download(url: str) -> str:
+        downloader = AsyncDownloader(HTTPSettings(retries=2, backoff_factor=0))  # noqa: E501
+        try:
+            return await downloader.download(url)
+        finally:
+            await downloader.aclose()
+
+    with StandInServer({"doc.txt": "content"}, failures={"doc.txt": 2}) as server:  # noqa: E501
+        assert asyncio.run(download(server.url("doc.txt"))) == "content"
+        assert server.requests["doc.txt"] == 3
+
+
+def test_concurrent_requests():
+    content = WC_TOOL_PATH.read_text(encoding="utf-8")
+    documents = {f"wc-tool-{i}.cwl": f"{content}\n# {i}\n" for i in range(16)}
+    app = create_asgi_app(HTTPSettings(max_connections_per_host=16), executor_workers=2)  # noqa: E501
+
+    async def parse_all(server: StandInServer) -> List[httpx.Response]:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:  # noqa: E501
+                return await asyncio.gather(*[
+                    client.post("/", content=json.dumps({"wf_location": server.url(path)}))  # noqa: E501
+                    for path in documents
+                ])
+
+    with StandInServer(documents, latency=0.2) as server:
+        responses = asyncio.run(parse_all(server))
+    assert all(res.json()[0]["id"] == "file1" for res in responses)
+    # all the remote fetches are in flight at once in a single process
+    assert server.max_in_flight == 16
+
+
+def test_coalesced_requests():
+    content = WC_TOOL_PATH.read_text(encoding="utf-8")
+    app = create_asgi_app(executor_workers=2)
+    parse_coalesced = asgi.ASYNC_INPUTS_FLIGHTS.coalesced()
+    template_coalesced = asgi.ASYNC_TEMPLATE_FLIGHTS.coalesced()
+
+    async def post_all(server: StandInServer) -> List[httpx.Response]:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:  # noqa: E501
+                responses = await asyncio.gather(*[
+                    client.post("/", content=json.dumps({"wf_location": server.url("wc-tool.cwl")}))  # noqa: E501
+                    for _ in range(8)
+                ] + [
+                    client.post("/make-template", content=json.dumps({"wf_content": f"{content}\n# coalesced\n"}))  # noqa: E501
+                    for _ in range(8)
+                ])
+                metrics_res = await client.get("/metrics")
+                return responses + [metrics_res]
+
+    with StandInServer({"wc-tool.cwl": content}, latency=0.2) as server:
+        *responses, metrics_res = asyncio.run(post_all(server))
+    assert all(res.json()[0]["id"] == "file1" for res in responses[:8])
+    assert all("file1:" in res.json() for res in responses[8:])
+    # one fetch, and one parse in the pool
+    assert server.requests["wc-tool.cwl"] == 1
+    assert asgi.ASYNC_INPUTS_FLIGHTS.coalesced() == parse_coalesced + 7
+    assert asgi.ASYNC_TEMPLATE_FLIGHTS.coalesced() == template_coalesced + 7
+    assert 'cwl_inputs_parser_coalesced_requests_total{route="/make-template"}' in metrics_res.text  # noqa: E501
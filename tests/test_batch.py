@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from cwl_inputs_parser.batch import (batch_locations, iter_batch,
+                                     read_locations, run_batch)
+from cwl_inputs_parser.main import main
+
+ALL_INPUT_CWL_PATH = Path(__file__).parent.joinpath("all_input.cwl")
+ALL_INPUT_JSON_PATH = Path(__file__).parent.joinpath("all_input.json")
+WC_TOOL_PATH = Path(__file__).parent.joinpath("cwl_conformance_test/v1.2/wc-tool.cwl")  # noqa: E501
+# CommandInputRecordSchema, not supported
+UNSUPPORTED_PATH = Path(__file__).parent.joinpath("cwl_conformance_test/v1.2/anon_enum_inside_array.cwl")  # noqa: E501
+
+
+def test_iter_batch():
+    locations = [str(ALL_INPUT_CWL_PATH), str(UNSUPPORTED_PATH), str(WC_TOOL_PATH)]  # noqa: E501
+    records = sorted(iter_batch(locations, workers=2), key=lambda r: r["index"])  # noqa: E501
+    assert [r["location"] for r in records] == locations
+    expect = json.loads(ALL_INPUT_JSON_PATH.read_text(encoding="utf-8"))
+    assert records[0]["inputs"] == expect
+    assert "error" not in records[0]
+    assert records[1]["error"]["type"] == "UnsupportedValueError"
+    assert "inputs" not in records[1]
+    assert records[2]["inputs"][0]["id"] == "file1"
+    assert all(r["elapsed"] >= 0 for r in records)
+
+
+def test_run_batch_in_process():
+    out = io.BytesIO()
+    failed = run_batch([str(WC_TOOL_PATH), "not_found.cwl"], workers=1, out=out)  # noqa: E501
+    lines = out.getvalue().splitlines()
+    assert failed == 1
+    assert len(lines) == 2
+    assert json.loads(lines[1])["error"]["type"] == "FileNotFoundError"
+
+
+def test_read_locations():
+    file = io.StringIO("a.cwl\n\n# comment\n  b.cwl  \n")
+    assert list(read_locations(file)) == ["a.cwl", "b.cwl"]
+
+
+def test_batch_locations(tmp_path, monkeypatch):
+    batch_file = tmp_path.joinpath("locations.txt")
+    batch_file.write_text("b.cwl\n", encoding="utf-8")
+    assert list(batch_locations(["a.cwl"], batch_file)) == ["a.cwl", "b.cwl"]
+    assert list(batch_locations(["a.cwl"], None)) == ["a.cwl"]
+    monkeypatch.setattr(sys, "stdin", io.StringIO("c.cwl\n"))
+    assert list(batch_locations([], None)) == ["c.cwl"]
+
+
+def test_main_batch(monkeypatch, capsysbinary):
+    monkeypatch.setattr(sys, "argv", [
+        "cwl-inputs-parser", "--batch", "--workers", "1",
+        str(WC_TOOL_PATH), str(UNSUPPORTED_PATH),
+    ])
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+    assert exc_info.value.code == 1
+    lines = capsysbinary.readouterr().out.splitlines()
+    records = [json.loads(line) for line in lines]
+    assert [r["index"] for r in records] == [0, 1]
+    assert "inputs" in records[0]
+    assert "error" in records[1]
+
+    # no failure, no error exit
+    monkeypatch.setattr(sys, "argv", [
+        "cwl-inputs-parser", "--batch", "--workers", "1", str(WC_TOOL_PATH),
+    ])
+    main()
+    assert len(capsysbinary.readouterr().out.splitlines()) == 1
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from pathlib import Path
+
+from cwl_inputs_parser.cache import LRUCache, content_hash
+from cwl_inputs_parser.utils import (INPUTS_CACHE, fetch_document,
+                                     wf_content_to_inputs,
+                                     wf_location_to_inputs)
+
+ALL_INPUT_CWL_PATH = Path(__file__).parent.joinpath("all_input.cwl")
+
+
+def test_lru_eviction_by_size():
+    cache: LRUCache[str] = LRUCache(max_size=10)
+    cache.put("a", "A", size=4)
+    cache.put("b", "B", size=4)
+    assert cache.get("a") == "A"
+    cache.put("c", "C", size=4)
+    assert "b" not in cache
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+    stats = cache.stats()
+    assert stats.evictions == 1
+    assert stats.size == 8
+
+
+def test_lru_oversized_entry():
+    cache: LRUCache[str] = LRUCache(max_size=10)
+    cache.put("a", "A", size=11)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_lru_counters():
+    cache: LRUCache[str] = LRUCache(max_size=10)
+    cache.put("a", "A")
+    cache.get("a")
+    cache.get("b")
+    stats = cache.stats()
+    assert stats.hits == 1
+    assert stats.misses == 1
+
+
+def test_content_hash():
+    assert content_hash("a", "file:///x") == content_hash("a", "file:///x")
+    assert content_hash("a", "file:///x") != content_hash("a", "file:///y")
+    assert content_hash("a", "file:///x") != content_hash("b", "file:///x")
+
+
+def test_wf_location_to_inputs_cached():
+    INPUTS_CACHE.clear()
+    first = wf_location_to_inputs(ALL_INPUT_CWL_PATH)
+    second = wf_location_to_inputs(ALL_INPUT_CWL_PATH)
+    assert first is second
+    stats = INPUTS_CACHE.stats()
+    assert stats.hits == 1
+    assert stats.misses == 1
+
+
+def test_wf_content_to_inputs_keyed_by_uri():
+    INPUTS_CACHE.clear()
+    wf_content = fetch_document(ALL_INPUT_CWL_PATH)
+    first = wf_content_to_inputs(wf_content, ALL_INPUT_CWL_PATH.as_uri())
+    second = wf_content_to_inputs(wf_content, Path.cwd().as_uri())
+    assert first is not second
+    assert first.as_json() == second.as_json()
+
+
+def test_use_cache_false():
+    INPUTS_CACHE.clear()
+    first = wf_location_to_inputs(ALL_INPUT_CWL_PATH, use_cache=False)
+    second = wf_location_to_inputs(ALL_INPUT_CWL_PATH, use_cache=False)
+    assert first is not second
+    assert len(INPUTS_CACHE) == 0
+
+
+def test_cached_inputs_keep_fields_only():
+    INPUTS_CACHE.clear()
+    inputs = wf_location_to_inputs(ALL_INPUT_CWL_PATH)
+    assert inputs.cwl_obj is None
+    assert list(inputs.iter_fields()) == inputs.fields
+    assert inputs.as_dict() == wf_location_to_inputs(ALL_INPUT_CWL_PATH, use_cache=False).as_dict()  # noqa: E501
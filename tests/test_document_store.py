@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import sys
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from cwl_inputs_parser.main import main
+from cwl_inputs_parser.remote import (DirectoryStore, configure_document_store,
+                                      populate_store)
+from cwl_inputs_parser.utils import download_file, wf_location_to_inputs
+
+from http_stand_in import StandInServer
+
+V1_2_DIR = Path(__file__).parent.joinpath("cwl_conformance_test/v1.2")
+WC_TOOL_PATH = V1_2_DIR.joinpath("wc-tool.cwl")
+IMPORTED_HINT_PATH = V1_2_DIR.joinpath("imported-hint.cwl")
+# a URL that can not be reached, as in an air-gapped zone
+UNREACHABLE_URL = "http://127.0.0.1:1/o/r/main"
+
+
+@pytest.fixture
+def document_store(tmp_path: Path) -> Iterator[DirectoryStore]:
+    store = DirectoryStore(tmp_path.joinpath("store"))
+    configure_document_store(store)
+    yield store
+    configure_document_store(None)
+
+
+def test_directory_store_path(tmp_path):
+    store = DirectoryStore(tmp_path)
+    assert store.path("https://example.org/o/r/wf.cwl") == tmp_path.joinpath("example.org/o/r/wf.cwl")  # noqa: E501
+    assert store.path("http://127.0.0.1:8080/dir/") == tmp_path.joinpath("127.0.0.1_8080/dir/index")  # noqa: E501
+    assert store.path("https://example.org/wf.cwl?ref=v1") == tmp_path.joinpath("example.org/wf.cwl%3Fref%3Dv1")  # noqa: E501
+    assert store.path("https://example.org/../wf.cwl") is None
+
+    assert store.get("https://example.org/wf.cwl") is None
+    store.put("https://example.org/wf.cwl", "content")
+    assert store.get("https://example.org/wf.cwl") == "content"
+    with pytest.raises(ValueError):
+        store.put("https://example.org/../wf.cwl", "content")
+
+
+def test_download_from_store(document_store):
+    content = WC_TOOL_PATH.read_text(encoding="utf-8")
+    with StandInServer({}) as server:
+        url = server.url("main/wc-tool.cwl")
+        document_store.put(url, content)
+        assert download_file(url) == content
+        assert server.requests["main/wc-tool.cwl"] == 0
+
+
+def test_parse_offline(document_store):
+    # the workflow and its $import are served from the store only
+    document_store.put(f"{UNREACHABLE_URL}/imported-hint.cwl", IMPORTED_HINT_PATH.read_text(encoding="utf-8"))  # noqa: E501
+    document_store.put(f"{UNREACHABLE_URL}/envvar.yml", V1_2_DIR.joinpath("envvar.yml").read_text(encoding="utf-8"))  # noqa: E501
+    inputs = wf_location_to_inputs(f"{UNREACHABLE_URL}/imported-hint.cwl", use_cache=False)  # noqa: E501
+    assert inputs.as_dict() == wf_location_to_inputs(IMPORTED_HINT_PATH).as_dict()  # noqa: E501
+
+
+def test_populate_store(tmp_path, document_store):
+    documents = {
+        "dir/imported-hint.cwl": IMPORTED_HINT_PATH.read_text(encoding="utf-8"),  # noqa: E501
+        "dir/envvar.yml": V1_2_DIR.joinpath("envvar.yml").read_text(encoding="utf-8"),  # noqa: E501
+    }
+    store = DirectoryStore(tmp_path.joinpath("populated"))
+    with StandInServer(documents) as server:
+        url = server.url("dir/imported-hint.cwl")
+        stored, failed = populate_store([url, server.url("not-found.cwl")], store)  # noqa: E501
+    assert sorted(stored) == sorted(server.url(path) for path in documents)
+    assert failed == [server.url("not-found.cwl")]
+
+    # the server is gone, and the document is parsed from the store
+    configure_document_store(store)
+    inputs = wf_location_to_inputs(url, use_cache=False)
+    assert inputs.as_dict() == wf_location_to_inputs(IMPORTED_HINT_PATH).as_dict()  # noqa: E501
+
+
+def test_main_populate_store(tmp_path, monkeypatch, capsys):
+    store_dir = tmp_path.joinpath("populated")
+    documents = {"wc-tool.cwl": WC_TOOL_PATH.read_text(encoding="utf-8")}
+    with StandInServer(documents) as server:
+        monkeypatch.setattr(sys, "argv", ["cwl-inputs-parser", "--populate-store", str(store_dir), server.url("wc-tool.cwl")])  # noqa: E501
+        main()
+        assert capsys.readouterr().out.splitlines() == [server.url("wc-tool.cwl")]  # noqa: E501
+        assert DirectoryStore(store_dir).get(server.url("wc-tool.cwl")) == documents["wc-tool.cwl"]  # noqa: E501
@@ -11,7 +11,9 @@ from yaml import safe_load
 
 from const import CONFORMANCE_TEST_PATH, CWL_UTILS_OBJ_TEMPLATE
 
-CONFORMANCE_TEST_IDS = [73, 197, 200, 205, 206, 207, 208, 209]
+# 59, 60, 136, 198 and 201 by a named type of their SchemaDefRequirement
+CONFORMANCE_TEST_IDS = [59, 60, 73, 136, 197, 198, 200, 201,
+                        205, 206, 207, 208, 209]
 
 
 def test_using_conformance_test():
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from cwl_inputs_parser.remote import (HTTPCache, configure_http_cache,
+                                      is_immutable_url)
+from cwl_inputs_parser.utils import download_file
+
+from http_stand_in import StandInServer
+
+COMMIT_SHA = "0123456789abcdef0123456789abcdef01234567"
+WC_TOOL_PATH = Path(__file__).parent.joinpath("cwl_conformance_test/v1.2/wc-tool.cwl")  # noqa: E501
+
+
+@pytest.fixture
+def http_cache(tmp_path: Path) -> Iterator[Path]:
+    cache_dir = tmp_path.joinpath("http_cache")
+    configure_http_cache(cache_dir)
+    yield cache_dir
+    configure_http_cache(None)
+
+
+def test_is_immutable_url():
+    assert is_immutable_url(f"https://raw.githubusercontent.com/o/r/{COMMIT_SHA}/wc-tool.cwl")  # noqa: E501
+    assert is_immutable_url("https://example.com/blobs/sha256:" + "a" * 64)
+    assert not is_immutable_url("https://raw.githubusercontent.com/o/r/main/wc-tool.cwl")  # noqa: E501
+
+
+def test_revalidate_with_etag(http_cache):
+    content = WC_TOOL_PATH.read_text(encoding="utf-8")
+    with StandInServer({"main/wc-tool.cwl": content}) as server:
+        url = server.url("main/wc-tool.cwl")
+        assert download_file(url) == content
+        assert download_file(url) == content
+        assert server.requests["main/wc-tool.cwl"] == 2
+        assert server.not_modified["main/wc-tool.cwl"] == 1
+
+
+def test_content_changed(http_cache):
+    documents = {"main/doc.txt": "old"}
+    with StandInServer(documents) as server:
+        url = server.url("main/doc.txt")
+        assert download_file(url) == "old"
+        documents["main/doc.txt"] = "new"
+        assert download_file(url) == "new"
+        assert server.not_modified["main/doc.txt"] == 0
+
+
+def test_immutable_url_is_not_refetched(http_cache):
+    path = f"o/r/{COMMIT_SHA}/wc-tool.cwl"
+    with StandInServer({path: "content"}) as server:
+        url = server.url(path)
+        assert download_file(url) == "content"
+        assert download_file(url) == "content"
+        assert server.requests[path] == 1
+
+
+def test_cache_is_persistent(http_cache):
+    path = f"o/r/{COMMIT_SHA}/wc-tool.cwl"
+    with StandInServer({path: "content"}) as server:
+        url = server.url(path)
+        download_file(url)
+        configure_http_cache(http_cache)
+        assert HTTPCache(http_cache).load(url) is not None
+        assert download_file(url) == "content"
+        assert server.requests[path] == 1
+
+
+def test_cache_disabled():
+    with StandInServer({"main/doc.txt": "content"}) as server:
+        url = server.url("main/doc.txt")
+        download_file(url)
+        download_file(url)
+        assert server.requests["main/doc.txt"] == 2
+        assert server.not_modified["main/doc.txt"] == 0
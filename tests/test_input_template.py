@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from pathlib import Path
+
+import pytest
+
+from cwl_inputs_parser.input_template import (TEMPLATE_CACHE,
+                                              make_input_template)
+from cwl_inputs_parser.remote import HTTPSettings, configure_http
+from cwl_inputs_parser.template import TemplateEngine
+from cwl_inputs_parser.utils import (UnsupportedValueError, cwl_make_template,
+                                     cwl_make_template_from_content,
+                                     wf_content_to_inputs,
+                                     wf_location_to_inputs)
+
+from http_stand_in import StandInServer
+
+V1_2_DIR = Path(__file__).parent.joinpath("cwl_conformance_test/v1.2")
+
+TOOL = """\
+cwlVersion: v1.2
+class: CommandLineTool
+baseCommand: echo
+inputs:
+{inputs}
+outputs: []
+"""
+
+
+def template_of(inputs: str) -> str:
+    uri = V1_2_DIR.joinpath("tool.cwl").as_uri()
+    return make_input_template(wf_content_to_inputs(TOOL.format(inputs=inputs), uri, use_cache=False))  # noqa: E501
+
+
+def test_same_as_cwltool_in_conformance_tests():
+    engine = TemplateEngine()
+    n_native = 0
+    for path in sorted(V1_2_DIR.glob("*.cwl")):
+        try:
+            template = make_input_template(wf_location_to_inputs(path))
+        except Exception:
+            continue
+        assert template == engine.make_template(path, use_cache=False), path
+        n_native += 1
+    assert n_native > 150
+
+
+def test_layout():
+    assert template_of("""\
+  flag: boolean
+  count:
+    type: int?
+  files: File[]
+""") == """\
+flag: false  # type "boolean"
+files:  # array of type "File"
+  - class: File
+    path: a/file/path
+count: 0  # type "int" (optional)
+"""
+
+
+def test_defaults():
+    assert template_of("""\
+  message:
+    type: string
+    default: hello
+  empty:
+    type: string
+    default: ""
+""") == """\
+message: hello  # default value of type "string".
+empty: a_string  # type "string"
+"""
+
+
+@pytest.mark.parametrize("inputs", [
+    """\
+  file1:
+    type: File
+    default:
+      class: File
+      location: hello.txt
+""",
+    """\
+  numbers:
+    type: int[]
+    default: [1, 2]
+""",
+])
+def test_unsupported_defaults(inputs):
+    with pytest.raises(UnsupportedValueError):
+        template_of(inputs)
+
+
+def test_fallback_to_cwltool():
+    path = V1_2_DIR.joinpath("record-output.cwl")
+    with pytest.raises(UnsupportedValueError):
+        make_input_template(wf_location_to_inputs(path))
+    assert cwl_make_template(path) == TemplateEngine().make_template(path)
+
+    # cwltool requires #main in a $graph
+    path = V1_2_DIR.joinpath("conflict-wf.cwl")
+    with pytest.raises(UnsupportedValueError):
+        make_input_template(wf_location_to_inputs(path))
+    with pytest.raises(Exception):
+        cwl_make_template(path)
+
+
+def test_v1_0_secondary_files():
+    path = V1_2_DIR.joinpath("mixed-versions/tool-v10.cwl")
+    fields = wf_location_to_inputs(path).as_dict()
+    assert fields[0]["secondaryFiles"] == [{"pattern": ".2", "required": True}]  # noqa: E501
+    assert make_input_template(wf_location_to_inputs(path)) == TemplateEngine().make_template(path)  # noqa: E501
+
+
+def test_fetch_error_is_not_retried_by_cwltool():
+    configure_http(HTTPSettings(retries=0))
+    try:
+        with StandInServer({"tool.cwl": TOOL.format(inputs="  input:\n    type: string\n")}, failures={"tool.cwl": 10}) as server:  # noqa: E501
+            with pytest.raises(Exception):
+                cwl_make_template(server.url("tool.cwl"))
+        assert server.requests["tool.cwl"] == 1
+    finally:
+        configure_http(HTTPSettings())
+
+
+def test_imported_document_is_changed(tmp_path):
+    tmp_path.joinpath("inputs.yml").write_text("message:\n  type: string\n", encoding="utf-8")  # noqa: E501
+    path = tmp_path.joinpath("tool.cwl")
+    wf_content = TOOL.format(inputs="  $import: inputs.yml")
+    path.write_text(wf_content, encoding="utf-8")
+    template = cwl_make_template(path)
+    assert "message: a_string" in template
+    assert cwl_make_template_from_content(wf_content, path.as_uri()) == template  # noqa: E501
+    hits = TEMPLATE_CACHE.stats().hits
+    assert cwl_make_template(path) == template
+    assert TEMPLATE_CACHE.stats().hits == hits + 1
+
+    tmp_path.joinpath("inputs.yml").write_text("count:\n  type: int\n", encoding="utf-8")  # noqa: E501
+    for template in [cwl_make_template(path),
+                     cwl_make_template_from_content(wf_content, path.as_uri())]:  # noqa: E501
+        assert "count: 0" in template
+        assert "message" not in template
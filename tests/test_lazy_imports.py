@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+WC_TOOL_PATH = Path(__file__).parent.joinpath("cwl_conformance_test/v1.2/wc-tool.cwl")  # noqa: E501
+RECORD_OUTPUT_PATH = Path(__file__).parent.joinpath("cwl_conformance_test/v1.2/record-output.cwl")  # noqa: E501
+
+SCRIPT = """\
+import json
+import sys
+
+from cwl_inputs_parser.main import main
+
+sys.argv = ["cwl-inputs-parser", sys.argv[1]]
+main()
+print(json.dumps(sorted(sys.modules)), file=sys.stderr)
+"""
+
+
+def loaded_modules_of_parse() -> list:
+    proc = subprocess.run(
+        [sys.executable, "-c", SCRIPT, str(WC_TOOL_PATH)],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+    )
+    assert json.loads(proc.stdout)[0]["id"] == "file1"
+    modules: list = json.loads(proc.stderr.splitlines()[-1])
+    return modules
+
+
+def test_parse_does_not_import_cwltool_or_flask():
+    modules = loaded_modules_of_parse()
+    assert not [m for m in modules if m.split(".")[0] in ["cwltool", "flask", "werkzeug"]]  # noqa: E501
+
+
+def test_cwl_make_template_imports_cwltool_on_fallback():
+    proc = subprocess.run(
+        [sys.executable, "-c", f"""\
+import sys
+from cwl_inputs_parser.utils import cwl_make_template
+print(cwl_make_template({str(WC_TOOL_PATH)!r}))
+assert "cwltool.main" not in sys.modules
+print(cwl_make_template({str(RECORD_OUTPUT_PATH)!r}))
+assert "cwltool.main" in sys.modules
+"""],
+        stdout=subprocess.PIPE,
+        check=True,
+        universal_newlines=True,
+    )
+    assert "file1:" in proc.stdout
+    assert "irec:" in proc.stdout
+
+
+def test_asgi_app_does_not_import_flask():
+    proc = subprocess.run(
+        [sys.executable, "-c", """\
+import json
+import sys
+from cwl_inputs_parser.asgi import create_asgi_app
+create_asgi_app()
+print(json.dumps(sorted(sys.modules)))
+"""],
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    modules = json.loads(proc.stdout)
+    assert not [m for m in modules if m.split(".")[0] in ["flask", "werkzeug"]]  # noqa: E501
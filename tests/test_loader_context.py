@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from cwl_inputs_parser.utils import (Inputs, LoaderContext, as_uri,
+                                     get_loader_context, load_cwl_document)
+
+from http_stand_in import StandInServer
+
+V1_2_DIR = Path(__file__).parent.joinpath("cwl_conformance_test/v1.2")
+COMMIT_SHA = "0123456789abcdef0123456789abcdef01234567"
+DOCUMENT_PATHS = [V1_2_DIR.joinpath(name) for name in [
+    "wc-tool.cwl", "revsort-packed.cwl", "count-lines1-wf.cwl",
+    "imported-hint.cwl", "bwa-mem-tool.cwl", "search.cwl",
+]]
+
+
+def as_dict(path: Path) -> object:
+    return Inputs(load_cwl_document(path.read_text(encoding="utf-8"), as_uri(path))).as_dict()  # noqa: E501
+
+
+def test_yaml_parser_per_thread():
+    context = LoaderContext()
+    parser = context.yaml()
+    assert context.yaml() is parser
+    other = []
+    thread = threading.Thread(target=lambda: other.append(context.yaml()))
+    thread.start()
+    thread.join()
+    assert other[0] is not parser
+
+
+def test_concurrent_loads():
+    expected = [as_dict(path) for path in DOCUMENT_PATHS]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(as_dict, DOCUMENT_PATHS * 8))
+    assert results == expected * 8
+
+
+def test_documents_are_isolated():
+    # the same URI with another content is loaded again, not from the
+    # state of the previous load
+    uri = as_uri(V1_2_DIR.joinpath("isolated.cwl"))
+    first = load_cwl_document(V1_2_DIR.joinpath("wc-tool.cwl").read_text(encoding="utf-8"), uri)  # noqa: E501
+    second = load_cwl_document(V1_2_DIR.joinpath("bwa-mem-tool.cwl").read_text(encoding="utf-8"), uri)  # noqa: E501
+    assert [str(inp.id) for inp in first.inputs] != [str(inp.id) for inp in second.inputs]  # noqa: E501
+
+
+def test_immutable_documents_are_shared():
+    envvar = V1_2_DIR.joinpath("envvar.yml").read_text(encoding="utf-8")
+    content = V1_2_DIR.joinpath("imported-hint.cwl").read_text(encoding="utf-8")  # noqa: E501
+    context = get_loader_context()
+    with StandInServer({f"o/r/{COMMIT_SHA}/envvar.yml": envvar}) as server:
+        for name in ["imported-hint.cwl", "imported-hint-copy.cwl"]:
+            context.load(content, server.url(f"o/r/{COMMIT_SHA}/{name}"))
+    assert server.requests[f"o/r/{COMMIT_SHA}/envvar.yml"] == 1
+    assert context.shared_documents.get(server.url(f"o/r/{COMMIT_SHA}/envvar.yml")) == envvar  # noqa: E501
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import json
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from cwl_inputs_parser.server import create_app
+from cwl_inputs_parser.utils import (cwl_make_template,
+                                     cwl_make_template_from_content)
+
+from http_stand_in import StandInServer
+
+V1_2_DIR = Path(__file__).parent.joinpath("cwl_conformance_test/v1.2")
+IMPORTED_HINT_PATH = V1_2_DIR.joinpath("imported-hint.cwl")
+RECORD_OUTPUT_PATH = V1_2_DIR.joinpath("record-output.cwl")
+
+
+@pytest.fixture()
+def no_temp_files(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("a temporary file is created")
+    monkeypatch.setattr(tempfile, "NamedTemporaryFile", fail)
+    monkeypatch.setattr(tempfile, "mkstemp", fail)
+
+
+def test_same_as_file(no_temp_files):
+    for path in [IMPORTED_HINT_PATH, RECORD_OUTPUT_PATH]:
+        content = path.read_text(encoding="utf-8")
+        assert cwl_make_template_from_content(content, path.as_uri()) == cwl_make_template(path)  # noqa: E501
+
+
+def test_relative_reference_to_remote_base_uri(no_temp_files):
+    documents = {"dir/envvar.yml": V1_2_DIR.joinpath("envvar.yml").read_text(encoding="utf-8")}  # noqa: E501
+    content = IMPORTED_HINT_PATH.read_text(encoding="utf-8")
+    with StandInServer(documents) as server:
+        cwl_make_template_from_content(content, server.url("dir/imported-hint.cwl"))  # noqa: E501
+        assert server.requests["dir/envvar.yml"] == 1
+        assert server.requests["dir/imported-hint.cwl"] == 0
+
+
+def test_server_base_uri(no_temp_files):
+    client = create_app().test_client()
+    res = client.post("/make-template", data=json.dumps({
+        "wf_content": RECORD_OUTPUT_PATH.read_text(encoding="utf-8"),
+        "base_uri": RECORD_OUTPUT_PATH.as_uri(),
+    }))
+    assert res.status_code == 200
+    assert res.get_json() == cwl_make_template(RECORD_OUTPUT_PATH)
+
+    # without base_uri, envvar.yml is not found next to the current directory
+    res = client.post("/make-template", data=json.dumps({
+        "wf_content": IMPORTED_HINT_PATH.read_text(encoding="utf-8"),
+    }))
+    assert res.status_code == 500
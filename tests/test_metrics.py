@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from cwl_inputs_parser import metrics
+from cwl_inputs_parser.handlers import collect_cache_stats
+from cwl_inputs_parser.metrics import (MetricsRegistry, collect,
+                                       configure_metrics_dir,
+                                       mark_process_dead, merge, render)
+from cwl_inputs_parser.remote import download
+from cwl_inputs_parser.server import create_app
+from cwl_inputs_parser.utils import INPUTS_CACHE, wf_location_to_inputs
+
+from http_stand_in import StandInServer
+
+V1_2_DIR = Path(__file__).parent.joinpath("cwl_conformance_test/v1.2")
+WC_TOOL_PATH = V1_2_DIR.joinpath("wc-tool.cwl")
+
+
+@pytest.fixture()
+def metrics_dir(tmp_path):
+    configure_metrics_dir(tmp_path)
+    yield tmp_path
+    configure_metrics_dir(None)
+
+
+def test_render():
+    registry = MetricsRegistry()
+    registry.inc("cwl_inputs_parser_errors_total", type="UnsupportedValueError", reason='a "b"')  # noqa: E501
+    registry.observe("cwl_inputs_parser_request_duration_seconds", 0.003, route="/")  # noqa: E501
+    registry.observe("cwl_inputs_parser_request_duration_seconds", 0.2, route="/")  # noqa: E501
+    registry.observe("cwl_inputs_parser_request_duration_seconds", 20, route="/")  # noqa: E501
+    text = render(registry.snapshot())
+    assert "# TYPE cwl_inputs_parser_errors_total counter" in text
+    assert 'cwl_inputs_parser_errors_total{reason="a \\"b\\"",type="UnsupportedValueError"} 1' in text  # noqa: E501
+    assert 'cwl_inputs_parser_request_duration_seconds_bucket{le="0.005",route="/"} 1' in text  # noqa: E501
+    assert 'cwl_inputs_parser_request_duration_seconds_bucket{le="0.25",route="/"} 2' in text  # noqa: E501
+    assert 'cwl_inputs_parser_request_duration_seconds_bucket{le="+Inf",route="/"} 3' in text  # noqa: E501
+    assert 'cwl_inputs_parser_request_duration_seconds_count{route="/"} 3' in text  # noqa: E501
+    assert f'cwl_inputs_parser_worker_rss_bytes{{pid="{os.getpid()}"}}' in text
+
+
+def test_aggregation_over_processes(metrics_dir):
+    worker = MetricsRegistry()
+    worker.inc("cwl_inputs_parser_requests_total", route="/", method="POST", status=200)  # noqa: E501
+    worker.set_gauge("cwl_inputs_parser_requests_in_flight", 2)
+    metrics_dir.joinpath("1.json").write_text(json.dumps(worker.snapshot()), encoding="utf-8")  # noqa: E501
+    metrics_dir.joinpath("2.json").write_text(json.dumps(worker.snapshot()), encoding="utf-8")  # noqa: E501
+
+    def requests_total(samples):
+        return sum(value for name, _, value in samples["counters"] if name == "cwl_inputs_parser_requests_total")  # noqa: E501
+
+    def in_flight(samples):
+        return sum(value for name, _, value in samples["gauges"] if name == "cwl_inputs_parser_requests_in_flight")  # noqa: E501
+
+    before = requests_total(collect())
+    assert before >= 2
+
+    # the counters of a dead worker are kept, and its gauges dropped
+    mark_process_dead(1)
+    assert not metrics_dir.joinpath("1.json").exists()
+    samples = collect()
+    assert requests_total(samples) == before
+    assert in_flight(samples) == 2 + in_flight(metrics.get_metrics().snapshot())  # noqa: E501
+
+
+def test_flush_soon(metrics_dir, monkeypatch):
+    monkeypatch.setattr(metrics, "FLUSH_INTERVAL", 0.2)
+    writes = []
+    write_json = metrics._write_json
+
+    def counted(path, obj):
+        writes.append(path)
+        write_json(path, obj)
+    monkeypatch.setattr(metrics, "_write_json", counted)
+
+    metrics.flush()
+    for _ in range(5):
+        metrics.flush_soon()
+    assert len(writes) == 1
+    # written once at the end of the interval
+    time.sleep(0.3)
+    assert len(writes) == 2
+    # the next interval has passed
+    time.sleep(0.3)
+    metrics.flush_soon()
+    assert len(writes) == 3
+    assert writes[-1] == metrics_dir.joinpath(f"{os.getpid()}.json")
+
+
+def test_merge_histograms():
+    registry = MetricsRegistry()
+    registry.observe("cwl_inputs_parser_remote_fetch_duration_seconds", 0.01, host="a")  # noqa: E501
+    merged = merge([registry.snapshot(), registry.snapshot()])
+    histogram = merged["histograms"][0]
+    assert histogram[2][1] == 2
+    assert histogram[2][-1] == pytest.approx(0.02)
+
+
+def test_server_metrics():
+    client = create_app().test_client()
+    client.post("/", data=json.dumps({"wf_location": str(WC_TOOL_PATH)}))
+    res = client.post("/", data=json.dumps({"wf_location": str(V1_2_DIR.joinpath("record-output.cwl"))}))  # noqa: E501
+    assert res.status_code == 500
+    assert "UnsupportedValueError" in res.get_json()["message"]
+
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    text = res.get_data(as_text=True)
+    assert 'cwl_inputs_parser_requests_total{method="POST",route="/",status="200"}' in text  # noqa: E501
+    assert 'cwl_inputs_parser_requests_total{method="POST",route="/",status="500"}' in text  # noqa: E501
+    assert 'cwl_inputs_parser_errors_total{reason="The CommandInputRecordSchema field does not support by cwl-inputs-parser",type="UnsupportedValueError"}' in text  # noqa: E501
+    assert 'cwl_inputs_parser_cache_misses_total{cache="inputs"}' in text
+    assert "cwl_inputs_parser_requests_in_flight 1" in text
+
+
+def test_cache_counters_do_not_go_down():
+    registry = MetricsRegistry()
+
+    def hits() -> float:
+        return sum(value for name, labels, value in registry.snapshot()["counters"] if name == "cwl_inputs_parser_cache_hits_total" and labels == {"cache": "inputs"})  # noqa: E501
+
+    wf_location_to_inputs(WC_TOOL_PATH)
+    wf_location_to_inputs(WC_TOOL_PATH)
+    collect_cache_stats(registry)
+    before = hits()
+    assert before >= 1
+
+    INPUTS_CACHE.clear()
+    collect_cache_stats(registry)
+    assert hits() == before
+    wf_location_to_inputs(WC_TOOL_PATH)
+    wf_location_to_inputs(WC_TOOL_PATH)
+    collect_cache_stats(registry)
+    assert hits() == before + 1
+
+
+def test_remote_fetch_metrics():
+    with StandInServer({"wc-tool.cwl": WC_TOOL_PATH.read_text(encoding="utf-8")}) as server:  # noqa: E501
+        download(server.url("wc-tool.cwl"))
+        host = server.url("").split("/")[2]
+    text = render(collect())
+    assert f'cwl_inputs_parser_remote_fetch_bytes_total{{host="{host}"}} {len(WC_TOOL_PATH.read_bytes())}' in text  # noqa: E501
+    assert f'cwl_inputs_parser_remote_fetch_duration_seconds_count{{host="{host}"}} 1' in text  # noqa: E501
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from pathlib import Path
+
+from cwl_inputs_parser.normalize import (UNSUPPORTED_FORMAT, UNSUPPORTED_UNION,
+                                         TypeNormalizer, schema_defs)
+from cwl_inputs_parser.utils import (Inputs, load_cwl_document,
+                                     wf_content_to_inputs)
+from cwl_utils.parser.cwl_v1_2 import (CommandInputArraySchema,
+                                       CommandInputEnumSchema,
+                                       CommandInputRecordSchema,
+                                       InputArraySchema, InputRecordSchema)
+
+SCHEMA_DEF_TOOL = """\
+cwlVersion: v1.2
+class: CommandLineTool
+baseCommand: echo
+requirements:
+  SchemaDefRequirement:
+    types:
+      - name: FileArray
+        type: array
+        items: File
+inputs:
+  files:
+    type: FileArray
+  optional_files:
+    type: FileArray?
+outputs: []
+"""
+
+
+def test_typical():
+    normalizer = TypeNormalizer()
+    for name in ["boolean", "int", "string", "File", "stdin", "Directory", "Any"]:  # noqa: E501
+        descriptor = normalizer.normalize(name)
+        assert descriptor.kind == name
+        assert descriptor.required is True
+    assert normalizer.normalize("float").error == UNSUPPORTED_FORMAT
+
+
+def test_union():
+    normalizer = TypeNormalizer()
+    descriptor = normalizer.normalize(["null", "File"])
+    assert descriptor.kind == "File"
+    assert descriptor.required is False
+    assert normalizer.normalize(["string"]).kind == "string"
+    assert normalizer.normalize(["int", "string"]).error == UNSUPPORTED_UNION
+    assert normalizer.normalize(["null", "int", "string"]).error == UNSUPPORTED_UNION  # noqa: E501
+    assert normalizer.normalize(["null", "float"]).error == UNSUPPORTED_FORMAT
+
+
+def test_array():
+    normalizer = TypeNormalizer()
+    schema = CommandInputArraySchema(items="File", type="array")
+    descriptor = normalizer.normalize(schema)
+    assert descriptor.kind == "command_input_array"
+    assert descriptor.type is schema
+    assert normalizer.normalize([schema]).kind == "command_input_array"
+    schema = InputArraySchema(items="float", type="array")
+    assert normalizer.normalize(schema).error == UNSUPPORTED_FORMAT
+    schema = InputArraySchema(items=InputRecordSchema(type="record"), type="array")  # noqa: E501
+    assert "InputRecordSchema field in the InputArraySchema" in normalizer.normalize(schema).error  # noqa: E501
+
+
+def test_not_supported_schema():
+    normalizer = TypeNormalizer()
+    schema = CommandInputEnumSchema(symbols=["a"], type="enum")
+    assert "CommandInputEnumSchema" in normalizer.normalize(schema).error
+
+
+def test_schema_descriptor():
+    normalizer = TypeNormalizer()
+    schema = InputArraySchema(items="string", type="array")
+    descriptor = normalizer.normalize(schema)
+    assert descriptor.kind == "input_array"
+    assert descriptor.type is schema
+
+
+def test_named_types():
+    array = CommandInputArraySchema(items="File", type="array", name="file:///tool.cwl#FileArray")  # noqa: E501
+    record = CommandInputRecordSchema(type="record", name="file:///tool.cwl#Record")  # noqa: E501
+    normalizer = TypeNormalizer({array.name: array, record.name: record})
+    descriptor = normalizer.normalize(array.name)
+    assert descriptor.kind == "command_input_array"
+    assert descriptor.type is array
+    # resolved once per document
+    assert normalizer.normalize(array.name) is descriptor
+    optional = normalizer.normalize(["null", array.name])
+    assert optional.type is array
+    assert optional.required is False
+    assert "CommandInputRecordSchema" in normalizer.normalize(record.name).error  # noqa: E501
+    assert normalizer.normalize("file:///tool.cwl#Other").error == UNSUPPORTED_FORMAT  # noqa: E501
+
+
+def test_schema_def_requirement(tmp_path: Path):
+    uri = tmp_path.joinpath("tool.cwl").as_uri()
+    assert list(schema_defs(load_cwl_document(SCHEMA_DEF_TOOL, uri))) == [f"{uri}#FileArray"]  # noqa: E501
+    inputs = wf_content_to_inputs(SCHEMA_DEF_TOOL, uri, use_cache=False)
+    assert [(f.type, f.array, f.required) for f in inputs.fields] == [("File", True, True), ("File", True, False)]  # noqa: E501
+    assert list(Inputs(load_cwl_document(SCHEMA_DEF_TOOL, uri), parse=False).iter_fields()) == inputs.fields  # noqa: E501
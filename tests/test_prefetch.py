@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import time
+from pathlib import Path
+
+from cwl_inputs_parser.remote import RemoteFetcher, scan_references
+from cwl_inputs_parser.template import TemplateEngine
+from cwl_inputs_parser.utils import wf_content_to_inputs
+from schema_salad.utils import yaml_no_ts
+
+from http_stand_in import StandInServer
+
+WC_TOOL_PATH = Path(__file__).parent.joinpath("cwl_conformance_test/v1.2/wc-tool.cwl")  # noqa: E501
+LATENCY = 0.2
+N_REFERENCES = 8
+
+TOOL = """\
+cwlVersion: v1.2
+class: CommandLineTool
+baseCommand: echo
+inputs:
+{inputs}
+outputs: []
+"""
+
+INCLUDE_INPUT = """\
+  input_{i}:
+    type: string
+    doc:
+      $include: docs/doc_{i}.txt
+"""
+
+WORKFLOW = """\
+cwlVersion: v1.2
+class: Workflow
+inputs: []
+outputs: []
+steps:
+{steps}
+"""
+
+STEP = """\
+  step_{i}:
+    run: tools/tool_{i}.cwl
+    in: []
+    out: []
+"""
+
+
+def test_scan_references():
+    doc = yaml_no_ts().load("""\
+steps:
+  a:
+    run: tool.cwl
+  b:
+    run: "#main"
+  c:
+    run: /abs/tool.cwl#main
+requirements:
+  - $import: types.yml
+hints:
+  - $include: ../text.txt
+""")
+    base = "http://example.org/dir/wf.cwl"
+    assert sorted(scan_references(doc, base)) == [
+        ("http://example.org/abs/tool.cwl", False),
+        ("http://example.org/dir/tool.cwl", False),
+        ("http://example.org/dir/types.yml", False),
+        ("http://example.org/text.txt", True),
+    ]
+    assert sorted(scan_references(doc, base, run=False)) == [
+        ("http://example.org/dir/types.yml", False),
+        ("http://example.org/text.txt", True),
+    ]
+    # the local references are not prefetched
+    assert scan_references(doc, "file:///dir/wf.cwl") == []
+
+
+def test_prefetch_includes():
+    documents = {f"docs/doc_{i}.txt": f"The input {i}" for i in range(N_REFERENCES)}  # noqa: E501
+    content = TOOL.format(inputs="".join(INCLUDE_INPUT.format(i=i) for i in range(N_REFERENCES)))  # noqa: E501
+    with StandInServer(documents, latency=LATENCY) as server:
+        start = time.perf_counter()
+        inputs = wf_content_to_inputs(content, server.url("tool.cwl"), use_cache=False)  # noqa: E501
+        elapsed = time.perf_counter() - start
+    assert [field.doc for field in inputs.fields] == [f"The input {i}" for i in range(N_REFERENCES)]  # noqa: E501
+    assert all(count == 1 for count in server.requests.values())
+    assert server.max_in_flight > 1
+    # one level of references, fetched at once
+    assert elapsed < LATENCY * N_REFERENCES / 2
+
+
+def test_prefetch_nested_runs():
+    tool = TOOL.format(inputs="  input:\n    type: string\n    doc:\n      $include: ../docs/doc.txt\n")  # noqa: E501
+    documents = {f"tools/tool_{i}.cwl": tool for i in range(N_REFERENCES)}
+    documents["docs/doc.txt"] = "The input"
+    workflow = WORKFLOW.format(steps="".join(STEP.format(i=i) for i in range(N_REFERENCES)))  # noqa: E501
+    with StandInServer(documents, latency=LATENCY) as server:
+        fetcher = RemoteFetcher()
+        fetcher.prefetch(yaml_no_ts().load(workflow), server.url("wf.cwl"))
+    assert sorted(fetcher.prefetched) == sorted(server.url(path) for path in documents)  # noqa: E501
+    # each document is fetched once, even if referenced by all the tools
+    assert all(count == 1 for count in server.requests.values())
+    assert server.max_in_flight > 1
+
+
+def test_prefetch_failure_is_left_to_loader():
+    content = TOOL.format(inputs=INCLUDE_INPUT.format(i=0))
+    with StandInServer({}) as server:
+        fetcher = RemoteFetcher()
+        fetcher.prefetch(yaml_no_ts().load(content), server.url("tool.cwl"))
+    assert fetcher.prefetched == {}
+
+
+def test_template_engine_prefetches_runs():
+    tool = TOOL.format(inputs="  input:\n    type: string?\n")
+    documents = {f"tools/tool_{i}.cwl": tool for i in range(N_REFERENCES)}
+    documents["wf.cwl"] = WORKFLOW.format(steps="".join(STEP.format(i=i) for i in range(N_REFERENCES)))  # noqa: E501
+    engine = TemplateEngine()
+    # cwltool loads its schemas on the first call
+    engine.make_template(WC_TOOL_PATH)
+    with StandInServer(documents, latency=LATENCY) as server:
+        start = time.perf_counter()
+        template = engine.make_template(server.url("wf.cwl"), use_cache=False)  # noqa: E501
+        elapsed = time.perf_counter() - start
+    assert template == "{}\n"
+    assert all(count == 1 for count in server.requests.values())
+    assert server.max_in_flight > 1
+    # the root document, then the tools at once
+    assert elapsed < LATENCY * N_REFERENCES / 2
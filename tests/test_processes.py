@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import json
+from pathlib import Path
+
+import pytest
+from cwl_inputs_parser.server import create_app
+from cwl_inputs_parser.utils import (Inputs, as_uri, fetch_document,
+                                     index_processes, load_cwl_document,
+                                     wf_content_to_process_inputs,
+                                     wf_location_to_inputs,
+                                     wf_location_to_process_inputs)
+
+CONFORMANCE_TEST_DIR = Path(__file__).parent.joinpath("cwl_conformance_test")  # noqa: E501
+REVSORT_PACKED_PATH = CONFORMANCE_TEST_DIR.joinpath("v1.2/revsort-packed.cwl")  # noqa: E501
+SCHEMA_DEF_PACKED_PATH = CONFORMANCE_TEST_DIR.joinpath("v1.2/import_schema-def_packed.cwl")  # noqa: E501
+WC_TOOL_PATH = CONFORMANCE_TEST_DIR.joinpath("v1.2/wc-tool.cwl")
+
+
+def test_index_processes():
+    wf_obj = load_cwl_document(fetch_document(REVSORT_PACKED_PATH), as_uri(REVSORT_PACKED_PATH))  # noqa: E501
+    index = index_processes(wf_obj)
+    assert list(index) == ["main", "revtool.cwl", "sorttool.cwl"]
+    assert index["revtool.cwl"].class_ == "CommandLineTool"
+
+    wf_obj = load_cwl_document(fetch_document(WC_TOOL_PATH), as_uri(WC_TOOL_PATH))  # noqa: E501
+    assert list(index_processes(wf_obj)) == ["main"]
+
+
+def test_process_inputs():
+    process_inputs = wf_location_to_process_inputs(REVSORT_PACKED_PATH, use_cache=False)  # noqa: E501
+    wf_obj = load_cwl_document(fetch_document(REVSORT_PACKED_PATH), as_uri(REVSORT_PACKED_PATH))  # noqa: E501
+    result = process_inputs.as_dict()
+    assert list(result) == ["main", "revtool.cwl", "sorttool.cwl"]
+    for id_, obj in index_processes(wf_obj).items():
+        assert result[id_] == {"class": obj.class_, "inputs": Inputs(obj).as_dict()}  # noqa: E501
+    # the main process is the one of wf_location_to_inputs
+    assert result["main"]["inputs"] == wf_location_to_inputs(REVSORT_PACKED_PATH).as_dict()  # noqa: E501
+
+    assert list(process_inputs.as_dict(["sorttool.cwl"])) == ["sorttool.cwl"]
+    assert process_inputs.unknown_ids(["main", "nothing"]) == ["nothing"]
+    with pytest.raises(KeyError):
+        process_inputs.as_dict(["nothing"])
+
+
+def test_process_inputs_error():
+    # the main workflow uses a record type, but its tool can be parsed
+    result = wf_location_to_process_inputs(SCHEMA_DEF_PACKED_PATH).as_dict()
+    assert result["main"]["error"]["type"] == "UnsupportedValueError"
+    assert "inputs" in result["touch.cwl"]
+
+
+def test_process_inputs_cache():
+    wf_content = REVSORT_PACKED_PATH.read_text(encoding="utf-8")
+    uri = as_uri(REVSORT_PACKED_PATH)
+    first = wf_content_to_process_inputs(wf_content, uri)
+    assert wf_content_to_process_inputs(wf_content, uri) is first
+    assert wf_content_to_process_inputs(wf_content, uri, use_cache=False) is not first  # noqa: E501
+
+
+def test_server_processes():
+    client = create_app().test_client()
+    res = client.post("/processes", data=json.dumps({"wf_location": str(REVSORT_PACKED_PATH)}))  # noqa: E501
+    assert res.status_code == 200
+    assert list(res.get_json()) == ["main", "revtool.cwl", "sorttool.cwl"]
+
+    res = client.post("/processes", data=json.dumps({
+        "wf_content": REVSORT_PACKED_PATH.read_text(encoding="utf-8"),
+        "base_uri": as_uri(REVSORT_PACKED_PATH),
+        "ids": ["revtool.cwl"],
+    }))
+    assert res.status_code == 200
+    assert list(res.get_json()) == ["revtool.cwl"]
+
+    res = client.post("/processes", data=json.dumps({"wf_location": str(REVSORT_PACKED_PATH), "ids": ["nothing"]}))  # noqa: E501
+    assert res.status_code == 400
+    assert "nothing" in res.get_json()["message"]
+
+    # an empty list selects all the processes, like no list
+    res = client.post("/processes", data=json.dumps({"wf_location": str(REVSORT_PACKED_PATH), "ids": []}))  # noqa: E501
+    assert res.status_code == 200
+    assert list(res.get_json()) == ["main", "revtool.cwl", "sorttool.cwl"]
+
+    res = client.post("/processes", data=json.dumps({"ids": []}))
+    assert res.status_code == 400
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import gc
+import json
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import requests
+from cwltool.process import SCHEMA_CACHE
+
+from cwl_inputs_parser.metrics import FLUSH_INTERVAL
+from cwl_inputs_parser.production import CWL_VERSIONS, warm_up
+
+WC_TOOL_PATH = Path(__file__).parent.joinpath("cwl_conformance_test/v1.2/wc-tool.cwl")  # noqa: E501
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port: int = sock.getsockname()[1]
+        return port
+
+
+def wait_for_health(proc: "subprocess.Popen[bytes]", url: str, timeout: float = 60) -> None:  # noqa: E501
+    deadline = time.monotonic() + timeout
+    while True:
+        assert proc.poll() is None
+        try:
+            if requests.get(url + "/health", timeout=1).status_code == 200:
+                return
+        except requests.ConnectionError:
+            pass
+        assert time.monotonic() < deadline
+        time.sleep(0.2)
+
+
+def test_warm_up():
+    try:
+        warm_up()
+    finally:
+        gc.unfreeze()
+    for version in CWL_VERSIONS:
+        assert version in SCHEMA_CACHE
+
+
+def test_production_server():
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    proc = subprocess.Popen([
+        sys.executable, "-m", "cwl_inputs_parser.main",
+        "--server", "--production", "--workers", "2",
+        "--bind", f"127.0.0.1:{port}", "--backlog", "64",
+        "--graceful-timeout", "5",
+    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_health(proc, url)
+        res = requests.post(url, data=json.dumps({"wf_location": str(WC_TOOL_PATH)}))  # noqa: E501
+        assert res.json()[0]["id"] == "file1"
+
+        # graceful restart of the workers
+        proc.send_signal(signal.SIGHUP)
+        time.sleep(1)
+        wait_for_health(proc, url)
+        res = requests.post(url, data=json.dumps({"wf_location": str(WC_TOOL_PATH)}))  # noqa: E501
+        assert res.json()[0]["id"] == "file1"
+
+        # the requests of all the workers, also of the restarted ones
+        for _ in range(4):
+            requests.post(url, data=json.dumps({"wf_location": str(WC_TOOL_PATH)}))  # noqa: E501
+        # the other worker writes its samples at the end of the interval
+        time.sleep(FLUSH_INTERVAL + 0.5)
+        metrics = requests.get(url + "/metrics").text
+        assert 'cwl_inputs_parser_requests_total{method="POST",route="/",status="200"} 6' in metrics  # noqa: E501
+        assert metrics.count("cwl_inputs_parser_worker_rss_bytes{") == 2
+
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(timeout=30) == 0
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
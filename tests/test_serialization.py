@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import json
+import pickle
+from collections import OrderedDict
+from copy import deepcopy
+from pathlib import Path
+
+from cwl_inputs_parser import utils
+from cwl_inputs_parser.server import create_app
+from cwl_inputs_parser.utils import Inputs, dumps_json, wf_location_to_inputs
+
+from const import CWL_UTILS_OBJ_TEMPLATE
+
+ALL_INPUT_CWL_PATH = Path(__file__).parent.joinpath("all_input.cwl")
+ALL_INPUT_JSON_PATH = Path(__file__).parent.joinpath("all_input.json")
+
+
+def test_as_dict():
+    inputs = wf_location_to_inputs(ALL_INPUT_CWL_PATH)
+    expect = json.loads(ALL_INPUT_JSON_PATH.read_text(encoding="utf-8"))
+    assert inputs.as_dict() == expect
+
+
+def test_as_json_bytes():
+    inputs = wf_location_to_inputs(ALL_INPUT_CWL_PATH)
+    expect = json.loads(ALL_INPUT_JSON_PATH.read_text(encoding="utf-8"))
+    assert json.loads(inputs.as_json_bytes()) == expect
+    assert json.loads(inputs.as_json_bytes(indent=True)) == expect
+
+
+def test_as_json_bytes_without_orjson(monkeypatch):
+    monkeypatch.setattr(utils, "orjson", None)
+    inputs = wf_location_to_inputs(ALL_INPUT_CWL_PATH)
+    expect = json.loads(ALL_INPUT_JSON_PATH.read_text(encoding="utf-8"))
+    assert b"\n" not in inputs.as_json_bytes()
+    assert json.loads(inputs.as_json_bytes()) == expect
+
+
+def test_dumps_json_large_int():
+    assert json.loads(dumps_json([2 ** 70])) == [2 ** 70]
+
+
+def test_default_as_plain_types():
+    cwl_obj = deepcopy(CWL_UTILS_OBJ_TEMPLATE)
+    cwl_obj.inputs[0].type = "Any"
+    cwl_obj.inputs[0].default = OrderedDict([("a", (1, 2)), (3, None)])
+    result = Inputs(cwl_obj).as_dict()[0]["default"]
+    assert type(result) is dict
+    assert result == {"a": [1, 2], "3": None}
+
+
+def test_server_response():
+    client = create_app().test_client()
+    res = client.post("/", data=json.dumps({"wf_location": str(ALL_INPUT_CWL_PATH)}))  # noqa: E501
+    assert res.status_code == 200
+    assert res.mimetype == "application/json"
+    expect = json.loads(ALL_INPUT_JSON_PATH.read_text(encoding="utf-8"))
+    assert res.get_json() == expect
+
+
+def test_slotted_fields():
+    inputs = wf_location_to_inputs(ALL_INPUT_CWL_PATH)
+    for field in inputs.fields:
+        assert not hasattr(field, "__dict__")
+        for secondary_file in field.secondaryFiles or []:
+            assert not hasattr(secondary_file, "__dict__")
+    copied = pickle.loads(pickle.dumps(inputs.fields))
+    assert copied == inputs.fields
+    assert [field.as_dict() for field in copied] == inputs.as_dict()
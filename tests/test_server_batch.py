@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import json
+from pathlib import Path
+
+from cwl_inputs_parser.metrics import get_metrics
+from cwl_inputs_parser.server import create_app
+
+from http_stand_in import StandInServer
+
+ALL_INPUT_CWL_PATH = Path(__file__).parent.joinpath("all_input.cwl")
+ALL_INPUT_JSON_PATH = Path(__file__).parent.joinpath("all_input.json")
+WC_TOOL_PATH = Path(__file__).parent.joinpath("cwl_conformance_test/v1.2/wc-tool.cwl")  # noqa: E501
+# CommandInputRecordSchema, not supported
+UNSUPPORTED_PATH = Path(__file__).parent.joinpath("cwl_conformance_test/v1.2/anon_enum_inside_array.cwl")  # noqa: E501
+
+
+def test_batch():
+    client = create_app(batch_concurrency=2).test_client()
+    items = [
+        {"wf_location": str(ALL_INPUT_CWL_PATH)},
+        {"wf_content": WC_TOOL_PATH.read_text(encoding="utf-8")},
+        {"wf_location": str(UNSUPPORTED_PATH)},
+        {"foo": "bar"},
+        "not an object",
+    ]
+    res = client.post("/batch", data=json.dumps(items))
+    assert res.status_code == 200
+    assert res.mimetype == "application/x-ndjson"
+    records = [json.loads(line) for line in res.data.splitlines()]
+    records.sort(key=lambda r: r["index"])
+    assert [r["index"] for r in records] == [0, 1, 2, 3, 4]
+    expect = json.loads(ALL_INPUT_JSON_PATH.read_text(encoding="utf-8"))
+    assert records[0]["inputs"] == expect
+    assert records[1]["inputs"][0]["id"] == "file1"
+    assert records[2]["error"]["type"] == "UnsupportedValueError"
+    assert records[3]["error"]["message"] == "Missing arguments"
+    assert records[4]["error"]["type"] == "ValueError"
+    assert all(r["elapsed"] >= 0 for r in records)
+    res.close()
+
+
+def test_batch_items_key():
+    client = create_app().test_client()
+    res = client.post("/batch", data=json.dumps({"items": [{"wf_location": str(WC_TOOL_PATH)}]}))  # noqa: E501
+    records = [json.loads(line) for line in res.data.splitlines()]
+    assert len(records) == 1
+    assert records[0]["inputs"][0]["id"] == "file1"
+    res.close()
+
+
+def test_batch_missing_items():
+    client = create_app().test_client()
+    res = client.post("/batch", data=json.dumps({"wf_location": str(WC_TOOL_PATH)}))  # noqa: E501
+    assert res.status_code == 400
+
+
+def test_batch_concurrency():
+    content = WC_TOOL_PATH.read_text(encoding="utf-8")
+    # distinct documents, so that none of them is served from the cache
+    documents = {f"wc-tool-{i}.cwl": f"{content}\n# {i}\n" for i in range(6)}
+    client = create_app(batch_concurrency=2).test_client()
+    with StandInServer(documents, latency=0.1) as server:
+        items = [{"wf_location": server.url(path)} for path in documents]
+        res = client.post("/batch", data=json.dumps(items))
+        records = [json.loads(line) for line in res.data.splitlines()]
+        assert len(records) == 6
+        assert all("inputs" in r for r in records)
+        assert server.max_in_flight == 2
+        res.close()
+
+
+def test_batch_metrics():
+    def samples():
+        snapshot = get_metrics().snapshot()
+        in_flight = sum(value for name, _, value in snapshot["gauges"] if name == "cwl_inputs_parser_requests_in_flight")  # noqa: E501
+        durations = [values for name, labels, values in snapshot["histograms"] if name == "cwl_inputs_parser_request_duration_seconds" and labels["route"] == "/batch"]  # noqa: E501
+        return in_flight, durations[0][-1] if durations else 0.0
+
+    in_flight, duration = samples()
+    content = WC_TOOL_PATH.read_text(encoding="utf-8")
+    documents = {"wc-tool.cwl": f"{content}\n# metrics\n"}
+    client = create_app().test_client()
+    with StandInServer(documents, latency=0.3) as server:
+        res = client.post("/batch", data=json.dumps([{"wf_location": server.url("wc-tool.cwl")}]))  # noqa: E501
+        # the items are parsed while the response is streamed
+        assert samples()[0] == in_flight + 1
+        assert len(res.data.splitlines()) == 1
+        res.close()
+    assert samples()[0] == in_flight
+    assert samples()[1] - duration >= 0.3
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from cwl_inputs_parser.remote import (HTTPSettings, configure_http,
+                                      get_session_pool)
+from cwl_inputs_parser.server import create_app
+from cwl_inputs_parser.utils import download_file, wf_location_to_inputs
+
+from http_stand_in import StandInServer
+
+V1_2_DIR = Path(__file__).parent.joinpath("cwl_conformance_test/v1.2")
+
+
+@pytest.fixture(autouse=True)
+def reset_session_pool() -> Iterator[None]:
+    yield
+    configure_http(HTTPSettings())
+
+
+def test_max_connections_per_host():
+    configure_http(HTTPSettings(max_connections_per_host=2))
+    documents = {f"doc{i}.txt": str(i) for i in range(8)}
+    with StandInServer(documents, latency=0.1) as server:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(
+                download_file, [server.url(path) for path in documents]))
+        assert results == [str(i) for i in range(8)]
+        assert server.max_in_flight <= 2
+
+
+def test_read_timeout():
+    configure_http(HTTPSettings(read_timeout=0.1, retries=0))
+    with StandInServer({"doc.txt": "content"}, latency=0.5) as server:
+        with pytest.raises(Exception):
+            download_file(server.url("doc.txt"))
+
+
+def test_retry():
+    configure_http(HTTPSettings(retries=2, backoff_factor=0))
+    with StandInServer({"doc.txt": "content"}, failures={"doc.txt": 2}) as server:  # noqa: E501
+        assert download_file(server.url("doc.txt")) == "content"
+        assert server.requests["doc.txt"] == 3
+
+
+def test_retry_exhausted():
+    configure_http(HTTPSettings(retries=1, backoff_factor=0))
+    with StandInServer({"doc.txt": "content"}, failures={"doc.txt": 2}) as server:  # noqa: E501
+        with pytest.raises(Exception) as e:
+            download_file(server.url("doc.txt"))
+        assert "Failed to download file" in str(e.value)
+
+
+def test_referenced_documents_use_session_pool():
+    documents = {
+        name: V1_2_DIR.joinpath(name).read_text(encoding="utf-8")
+        for name in ["imported-hint.cwl", "envvar.yml"]
+    }
+    with StandInServer(documents) as server:
+        inputs = wf_location_to_inputs(server.url("imported-hint.cwl"),
+                                       use_cache=False)
+        assert inputs.fields == []
+        assert server.requests["imported-hint.cwl"] == 1
+        assert server.requests["envvar.yml"] == 1
+
+
+def test_create_app_settings():
+    settings = HTTPSettings(connect_timeout=1.0, read_timeout=2.0)
+    app = create_app(settings)
+    assert app.config["HTTP_SETTINGS"] == settings
+    assert get_session_pool().settings == settings
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from cwl_inputs_parser import handlers
+from cwl_inputs_parser.cache import SingleFlight
+from cwl_inputs_parser.server import create_app
+
+from http_stand_in import StandInServer
+
+WC_TOOL_PATH = Path(__file__).parent.joinpath("cwl_conformance_test/v1.2/wc-tool.cwl")  # noqa: E501
+N_REQUESTS = 6
+
+
+def test_single_flight():
+    flights: SingleFlight[int] = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def slow() -> int:
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return 42
+
+    def call(_: int) -> int:
+        return flights.do("key", slow)
+
+    with ThreadPoolExecutor(max_workers=N_REQUESTS) as executor:
+        leader = executor.submit(call, 0)
+        started.wait()
+        results = list(executor.map(call, range(N_REQUESTS - 1)))
+    assert leader.result() == 42
+    assert results == [42] * (N_REQUESTS - 1)
+    assert len(calls) == 1
+    assert flights.coalesced() == N_REQUESTS - 1
+
+    # the call is not kept once it ends
+    assert flights.do("key", lambda: 0) == 0
+
+
+def test_single_flight_error():
+    flights: SingleFlight[int] = SingleFlight()
+    started = threading.Event()
+
+    def failing() -> int:
+        started.set()
+        time.sleep(0.2)
+        raise ValueError("failed")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(flights.do, "key", failing)
+        started.wait()
+        follower = executor.submit(flights.do, "key", lambda: 0)
+        for future in [leader, follower]:
+            with pytest.raises(ValueError):
+                future.result()
+    assert flights.coalesced() == 1
+
+
+@pytest.mark.parametrize("route", ["/", "/make-template"])
+def test_server_coalesces_requests(route):
+    flights = handlers.INPUTS_FLIGHTS if route == "/" else handlers.TEMPLATE_FLIGHTS  # noqa: E501
+    coalesced = flights.coalesced()
+    app = create_app()
+    path = f"coalesced{route.replace('/', '_')}/wc-tool.cwl"
+    documents = {path: WC_TOOL_PATH.read_text(encoding="utf-8")}
+    with StandInServer(documents, latency=0.5) as server:
+        data = json.dumps({"wf_location": server.url(path)})
+
+        def post(_: int) -> bytes:
+            res = app.test_client().post(route, data=data)
+            assert res.status_code == 200
+            return bytes(res.get_data())
+
+        with ThreadPoolExecutor(max_workers=N_REQUESTS) as executor:
+            bodies = list(executor.map(post, range(N_REQUESTS)))
+    assert len(set(bodies)) == 1
+    assert server.requests[path] == 1
+    assert flights.coalesced() - coalesced == N_REQUESTS - 1
+
+    metrics = app.test_client().get("/metrics").get_data(as_text=True)
+    assert f'cwl_inputs_parser_coalesced_requests_total{{route="{route}"}}' in metrics  # noqa: E501
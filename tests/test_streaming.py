@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from cwl_inputs_parser import utils
+from cwl_inputs_parser.main import main
+from cwl_inputs_parser.server import create_app
+from cwl_inputs_parser.utils import (Inputs, UnsupportedValueError, as_uri,
+                                     fetch_document, iter_json,
+                                     load_cwl_document,
+                                     wf_content_to_input_fields,
+                                     wf_location_to_input_fields,
+                                     wf_location_to_inputs)
+
+ALL_INPUT_CWL_PATH = Path(__file__).parent.joinpath("all_input.cwl")
+ALL_INPUT_JSON_PATH = Path(__file__).parent.joinpath("all_input.json")
+CONFORMANCE_TEST_DIR = Path(__file__).parent.joinpath("cwl_conformance_test")  # noqa: E501
+UNION_FIELD_PATH = CONFORMANCE_TEST_DIR.joinpath("v1.2/io-file-or-files.cwl")  # noqa: E501
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_iter_json(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(utils, "orjson", None)
+    inputs = wf_location_to_inputs(ALL_INPUT_CWL_PATH, use_cache=False)
+    for indent in [False, True]:
+        streamed = b"".join(iter_json(
+            wf_location_to_input_fields(ALL_INPUT_CWL_PATH), indent=indent))
+        assert streamed == inputs.as_json_bytes(indent=indent)
+
+
+def test_iter_json_empty():
+    assert b"".join(iter_json([])) == utils.dumps_json([])
+    assert b"".join(iter_json([], indent=True)) == utils.dumps_json([], indent=True)  # noqa: E501
+
+
+def test_iter_fields_lazy():
+    wf_obj = load_cwl_document(fetch_document(ALL_INPUT_CWL_PATH), as_uri(ALL_INPUT_CWL_PATH))  # noqa: E501
+    inputs = Inputs(wf_obj, parse=False)
+    assert inputs.fields == []
+    fields = inputs.iter_fields()
+    first = next(fields)
+    assert first == wf_location_to_inputs(ALL_INPUT_CWL_PATH).fields[0]
+    # the streamed fields are not kept
+    assert inputs.fields == []
+
+
+def test_iter_fields_error_before_streaming():
+    with pytest.raises(UnsupportedValueError) as e:
+        wf_location_to_input_fields(UNION_FIELD_PATH)
+    assert "union field" in str(e.value)
+
+
+def test_content_to_input_fields():
+    wf_content = ALL_INPUT_CWL_PATH.read_text(encoding="utf-8")
+    uri = as_uri(ALL_INPUT_CWL_PATH)
+    expect = json.loads(ALL_INPUT_JSON_PATH.read_text(encoding="utf-8"))
+    streamed = [f.as_dict() for f in wf_content_to_input_fields(wf_content, uri)]  # noqa: E501
+    assert streamed == expect
+
+
+def test_server_stream():
+    client = create_app().test_client()
+    data = json.dumps({"wf_location": str(ALL_INPUT_CWL_PATH)})
+    res = client.post("/?stream=1", data=data)
+    assert res.status_code == 200
+    assert res.is_streamed
+    assert res.get_data() == client.post("/", data=data).get_data()
+    # the request ends when the stream is closed
+    res.close()
+
+    res = client.post("/?stream=1", data=json.dumps({}))
+    assert res.status_code == 400
+
+
+def test_main_output(monkeypatch, capsysbinary):
+    monkeypatch.setattr(sys, "argv", ["cwl-inputs-parser", str(ALL_INPUT_CWL_PATH)])  # noqa: E501
+    main()
+    inputs = wf_location_to_inputs(ALL_INPUT_CWL_PATH)
+    assert capsysbinary.readouterr().out == inputs.as_json_bytes(indent=True) + b"\n"  # noqa: E501
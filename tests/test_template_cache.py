@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import shutil
+import time
+from pathlib import Path
+
+import pytest
+
+from cwl_inputs_parser.template import TemplateEngine
+
+from http_stand_in import StandInServer
+
+V1_2_DIR = Path(__file__).parent.joinpath("cwl_conformance_test/v1.2")
+WC_TOOL_PATH = V1_2_DIR.joinpath("wc-tool.cwl")
+LATENCY = 0.2
+N_TOOLS = 8
+
+TOOL = """\
+cwlVersion: v1.2
+class: CommandLineTool
+baseCommand: echo
+inputs:
+  input:
+    type: string?
+outputs: []
+"""
+
+WORKFLOW = """\
+cwlVersion: v1.2
+class: Workflow
+inputs: []
+outputs: []
+steps:
+{steps}
+"""
+
+
+@pytest.fixture()
+def counted_engine():
+    engine = TemplateEngine()
+    engine.runs = 0
+    make_template = engine._make_template
+
+    def counted(*args, **kwargs):
+        engine.runs += 1
+        return make_template(*args, **kwargs)
+    engine._make_template = counted
+    return engine
+
+
+@pytest.fixture()
+def schemadef_tool(tmp_path):
+    for name in ["schemadef-tool.cwl", "schemadef-type.yml"]:
+        shutil.copy(V1_2_DIR.joinpath(name), tmp_path.joinpath(name))
+    return tmp_path.joinpath("schemadef-tool.cwl")
+
+
+def test_second_call_is_cached(counted_engine, schemadef_tool):
+    template = counted_engine.make_template(schemadef_tool)
+    assert counted_engine.make_template(schemadef_tool) == template
+    assert counted_engine.make_template(schemadef_tool.as_uri()) == template
+    assert counted_engine.runs == 1
+
+
+def test_referenced_document_is_changed(counted_engine, schemadef_tool):
+    counted_engine.make_template(schemadef_tool)
+    type_path = schemadef_tool.parent.joinpath("schemadef-type.yml")
+    type_path.write_text(type_path.read_text(encoding="utf-8") + "\n", encoding="utf-8")  # noqa: E501
+    counted_engine.make_template(schemadef_tool)
+    assert counted_engine.runs == 2
+    counted_engine.make_template(schemadef_tool)
+    assert counted_engine.runs == 2
+
+
+def test_root_document_is_changed(counted_engine, schemadef_tool):
+    counted_engine.make_template(schemadef_tool)
+    schemadef_tool.write_text(schemadef_tool.read_text(encoding="utf-8").replace("hello", "bye"), encoding="utf-8")  # noqa: E501
+    counted_engine.make_template(schemadef_tool)
+    assert counted_engine.runs == 2
+
+
+def test_referenced_document_is_removed(counted_engine, schemadef_tool):
+    counted_engine.make_template(schemadef_tool)
+    schemadef_tool.parent.joinpath("schemadef-type.yml").unlink()
+    with pytest.raises(Exception):
+        counted_engine.make_template(schemadef_tool)
+    assert counted_engine.runs == 2
+
+
+def test_content_is_cached(counted_engine):
+    content = WC_TOOL_PATH.read_text(encoding="utf-8")
+    template = counted_engine.make_template_from_content(content, WC_TOOL_PATH.as_uri())  # noqa: E501
+    assert counted_engine.make_template_from_content(content, WC_TOOL_PATH.as_uri()) == template  # noqa: E501
+    assert counted_engine.runs == 1
+    # the same content at another URI is another document
+    counted_engine.make_template_from_content(content, V1_2_DIR.joinpath("other.cwl").as_uri())  # noqa: E501
+    assert counted_engine.runs == 2
+
+
+def test_remote_document_is_changed(counted_engine):
+    documents = {"wc-tool.cwl": WC_TOOL_PATH.read_text(encoding="utf-8")}
+    with StandInServer(documents) as server:
+        url = server.url("wc-tool.cwl")
+        template = counted_engine.make_template(url)
+        assert counted_engine.make_template(url) == template
+        assert counted_engine.runs == 1
+        documents["wc-tool.cwl"] = documents["wc-tool.cwl"].replace("file1", "file2")  # noqa: E501
+        assert "file2" in counted_engine.make_template(url)
+        assert counted_engine.runs == 2
+
+
+def test_use_cache_false(counted_engine):
+    counted_engine.make_template(WC_TOOL_PATH)
+    counted_engine.make_template(WC_TOOL_PATH, use_cache=False)
+    assert counted_engine.runs == 2
+
+
+def test_remote_documents_are_revalidated_at_once(counted_engine):
+    documents = {f"tools/tool_{i}.cwl": TOOL for i in range(N_TOOLS)}
+    documents["wf.cwl"] = WORKFLOW.format(steps="".join(
+        f"  step_{i}:\n    run: tools/tool_{i}.cwl\n    in: []\n    out: []\n"  # noqa: E501
+        for i in range(N_TOOLS)))
+    with StandInServer(documents, latency=LATENCY) as server:
+        url = server.url("wf.cwl")
+        template = counted_engine.make_template(url)
+        server.max_in_flight = 0
+        start = time.perf_counter()
+        assert counted_engine.make_template(url) == template
+        elapsed = time.perf_counter() - start
+    assert counted_engine.runs == 1
+    assert all(count == 2 for count in server.requests.values())
+    assert server.max_in_flight > 1
+    # the documents are fetched at once, not one by one
+    assert elapsed < LATENCY * N_TOOLS / 2
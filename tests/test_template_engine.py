@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# coding: utf-8
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from cwl_inputs_parser.template import TemplateEngine, get_template_engine
+from cwl_inputs_parser.utils import cwl_make_template
+
+from http_stand_in import StandInServer
+
+V1_2_DIR = Path(__file__).parent.joinpath("cwl_conformance_test/v1.2")
+WC_TOOL_PATH = V1_2_DIR.joinpath("wc-tool.cwl")
+WC_TOOL_TEMPLATE = 'file1:  # type "File"\n    class: File\n    path: a/file/path\n'  # noqa: E501
+COMMIT_SHA = "0123456789abcdef0123456789abcdef01234567"
+
+
+def test_make_template():
+    engine = TemplateEngine()
+    assert engine.make_template(WC_TOOL_PATH) == WC_TOOL_TEMPLATE
+    assert engine.make_template(str(WC_TOOL_PATH)) == WC_TOOL_TEMPLATE
+    assert cwl_make_template(WC_TOOL_PATH) == WC_TOOL_TEMPLATE
+    assert get_template_engine() is get_template_engine()
+
+
+def test_null_is_represented():
+    template = TemplateEngine().make_template(V1_2_DIR.joinpath("any-type-compat.cwl"))  # noqa: E501
+    assert "null" in template
+
+
+def test_concurrent_calls():
+    engine = TemplateEngine()
+    locations = [WC_TOOL_PATH, V1_2_DIR.joinpath("bwa-mem-tool.cwl")] * 8
+    expect = [engine.make_template(location) for location in locations]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert list(executor.map(engine.make_template, locations)) == expect
+
+
+def test_immutable_documents_are_shared():
+    content = WC_TOOL_PATH.read_text(encoding="utf-8")
+    documents = {f"{COMMIT_SHA}/wc-tool.cwl": content, "main/wc-tool.cwl": content}  # noqa: E501
+    engine = TemplateEngine()
+    with StandInServer(documents) as server:
+        for _ in range(2):
+            assert engine.make_template(server.url(f"{COMMIT_SHA}/wc-tool.cwl")) == WC_TOOL_TEMPLATE  # noqa: E501
+            assert engine.make_template(server.url("main/wc-tool.cwl")) == WC_TOOL_TEMPLATE  # noqa: E501
+        assert server.requests[f"{COMMIT_SHA}/wc-tool.cwl"] == 1
+        # a mutable URL is fetched by every call
+        assert server.requests["main/wc-tool.cwl"] == 2
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# coding: utf-8
+import json
+from pathlib import Path
+
+import pytest
+
+from cwl_inputs_parser.server import create_app
+from cwl_inputs_parser.tracing import (JSONFileExporter,
+                                       configure_span_exporter, span, trace)
+from cwl_inputs_parser.utils import wf_content_to_inputs, wf_location_to_inputs
+
+from http_stand_in import StandInServer
+
+V1_2_DIR = Path(__file__).parent.joinpath("cwl_conformance_test/v1.2")
+IMPORTED_HINT_PATH = V1_2_DIR.joinpath("imported-hint.cwl")
+PHASES = ["fetch_document", "load_document", "extract_main_tool", "parse", "serialize"]  # noqa: E501
+
+
+@pytest.fixture()
+def trace_file(tmp_path):
+    path = tmp_path.joinpath("trace.jsonl")
+    configure_span_exporter(JSONFileExporter(path))
+    yield path
+    configure_span_exporter(None)
+
+
+def test_timings():
+    with trace("parse") as root:
+        wf_location_to_inputs(IMPORTED_HINT_PATH, use_cache=False).as_json()
+    assert list(root.timings()) == PHASES
+    assert sum(root.timings().values()) <= root.duration
+
+    load_document = root.children[1]
+    assert [child.attributes["url"] for child in load_document.children] == [V1_2_DIR.joinpath("envvar.yml").as_uri()]  # noqa: E501
+
+
+def test_no_span_outside_of_trace():
+    with span("parse") as child:
+        assert child is None
+
+
+def test_remote_sub_document_span():
+    documents = {"dir/envvar.yml": V1_2_DIR.joinpath("envvar.yml").read_text(encoding="utf-8")}  # noqa: E501
+    content = IMPORTED_HINT_PATH.read_text(encoding="utf-8")
+    with StandInServer(documents) as server:
+        with trace("parse") as root:
+            wf_content_to_inputs(content, server.url("dir/imported-hint.cwl"), use_cache=False)  # noqa: E501
+    load_document = root.children[0]
+    assert load_document.name == "load_document"
+    prefetch = load_document.children[0]
+    assert prefetch.name == "prefetch"
+    assert prefetch.children[0].attributes["url"] == server.url("dir/envvar.yml")  # noqa: E501
+    # the loader is served the prefetched document
+    assert load_document.children[1].attributes["url"] == server.url("dir/envvar.yml")  # noqa: E501
+    assert server.requests["dir/envvar.yml"] == 1
+
+
+def test_server_timing_header(trace_file):
+    client = create_app().test_client()
+    res = client.post("/", data=json.dumps({"wf_location": str(IMPORTED_HINT_PATH)}))  # noqa: E501
+    assert res.status_code == 200
+    metrics = [metric.split(";")[0] for metric in res.headers["Server-Timing"].split(", ")]  # noqa: E501
+    assert metrics[0] == "fetch_document"
+    assert metrics[-2:] == ["serialize", "total"]
+
+    exported = [json.loads(line) for line in trace_file.read_text(encoding="utf-8").splitlines()]  # noqa: E501
+    assert len(exported) == 1
+    assert exported[0]["name"] == "POST /"
+    assert exported[0]["children"][0]["attributes"]["location"] == str(IMPORTED_HINT_PATH)  # noqa: E501
+
+
+def test_failed_trace_is_exported(trace_file):
+    with pytest.raises(FileNotFoundError):
+        with trace("parse"):
+            wf_location_to_inputs(V1_2_DIR.joinpath("not-found.cwl"))
+    exported = json.loads(trace_file.read_text(encoding="utf-8"))
+    assert exported["attributes"]["error"] == "FileNotFoundError"
+    assert exported["children"][0]["name"] == "fetch_document"
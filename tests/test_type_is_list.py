@@ -45,3 +45,11 @@ def test_command_input_array_schema():
     result = inputs.fields[0]
     assert result.type == "File"
     assert result.array is True
+
+
+def test_cwl_obj_is_not_copied():
+    cwl_obj = deepcopy(CWL_UTILS_OBJ_TEMPLATE)
+    cwl_obj.inputs[0].type = ["null", "boolean"]
+    inputs = Inputs(cwl_obj)
+    assert inputs.cwl_obj is cwl_obj
+    assert cwl_obj.inputs[0].type == ["null", "boolean"]